@@ -7,13 +7,13 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'author')
     search_fields = ('content', 'post__title', 'author__username')
     raw_id_fields = ('post', 'author')
-    readonly_fields = ('reactions', 'ai_moderation_feedback', 'created_at', 'updated_at')
+    readonly_fields = ('reaction_count', 'ai_moderation_feedback', 'created_at', 'updated_at')
     fieldsets = (
         (None, {
             'fields': ('post', 'author', 'content')
         }),
         ('Moderation & Engagement', {
-            'fields': ('reactions', 'ai_moderation_feedback')
+            'fields': ('reaction_count', 'ai_moderation_feedback')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
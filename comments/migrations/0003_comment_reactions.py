@@ -0,0 +1,123 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:17
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_CHUNK_SIZE = 1000
+REACTION_TYPES = {'like', 'love', 'laugh', 'sad', 'fire', 'heart', 'pray', 'amen'}
+
+
+def convert_reactions(apps, schema_editor):
+    # Comment.reactions maps user id -> reaction type. Entries for unknown
+    # types or deleted users are dropped; the field itself goes in 0004.
+    Comment = apps.get_model('comments', 'Comment')
+    CommentReaction = apps.get_model('comments', 'CommentReaction')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    counter_fields = [f'{reaction_type}_count' for reaction_type in sorted(REACTION_TYPES)] + ['reaction_count']
+    last_pk = 0
+    while True:
+        chunk = list(
+            Comment.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'reactions')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        entries = {
+            comment.pk: {
+                int(user_id): reaction_type
+                for user_id, reaction_type in (comment.reactions or {}).items()
+                if str(user_id).isdigit() and reaction_type in REACTION_TYPES
+            }
+            for comment in chunk
+        }
+        users = set(
+            User.objects.filter(
+                pk__in={user_id for reactions in entries.values() for user_id in reactions}
+            ).values_list('pk', flat=True)
+        )
+        rows = []
+        for comment in chunk:
+            counts = Counter()
+            for user_id, reaction_type in entries[comment.pk].items():
+                if user_id in users:
+                    rows.append(CommentReaction(comment_id=comment.pk, user_id=user_id, type=reaction_type))
+                    counts[reaction_type] += 1
+            for reaction_type in REACTION_TYPES:
+                setattr(comment, f'{reaction_type}_count', counts[reaction_type])
+            comment.reaction_count = sum(counts.values())
+        CommentReaction.objects.bulk_create(rows, ignore_conflicts=True)
+        Comment.objects.bulk_update(chunk, counter_fields)
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('comments', '0002_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='amen_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='fire_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='heart_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='laugh_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='love_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='pray_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reaction_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='sad_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CommentReaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('like', '👍'), ('love', '❤️'), ('laugh', '😂'), ('sad', '😢'), ('fire', '🔥'), ('heart', '❤️'), ('pray', '🙏'), ('amen', '✝️')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_rows', to='comments.comment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_reactions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='commentreaction',
+            constraint=models.UniqueConstraint(fields=('comment', 'user'), name='unique_comment_reaction'),
+        ),
+        migrations.RunPython(convert_reactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0003_comment_reactions'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='comment',
+            name='reactions',
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_CHUNK_SIZE = 1000
+# comments.threads.SEGMENT_WIDTH as of this migration.
+SEGMENT_WIDTH = 10
+
+
+def backfill_paths(apps, schema_editor):
+    # Every existing comment is top-level.
+    Comment = apps.get_model('comments', 'Comment')
+    last_pk = 0
+    while True:
+        chunk = list(Comment.objects.filter(pk__gt=last_pk).order_by('pk').only('pk')[:BACKFILL_CHUNK_SIZE])
+        if not chunk:
+            break
+        for comment in chunk:
+            comment.path = str(comment.pk).zfill(SEGMENT_WIDTH)
+        Comment.objects.bulk_update(chunk, ['path'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0004_remove_comment_reactions_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='comments.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
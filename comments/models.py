@@ -1,20 +1,132 @@
+from django.conf import settings
 from django.db import models
 from users.models import User
-from posts.models import Post
+from posts.models import Post, Reaction
 from django.db.models import JSONField
+from moderation.ledger import pending_feedback, revision_changed, unchanged
+from moderation.queue import request_moderation
+
+from .threads import make_path
 
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
-    reactions = JSONField(default=dict, blank=True, null=True) # e.g., {"heart": 5, "pray": 2}
+    # Threading (see comments/threads.py). ``path`` and ``depth`` are set once,
+    # when the comment is created.
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0)
+    # Per-type reaction counters, kept by comments/reactions.py and
+    # comments/signals.py from the CommentReaction rows.
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    laugh_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    fire_count = models.PositiveIntegerField(default=0)
+    heart_count = models.PositiveIntegerField(default=0)
+    pray_count = models.PositiveIntegerField(default=0)
+    amen_count = models.PositiveIntegerField(default=0)
+    reaction_count = models.PositiveIntegerField(default=0)
     ai_moderation_feedback = JSONField(default=dict, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ]
+
+    @staticmethod
+    def reaction_field(reaction_type):
+        return f"{reaction_type}_count"
+
+    @classmethod
+    def counter_fields(cls):
+        return [cls.reaction_field(reaction_type) for reaction_type, _ in Reaction.REACTION_CHOICES] + ["reaction_count"]
+
+    def reaction_counts(self):
+        counts = {}
+        for reaction_type, _ in Reaction.REACTION_CHOICES:
+            count = getattr(self, self.reaction_field(reaction_type))
+            if count:
+                counts[reaction_type] = count
+        return counts
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_content = instance.__dict__.get("content")
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get("update_fields")
+        if not adding and (update_fields is None or "content" in update_fields):
+            # Edited text waits for its own verdict, like an edited post.
+            if revision_changed(self, getattr(self, "_loaded_content", None)):
+                self.ai_moderation_feedback = pending_feedback(self.ai_moderation_feedback)
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "ai_moderation_feedback"}
+        if not adding and kwargs.get("update_fields") is None:
+            # Never write back counters loaded before a concurrent reaction or
+            # reply; the thread position never changes.
+            fixed = {*self.counter_fields(), "reply_count", "parent", "path", "depth"}
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in fixed
+            ]
+        parent = self.parent if adding and self.parent_id else None
+        if parent is not None:
+            if parent.depth >= settings.COMMENT_MAX_DEPTH:
+                # Replies below the deepest level become siblings of their parent.
+                parent = parent.parent
+                self.parent = parent
+            self.post_id = parent.post_id
+            self.depth = parent.depth + 1
+        super().save(*args, **kwargs)
+        self._loaded_content = self.content
+        if adding:
+            # The path ends with the comment's own key, known only now.
+            self.path = make_path(parent.path if parent is not None else "", self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+        # A no-op unless this content revision has not been moderated yet
+        request_moderation(self)
+
+    def get_moderation_text(self):
+        return self.content
+
+    def is_awaiting_moderation(self):
+        return (self.ai_moderation_feedback or {}).get("status") == "pending"
+
+    def apply_moderation_result(self, result, content_hash=None):
+        comment = unchanged(Comment.objects.filter(pk=self.pk), "content", content_hash)
+        if comment is None:
+            return
+        self.ai_moderation_feedback = result
+        comment.update(ai_moderation_feedback=result)
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title[:30]}..."
+
+
+class CommentReaction(models.Model):
+    """A user's reaction to a comment; at most one per user, reacting with
+    another type replaces it."""
+
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='reaction_rows')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_reactions')
+    type = models.CharField(max_length=20, choices=Reaction.REACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['comment', 'user'], name='unique_comment_reaction'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} reacted {self.type} to comment {self.comment_id}"
@@ -0,0 +1,115 @@
+"""Comment reaction writes.
+
+A user has at most one reaction per comment. ``toggle_reaction`` removes it if
+it is of the given type and otherwise adds or replaces it, and returns the
+comment's counts afterwards. On PostgreSQL the row change and the counter
+update on ``Comment`` run as one statement (data-modifying CTEs), so a tap
+costs a single round trip however many users reacted, and concurrent taps
+from different users cannot lose each other's counts. Elsewhere it falls back
+to the ORM, where comments/signals.py keeps the counters.
+"""
+
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import Reaction
+
+from .models import Comment, CommentReaction
+
+REACTION_TYPES = [choice for choice, _ in Reaction.REACTION_CHOICES]
+
+CommentReactionResult = namedtuple("CommentReactionResult", ["comment_id", "type", "reacted", "counts"])
+
+
+def bump(comment_id, reaction_type, delta):
+    """Atomically add ``delta`` to a comment's counter for ``reaction_type``."""
+
+    field = Comment.reaction_field(reaction_type)
+    return Comment.objects.filter(pk=comment_id).update(
+        **{field: F(field) + delta, "reaction_count": F("reaction_count") + delta}
+    )
+
+
+def _counts(values):
+    return {reaction_type: count for reaction_type, count in zip(REACTION_TYPES, values) if count}
+
+
+def toggle_reaction(comment_id, user_id, reaction_type):
+    """Toggle ``user_id``'s ``reaction_type`` reaction on ``comment_id``.
+
+    ``reacted`` is whether the user has that reaction afterwards and ``counts``
+    the comment's non-zero counts by type.
+    """
+
+    if reaction_type not in REACTION_TYPES:
+        # Also keeps the counter column names below to known values.
+        raise ValueError(f"Invalid reaction type '{reaction_type}'.")
+    if connection.vendor != "postgresql":
+        return _toggle_orm(comment_id, user_id, reaction_type)
+    return _toggle_postgresql(comment_id, user_id, reaction_type)
+
+
+def _toggle_postgresql(comment_id, user_id, reaction_type):
+    reactions = connection.ops.quote_name(CommentReaction._meta.db_table)
+    comments = connection.ops.quote_name(Comment._meta.db_table)
+    params = {"comment": comment_id, "user": user_id, "type": reaction_type, "now": timezone.now()}
+    assignments = []
+    columns = []
+    for index, choice in enumerate(REACTION_TYPES):
+        column = connection.ops.quote_name(Comment.reaction_field(choice))
+        params[f"type_{index}"] = choice
+        assignments.append(
+            f"{column} = {column} + COALESCE((SELECT SUM(delta) FROM changes WHERE type = %(type_{index})s), 0)"
+        )
+        columns.append(column)
+    total = connection.ops.quote_name("reaction_count")
+
+    # The INSERT does not conflict with the row the DELETE removes in the same
+    # statement, so replacing a reaction of another type is one round trip too.
+    sql = f"""
+        WITH removed AS (
+            DELETE FROM {reactions} WHERE comment_id = %(comment)s AND user_id = %(user)s RETURNING type
+        ),
+        added AS (
+            INSERT INTO {reactions} (comment_id, user_id, type, created_at)
+            SELECT %(comment)s, %(user)s, %(type)s, %(now)s
+            WHERE NOT EXISTS (SELECT 1 FROM removed WHERE type = %(type)s)
+            ON CONFLICT DO NOTHING RETURNING type
+        ),
+        changes AS (
+            SELECT type, -1 AS delta FROM removed UNION ALL SELECT type, 1 AS delta FROM added
+        ),
+        updated AS (
+            UPDATE {comments}
+            SET {", ".join(assignments)},
+                {total} = {total} + COALESCE((SELECT SUM(delta) FROM changes), 0)
+            WHERE id = %(comment)s
+            RETURNING {", ".join(columns)}
+        )
+        SELECT (SELECT COUNT(*) FROM added), (SELECT type FROM removed), updated.* FROM updated
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        raise Comment.DoesNotExist(f"Comment {comment_id} does not exist.")
+    added, removed, *counts = row
+    # Neither added nor removed: a concurrent tap by the same user inserted it first.
+    reacted = bool(added) or removed != reaction_type
+    return CommentReactionResult(comment_id, reaction_type, reacted, _counts(counts))
+
+
+def _toggle_orm(comment_id, user_id, reaction_type):
+    with transaction.atomic():
+        existing = CommentReaction.objects.select_for_update().filter(comment_id=comment_id, user_id=user_id).first()
+        if existing is not None:
+            existing.delete()
+        reacted = existing is None or existing.type != reaction_type
+        if reacted:
+            CommentReaction.objects.create(comment_id=comment_id, user_id=user_id, type=reaction_type)
+        fields = [Comment.reaction_field(choice) for choice in REACTION_TYPES]
+        counts = Comment.objects.filter(pk=comment_id).values_list(*fields).get()
+    return CommentReactionResult(comment_id, reaction_type, reacted, _counts(counts))
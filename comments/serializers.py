@@ -4,18 +4,41 @@ from users.serializers import UserProfileSerializer # To display author info
 
 class CommentSerializer(serializers.ModelSerializer):
     author = UserProfileSerializer(read_only=True) # Embed author details
+    reaction_counts = serializers.SerializerMethodField()
+    user_reaction = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ['id', 'post', 'author', 'content', 'reactions', 'ai_moderation_feedback', 'created_at', 'updated_at']
-        read_only_fields = ['author', 'reactions', 'ai_moderation_feedback', 'created_at', 'updated_at']
+        fields = [
+            'id', 'post', 'parent', 'depth', 'reply_count', 'author', 'content', 'reaction_counts', 'user_reaction',
+            'ai_moderation_feedback', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['author', 'reply_count', 'ai_moderation_feedback', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        if self.instance is not None:
+            # A comment stays where it was posted in its thread.
+            attrs.pop('parent', None)
+        parent = attrs.get('parent')
+        if parent is not None and 'post' in attrs and parent.post_id != attrs['post'].pk:
+            raise serializers.ValidationError({'parent': 'The parent comment belongs to another post.'})
+        return attrs
+
+    def get_reaction_counts(self, obj):
+        return obj.reaction_counts()
+
+    def get_user_reaction(self, obj):
+        # Annotated by CommentViewSet.get_queryset; fall back to a lookup elsewhere.
+        if hasattr(obj, 'viewer_reaction'):
+            return obj.viewer_reaction
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return obj.reaction_rows.filter(user=request.user).values_list('type', flat=True).first()
+        return None
 
     def create(self, validated_data):
         # The author will be automatically set by the view based on the authenticated user
         validated_data['author'] = self.context['request'].user
-        comment = Comment.objects.create(**validated_data)
-        # TODO: Trigger AI moderation for comments here (e.g., async task)
-        # For now, set a placeholder moderation status
-        comment.ai_moderation_feedback = {"status": "pending", "reason": "Awaiting moderation"}
-        comment.save()
-        return comment
\ No newline at end of file
+        # Saving a new comment queues it for AI moderation (see moderation.queue)
+        validated_data['ai_moderation_feedback'] = {"status": "pending", "reason": "Awaiting moderation"}
+        return Comment.objects.create(**validated_data)
\ No newline at end of file
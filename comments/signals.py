@@ -0,0 +1,38 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts import related, trending
+from posts.models import PostStats
+
+from . import reactions
+from .models import Comment, CommentReaction
+
+
+@receiver(post_save, sender=Comment)
+def comment_added(sender, instance, created, **kwargs):
+    if created:
+        PostStats.objects.bump(instance.post_id, comment_count=1)
+        if instance.parent_id:
+            Comment.objects.filter(pk=instance.parent_id).update(reply_count=F("reply_count") + 1)
+        trending.record_event(instance.post_id, "comment", instance.created_at)
+        related.mark_stale([instance.post_id])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_removed(sender, instance, **kwargs):
+    PostStats.objects.bump(instance.post_id, comment_count=-1)
+    if instance.parent_id:
+        Comment.objects.filter(pk=instance.parent_id).update(reply_count=F("reply_count") - 1)
+    related.mark_stale([instance.post_id])
+
+
+@receiver(post_save, sender=CommentReaction)
+def comment_reaction_added(sender, instance, created, **kwargs):
+    if created:
+        reactions.bump(instance.comment_id, instance.type, 1)
+
+
+@receiver(post_delete, sender=CommentReaction)
+def comment_reaction_removed(sender, instance, **kwargs):
+    reactions.bump(instance.comment_id, instance.type, -1)
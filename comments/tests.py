@@ -1,3 +1,248 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from moderation.models import ModerationJob
+from posts.models import Post
+from users.models import User
+from . import reactions, threads
+from .models import Comment, CommentReaction
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class CommentAPITests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password123",
+        )
+        self.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="password123",
+        )
+        self.post = Post.objects.create(title="Hope", content="Hope does not disappoint.", author=self.author)
+        self.list_url = reverse("comment-list")
+
+    def test_create_comment_is_queued_for_moderation(self):
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.post(
+            self.list_url,
+            {"post": self.post.id, "content": "Amen!"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["ai_moderation_feedback"]["status"], "pending")
+        self.assertTrue(ModerationJob.objects.filter(object_id=str(response.data["id"])).exists())
+
+    def test_flagged_comments_are_only_visible_to_their_author(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, content="Rude words")
+        comment.apply_moderation_result({"flagged": True, "categories": ["harassment"], "notes": ""})
+
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(self.list_url, {"post_id": self.post.id})
+        self.assertEqual(len(response.data["results"]), 0)
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(self.list_url, {"post_id": self.post.id})
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_pending_and_legacy_comments_stay_visible(self):
+        pending = Comment.objects.create(post=self.post, author=self.author, content="Praying")
+        legacy = Comment.objects.create(post=self.post, author=self.author, content="Amen")
+        Comment.objects.filter(pk=pending.pk).update(ai_moderation_feedback={"status": "pending"})
+        Comment.objects.filter(pk=legacy.pk).update(ai_moderation_feedback={})
+
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(self.list_url, {"post_id": self.post.id})
+        self.assertEqual({item["id"] for item in response.data["results"]}, {pending.pk, legacy.pk})
+
+
+    def test_edited_comment_waits_for_its_own_verdict(self):
+        clean = Comment.objects.create(post=self.post, author=self.author, content="Amen")
+        clean.apply_moderation_result({"flagged": False, "categories": [], "notes": ""})
+        rude = Comment.objects.create(post=self.post, author=self.author, content="Rude words")
+        rude.apply_moderation_result({"flagged": True, "categories": ["harassment"], "notes": ""})
+        ModerationJob.objects.all().delete()
+
+        for comment in (clean, rude):
+            comment = Comment.objects.get(pk=comment.pk)
+            comment.content += ", edited"
+            comment.save()
+
+        clean.refresh_from_db()
+        rude.refresh_from_db()
+        self.assertEqual(clean.ai_moderation_feedback, {"status": "pending"})
+        self.assertEqual(rude.ai_moderation_feedback, {"status": "pending", "flagged": True})
+        self.assertEqual(ModerationJob.objects.count(), 2)
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(self.list_url, {"post_id": self.post.id})
+        self.assertEqual([item["id"] for item in response.data["results"]], [clean.pk])
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class CommentReactionTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="password123")
+        self.reader = User.objects.create_user(username="reader", password="password123")
+        self.post = Post.objects.create(title="Hope", content="...", author=self.author, status="published")
+        self.comment = Comment.objects.create(post=self.post, author=self.author, content="Amen!")
+        self.comment.apply_moderation_result({"flagged": False, "categories": [], "notes": ""})
+        self.url = reverse("comment-react", args=[self.comment.pk])
+
+    def test_toggle_adds_replaces_and_removes(self):
+        self.client.force_authenticate(user=self.reader)
+        reactions.toggle_reaction(self.comment.pk, self.author.pk, "amen")
+
+        response = self.client.post(self.url, {"type": "pray"})
+        self.assertEqual((response.data["reacted"], response.data["reaction_counts"]), (True, {"pray": 1, "amen": 1}))
+        response = self.client.post(self.url, {"type": "amen"})
+        self.assertEqual(response.data["reaction_counts"], {"amen": 2})
+        response = self.client.post(self.url, {"type": "amen"})
+        self.assertEqual((response.data["reacted"], response.data["reaction_counts"]), (False, {"amen": 1}))
+
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.amen_count, self.comment.reaction_count), (1, 1))
+        self.assertEqual(CommentReaction.objects.count(), 1)
+
+    def test_toggle_is_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = reactions.toggle_reaction(self.comment.pk, self.reader.pk, "heart")
+        self.assertEqual(result.counts, {"heart": 1})
+        if connection.vendor == "postgresql":
+            self.assertEqual(len(queries), 1)
+
+    def test_invalid_type_is_rejected(self):
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.post(self.url, {"type": "shrug"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_shows_counts_and_viewer_reaction(self):
+        reactions.toggle_reaction(self.comment.pk, self.reader.pk, "pray")
+        self.client.force_authenticate(user=self.reader)
+
+        item = self.client.get(reverse("comment-list"), {"post_id": self.post.pk}).data["results"][0]
+        self.assertEqual((item["reaction_counts"], item["user_reaction"]), ({"pray": 1}, "pray"))
+
+    def test_saving_a_stale_comment_keeps_counters(self):
+        stale = Comment.objects.get(pk=self.comment.pk)
+        reactions.toggle_reaction(self.comment.pk, self.reader.pk, "pray")
+
+        stale.content = "Amen and amen!"
+        stale.save()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.content, self.comment.pray_count), ("Amen and amen!", 1))
+
+    def test_deleting_rows_keeps_counters_in_step(self):
+        reactions.toggle_reaction(self.comment.pk, self.reader.pk, "pray")
+        self.reader.delete()
+
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.pray_count, self.comment.reaction_count), (0, 0))
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class ConcurrentCommentReactionTests(TransactionTestCase):
+    # SQLite locks the whole table instead, so concurrent writers fail there.
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_concurrent_toggles_lose_no_counts(self):
+        author = User.objects.create_user(username="author", password="password123")
+        post = Post.objects.create(title="Hope", content="...", author=author, status="published")
+        comment = Comment.objects.create(post=post, author=author, content="Amen!")
+        users = [User.objects.create_user(username=f"reader{index}", password="password123") for index in range(8)]
+
+        def react(user):
+            try:
+                return reactions.toggle_reaction(comment.pk, user.pk, "amen")
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(react, users))
+
+        comment.refresh_from_db()
+        self.assertEqual((comment.amen_count, comment.reaction_count), (8, 8))
+
+
+@override_settings(MODERATION_BACKEND="stub", COMMENT_MAX_DEPTH=2)
+class CommentThreadTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="password123")
+        self.post = Post.objects.create(title="Hope", content="...", author=self.author, status="published")
+        self.client.force_authenticate(user=self.author)
+        # first
+        # ├── reply
+        # │   └── nested
+        # │       └── (too deep: attached to reply)
+        # └── second reply
+        # second
+        self.first = self._comment("First")
+        self.reply = self._comment("Reply", self.first)
+        self.nested = self._comment("Nested", self.reply)
+        self.too_deep = self._comment("Too deep", self.nested)
+        self.second_reply = self._comment("Second reply", self.first)
+        self.second = self._comment("Second")
+
+    def _comment(self, content, parent=None):
+        comment = Comment.objects.create(post=self.post, author=self.author, content=content, parent=parent)
+        comment.refresh_from_db()
+        return comment
+
+    def _ids(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_paths_depths_and_reply_counts(self):
+        self.assertEqual(self.nested.path, threads.make_path(threads.make_path(self.first.path, self.reply.pk), self.nested.pk))
+        self.assertEqual((self.first.depth, self.reply.depth, self.nested.depth), (0, 1, 2))
+        self.assertEqual((self.too_deep.parent_id, self.too_deep.depth), (self.reply.pk, 2))
+        self.first.refresh_from_db()
+        self.reply.refresh_from_db()
+        self.assertEqual((self.first.reply_count, self.reply.reply_count), (2, 2))
+
+    def test_threaded_listing_is_depth_first_and_pages_by_path(self):
+        url = reverse("comment-list")
+        expected = [self.first.pk, self.reply.pk, self.nested.pk, self.too_deep.pk, self.second_reply.pk, self.second.pk]
+
+        response = self.client.get(url, {"post_id": self.post.pk, "threaded": "true", "page_size": 4})
+        self.assertEqual(self._ids(response), expected[:4])
+        self.assertEqual(self._ids(self.client.get(response.data["next"])), expected[4:])
+
+    def test_first_replies_per_top_level_comment(self):
+        response = self.client.get(
+            reverse("comment-list"), {"post_id": self.post.pk, "threaded": "1", "replies": 2}
+        )
+
+        self.assertEqual(self._ids(response), [self.first.pk, self.second.pk])
+        replies = [[reply["id"] for reply in item["replies"]] for item in response.data["results"]]
+        self.assertEqual(replies, [[self.reply.pk, self.nested.pk], []])
+
+    def test_thread_of_a_comment_pages_through_its_subtree(self):
+        response = self.client.get(reverse("comment-thread", args=[self.reply.pk]), {"page_size": 1})
+
+        self.assertEqual(self._ids(response), [self.nested.pk])
+        self.assertEqual(self._ids(self.client.get(response.data["next"])), [self.too_deep.pk])
+        # A bounded range on the (post, path) index, not a prefix match.
+        sql = str(Comment.objects.filter(threads.subtree(self.reply.path), post=self.post).query)
+        self.assertNotIn("LIKE", sql)
+        self.assertEqual(threads.successor("00000000010000000009"), "00000000010000000010")
+
+    def test_reply_must_belong_to_the_same_post(self):
+        other = Post.objects.create(title="Other", content="...", author=self.author, status="published")
+        response = self.client.post(
+            reverse("comment-list"), {"post": other.pk, "parent": self.first.pk, "content": "Hi"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            reverse("comment-list"), {"post": self.post.pk, "parent": self.second.pk, "content": "Hi"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["depth"], 1)
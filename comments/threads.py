@@ -0,0 +1,66 @@
+"""Materialized paths for threaded comments.
+
+A comment's ``path`` is its ancestors' primary keys followed by its own, each
+zero-padded to ``SEGMENT_WIDTH`` digits with no separator, e.g.
+``00000000120000000345`` for comment 345 replying to 12. Ordering by path lists
+a post's comments depth first, every reply right after its parent and siblings
+oldest first, and a comment's whole subtree is the contiguous range
+``[path, successor(path))``. Paths are digits only, so that range is the same
+under any database collation and the ``(post, path)`` index serves it as one
+range scan.
+"""
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber, Substr
+
+SEGMENT_WIDTH = 10
+
+
+def segment(pk):
+    return str(pk).zfill(SEGMENT_WIDTH)
+
+
+def make_path(parent_path, pk):
+    return f"{parent_path or ''}{segment(pk)}"
+
+
+def root_id(path):
+    """Primary key of the top-level comment of the thread ``path`` belongs to."""
+
+    return int(path[:SEGMENT_WIDTH])
+
+
+def successor(path):
+    """The smallest path of the same length that does not start with ``path``."""
+
+    return str(int(path) + 1).zfill(len(path))
+
+
+def subtree(path, include_self=False):
+    """``Q`` matching the descendants of the comment at ``path``."""
+
+    lower = Q(path__gte=path) if include_self else Q(path__gt=path)
+    return lower & Q(path__lt=successor(path))
+
+
+def first_replies(queryset, roots, limit):
+    """The first ``limit`` replies, in thread order, under each of ``roots``.
+
+    ``roots`` are consecutive top-level comments of one post in path order, so
+    all their replies lie in one range of the ``(post, path)`` index; a window
+    numbers the replies of each thread and keeps the first ``limit``.
+    """
+
+    if not roots:
+        return queryset.none()
+    return (
+        queryset.filter(post_id=roots[0].post_id, depth__gt=0)
+        .filter(path__gt=roots[0].path, path__lt=successor(roots[-1].path))
+        .annotate(
+            thread_position=Window(
+                RowNumber(), partition_by=[Substr("path", 1, SEGMENT_WIDTH)], order_by=F("path").asc()
+            )
+        )
+        .filter(thread_position__lte=limit)
+        .order_by("path")
+    )
@@ -1,9 +1,14 @@
+from collections import defaultdict
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
-from .models import Comment
+from django.db import models
+from . import reactions, threads
+from .models import Comment, CommentReaction
 from .serializers import CommentSerializer
+from moderation.visibility import flagged
 from posts.models import Post # To link comments to posts
 from posts.permissions import IsAuthorOrReadOnly
 
@@ -13,15 +18,75 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    cursor_ordering = ('created_at', 'id')
 
     def get_queryset(self):
         # Allow filtering comments by post_id
         queryset = super().get_queryset()
+        user = self.request.user
+        if not (user.is_authenticated and user.is_staff):
+            # Hide comments the moderator flagged from everyone but their author
+            hidden = flagged()
+            if user.is_authenticated:
+                hidden &= ~models.Q(author=user)
+            queryset = queryset.exclude(hidden)
         post_id = self.request.query_params.get('post_id')
         if post_id:
             queryset = queryset.filter(post_id=post_id)
+        if user.is_authenticated:
+            # The viewer's own reaction, in the same query as the page.
+            queryset = queryset.annotate(
+                viewer_reaction=models.Subquery(
+                    CommentReaction.objects.filter(comment=models.OuterRef('pk'), user=user).values('type')[:1]
+                )
+            )
         return queryset
 
+    def get_cursor_ordering(self):
+        # Threaded listings page through the (post, path) index.
+        if self.action == 'thread' or (self.action == 'list' and self._threaded()):
+            return ('path',)
+        return self.cursor_ordering
+
+    def _threaded(self):
+        return self.request.query_params.get('threaded') in ('1', 'true')
+
+    def list(self, request, *args, **kwargs):
+        # ?post_id=1&threaded=true lists the post's comments depth first;
+        # adding &replies=N pages through top-level comments instead, each with
+        # its first N replies.
+        if not self._threaded():
+            return super().list(request, *args, **kwargs)
+        if not request.query_params.get('post_id'):
+            return Response({'detail': 'post_id is required for threaded listings.'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.get_queryset()
+        replies_param = request.query_params.get('replies')
+        if replies_param is None:
+            page = self.paginate_queryset(queryset)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        try:
+            limit = min(max(int(replies_param), 0), 50)
+        except ValueError:
+            return Response({'detail': 'replies must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        page = self.paginate_queryset(queryset.filter(depth=0))
+        replies = defaultdict(list)
+        if limit:
+            for reply in threads.first_replies(queryset, page, limit):
+                replies[threads.root_id(reply.path)].append(reply)
+        data = self.get_serializer(page, many=True).data
+        for item, comment in zip(data, page):
+            item['replies'] = self.get_serializer(replies[comment.pk], many=True).data
+        return self.get_paginated_response(data)
+
+    @action(detail=True, methods=['get'])
+    def thread(self, request, pk=None):
+        # Every reply below the comment, depth first, as one index range scan.
+        comment = self.get_object()
+        queryset = self.get_queryset().filter(threads.subtree(comment.path), post_id=comment.post_id)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
     def perform_create(self, serializer):
         # Ensure post_id is provided and valid
         post_id = self.request.data.get('post') # 'post' field from request body
@@ -42,22 +107,26 @@ class CommentViewSet(viewsets.ModelViewSet):
         if not reaction_type:
             return Response({'detail': 'Reaction type is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update reactions JSONField
-        reactions = comment.reactions or {}
-        user_id = str(request.user.id)
+        # Toggles one CommentReaction row and the comment's counters in place
+        # (see comments/reactions.py); reacting with another type replaces it.
+        try:
+            result = reactions.toggle_reaction(comment.pk, request.user.pk, reaction_type)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if user_id in reactions and reactions[user_id] == reaction_type:
-            # User already reacted with this type, so remove it (toggle off)
-            del reactions[user_id]
-            message = f'Reaction "{reaction_type}" removed.'
-        else:
-            # Add or change reaction
-            reactions[user_id] = reaction_type
+        if result.reacted:
             message = f'Reaction "{reaction_type}" added.'
-
-        comment.reactions = reactions
-        comment.save()
-        return Response({'detail': message, 'reactions': comment.reactions}, status=status.HTTP_200_OK)
+        else:
+            message = f'Reaction "{reaction_type}" removed.'
+        return Response(
+            {
+                'detail': message,
+                'reacted': result.reacted,
+                'reaction_counts': result.counts,
+                'user_reaction': reaction_type if result.reacted else None,
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def moderation_feedback(self, request, pk=None):
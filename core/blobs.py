@@ -0,0 +1,154 @@
+"""Content-addressed storage bookkeeping.
+
+Uploads are stored once per namespace and SHA-256 under
+``<prefix>/<aa>/<sha256><ext>``. ``store`` looks the hash up first, so
+re-uploading bytes that are already stored costs one hash (computed while the
+request streamed in, see salt_and_light/upload_handlers.py) and one row lookup.
+
+``ref_count`` is the number of rows using a blob: posts whose ``image_url`` is
+the blob's URL and ``files.File`` rows. ``release`` deletes the object once the
+last reference goes. A post image has no references between its upload and the
+post that uses it, so each upload leases the blob instead (``leased_until``):
+until the lease ends it is kept without references, and ``prune`` (run by
+``manage.py prune_blobs``) deletes it afterwards if it is still unused.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core import metrics
+from salt_and_light.storage import content_hash
+
+from .models import StoredBlob
+
+logger = logging.getLogger(__name__)
+
+POST_IMAGES = "post-images"
+FILES = "files"
+
+
+def blob_path(prefix, digest, extension=""):
+    return f"{prefix}/{digest[:2]}/{digest}{extension}"
+
+
+def store(namespace, fileobj, prefix, extension, content_type, save, url_for=None, references=0, lease=0):
+    """Return ``(blob, created)`` for ``fileobj``'s content, adding ``references``.
+
+    ``save(path)`` stores the bytes and returns the path it used (or None for
+    ``path``); it is only called for content not stored before. ``url_for(path)``
+    gives the blob's public URL. ``lease`` seconds from now the blob is kept
+    even without references, whether it is new or was stored before.
+    """
+
+    digest = content_hash(fileobj)
+    leased_until = timezone.now() + timedelta(seconds=lease) if lease else None
+    blob = _existing(namespace, digest, references, leased_until)
+    if blob is not None:
+        metrics.incr("core.blobs.deduplicated")
+        return blob, False
+
+    path = blob_path(prefix, digest, extension)
+    try:
+        path = save(path) or path
+    except Exception:
+        # A concurrent upload of the same bytes may have stored it first.
+        blob = _existing(namespace, digest, references, leased_until)
+        if blob is None:
+            raise
+        return blob, False
+
+    try:
+        with transaction.atomic():
+            blob = StoredBlob.objects.create(
+                namespace=namespace,
+                sha256=digest,
+                path=path,
+                url=url_for(path) if url_for else "",
+                size=fileobj.size,
+                content_type=content_type or "",
+                ref_count=references,
+                leased_until=leased_until,
+            )
+    except IntegrityError:
+        return _existing(namespace, digest, references, leased_until), False
+    return blob, True
+
+
+def _existing(namespace, digest, references, leased_until=None):
+    blobs = StoredBlob.objects.filter(namespace=namespace, sha256=digest)
+    changes = {}
+    if references:
+        changes["ref_count"] = F("ref_count") + references
+    if leased_until is not None:
+        changes["leased_until"] = Greatest(Coalesce("leased_until", leased_until), leased_until)
+    if changes and not blobs.update(**changes):
+        return None
+    return blobs.first()
+
+
+def retain_url(namespace, url):
+    """Add a reference to the blob served at ``url``; False if there is none."""
+
+    if not url:
+        return False
+    return bool(StoredBlob.objects.filter(namespace=namespace, url=url).update(ref_count=F("ref_count") + 1))
+
+
+def release_url(namespace, url, delete):
+    if not url:
+        return False
+    return _release(StoredBlob.objects.filter(namespace=namespace, url=url), delete)
+
+
+def release(blob_id, delete):
+    """Drop a reference; on the last one, delete the row and, after commit, the object via ``delete(path)``."""
+
+    return _release(StoredBlob.objects.filter(pk=blob_id), delete)
+
+
+def prune(namespace, delete, lease):
+    """Delete ``namespace``'s unreferenced blobs whose lease has ended; returns how many.
+
+    Blobs stored before leases existed count as leased for ``lease`` seconds
+    after their upload.
+    """
+
+    now = timezone.now()
+    expired = Q(leased_until__lt=now) | Q(leased_until__isnull=True, created_at__lt=now - timedelta(seconds=lease))
+    unused = StoredBlob.objects.filter(namespace=namespace, ref_count=0).filter(expired)
+    pruned = 0
+    for blob_id in list(unused.values_list("pk", flat=True)):
+        # Re-checked under the row lock: a post may have taken it meanwhile.
+        pruned += _release(unused.filter(pk=blob_id), delete)
+    return pruned
+
+
+def _release(blobs, delete):
+    with transaction.atomic():
+        blob = blobs.select_for_update().first()
+        if blob is None:
+            return False
+        if blob.ref_count > 1:
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+            return False
+        if blob.leased_until is not None and blob.leased_until > timezone.now():
+            # Just uploaded again: keep it for the post the uploader is creating.
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=0)
+            return False
+        blob.delete()
+
+    path = blob.path
+
+    def delete_object():
+        try:
+            delete(path)
+        except Exception as exc:
+            logger.warning("Could not delete unreferenced blob %s: %s", path, exc)
+
+    transaction.on_commit(delete_object)
+    return True
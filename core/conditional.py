@@ -0,0 +1,95 @@
+"""Conditional GET support for viewsets.
+
+``ConditionalGetMixin`` gives ``list`` and ``retrieve`` weak ETags computed
+from a few version fields per object (see ``get_etag_parts``) plus the viewer,
+the response format and the request's path and query string. The page or object
+is still loaded, but a matching ``If-None-Match`` answers 304 before any
+serializer runs. ``retrieve`` also sends ``Last-Modified`` for
+``If-Modified-Since``; lists do not, since a row leaving the page (deleted,
+unpublished) changes a list without raising its latest ``updated_at``.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    def get_etag_parts(self, obj):
+        """Values that change whenever ``obj``'s representation does."""
+
+        return (obj.pk, obj.updated_at)
+
+    def get_last_modified(self, obj):
+        return obj.updated_at
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = list(page if page is not None else queryset)
+        links = ()
+        if page is not None:
+            links = (self.paginator.get_next_link(), self.paginator.get_previous_link())
+
+        etag, _ = self.get_validators(objects, *links)
+        not_modified = self.evaluate_conditions(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        return self.set_validators(response, etag, None)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(request, self.get_object())
+
+    def conditional_retrieve(self, request, instance):
+        etag, last_modified = self.get_validators([instance])
+        not_modified = self.evaluate_conditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), etag, last_modified)
+
+    def get_validators(self, objects, *extra):
+        """``(weak ETag, Last-Modified timestamp or None)`` for a response listing ``objects``."""
+
+        renderer = getattr(self.request, "accepted_renderer", None)
+        digest = hashlib.sha1()
+        # The full path carries ?fields=, ?view=, ?size= and the like, which
+        # change the representation of the same objects.
+        parts = (self.request.user.pk, getattr(renderer, "format", ""), self.request.get_full_path(), *extra)
+        for part in parts:
+            digest.update(repr(part).encode("utf-8"))
+        for obj in objects:
+            digest.update(repr(self.get_etag_parts(obj)).encode("utf-8"))
+        modified = [value for value in map(self.get_last_modified, objects) if value is not None]
+        last_modified = int(max(modified).timestamp()) if modified else None
+        return f"W/{quote_etag(digest.hexdigest())}", last_modified
+
+    def evaluate_conditions(self, request, etag, last_modified):
+        """A 304 (or 412) response if the request's preconditions say so, else None."""
+
+        result = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if result is None:
+            return None
+        response = Response(status=result.status_code)
+        if result.status_code == status.HTTP_304_NOT_MODIFIED:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # Representations include viewer-specific fields.
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
@@ -0,0 +1,31 @@
+"""
+Django management command that deletes uploaded objects no post or file uses
+once their upload lease (BLOB_UPLOAD_LEASE_SECONDS) has ended; meant to run
+periodically, e.g.:
+
+    python manage.py prune_blobs
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core import blobs
+from posts.signals import _delete_post_image
+
+DELETERS = {
+    blobs.POST_IMAGES: _delete_post_image,
+    blobs.FILES: default_storage.delete,
+}
+
+
+class Command(BaseCommand):
+    help = 'Deletes unreferenced uploads whose lease has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lease', type=int, default=None,
+                            help='Seconds an upload is kept without references (default BLOB_UPLOAD_LEASE_SECONDS).')
+
+    def handle(self, *args, **options):
+        lease = options['lease'] if options['lease'] is not None else settings.BLOB_UPLOAD_LEASE_SECONDS
+        pruned = sum(blobs.prune(namespace, delete, lease) for namespace, delete in DELETERS.items())
+        self.stdout.write(self.style.SUCCESS(f'Deleted {pruned} unreferenced blob(s)'))
@@ -0,0 +1,30 @@
+"""Lightweight named counters kept in the Django cache.
+
+Counters are shared between processes only when a shared cache backend
+(memcached, redis, ...) is configured; with the default local-memory cache they
+are per process.
+"""
+
+from django.core.cache import cache
+
+KEY_PREFIX = "metrics:"
+
+
+def incr(name: str, delta: int = 1) -> None:
+    key = f"{KEY_PREFIX}{name}"
+    # add() is a no-op when the key exists, so concurrent first increments are safe.
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, delta, timeout=None)
+
+
+def get_counters(*names: str) -> dict:
+    values = cache.get_many([f"{KEY_PREFIX}{name}" for name in names])
+    return {name: int(values.get(f"{KEY_PREFIX}{name}", 0)) for name in names}
+
+
+def reset(*names: str) -> None:
+    cache.delete_many([f"{KEY_PREFIX}{name}" for name in names])
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_stored_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,40 @@
 from django.db import models
 
-# Create your models here.
+
+class ImageDerivativeSet(models.Model):
+    """Resized derivatives of one uploaded image (see salt_and_light/images.py).
+
+    Derivatives are stored by content hash, so uploads of the same bytes share
+    them; ``source_url`` maps each upload's URL back to its set.
+    """
+
+    source_url = models.URLField(max_length=1024, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    variants = models.JSONField(default=dict, blank=True)  # e.g., {"thumb": "https://..."}
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.source_url
+
+
+class StoredBlob(models.Model):
+    """One stored object per distinct content (see core/blobs.py)."""
+
+    namespace = models.CharField(max_length=32)  # e.g., "post-images", "files"
+    sha256 = models.CharField(max_length=64)
+    path = models.CharField(max_length=512)
+    url = models.URLField(max_length=1024, blank=True, db_index=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=255, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    # Kept without references until then; see blobs.store(lease=...).
+    leased_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["namespace", "sha256"], name="unique_blob_content"),
+        ]
+
+    def __str__(self):
+        return f"{self.namespace}:{self.path} ({self.ref_count} refs)"
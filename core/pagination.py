@@ -0,0 +1,237 @@
+"""Keyset (cursor) pagination.
+
+Pages are fetched with ``WHERE (ordering columns) beyond (last row seen)``
+instead of ``OFFSET``, so every page costs the same index range scan however
+deep a client scrolls. Views choose the ordering by setting ``cursor_ordering``
+or defining ``get_cursor_ordering()``; otherwise the queryset's own ordering is
+used. The primary key is always appended as a tie-breaker, and every ordering
+column must be non-null. Cursors are opaque base64-encoded JSON.
+"""
+
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(json.JSONEncoder):
+    # Unlike DjangoJSONEncoder this keeps microseconds: a cursor truncated to
+    # milliseconds would skip rows sharing the truncated timestamp.
+    def default(self, o):
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+
+        cursor = self.decode_cursor(request)
+        self.has_cursor = cursor is not None
+        self.reverse = bool(cursor and cursor.get("r"))
+
+        ordering = [self._flip(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self._after(ordering, cursor["v"]))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE or 20
+        return min(max(requested, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        if hasattr(view, "get_cursor_ordering"):
+            ordering = list(view.get_cursor_ordering())
+        elif getattr(view, "cursor_ordering", None):
+            ordering = list(view.cursor_ordering)
+        else:
+            ordering = [
+                field for field in (queryset.query.order_by or queryset.model._meta.ordering)
+                if isinstance(field, str)
+            ]
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip("-") in (pk_name, "pk") for field in ordering):
+            descending = ordering[-1].startswith("-") if ordering else False
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        return ordering
+
+    def get_next_link(self):
+        if self.reverse or self.has_more:
+            if not self.page:
+                return None
+            return self.encode_cursor(self.page[-1], reverse=False)
+        return None
+
+    def get_previous_link(self):
+        if (self.reverse and self.has_more) or (not self.reverse and self.has_cursor and self.page):
+            return self.encode_cursor(self.page[0], reverse=True)
+        return None
+
+    def encode_cursor(self, row, reverse):
+        values = [self._value(row, field.lstrip("-")) for field in self.ordering]
+        payload = {"v": values}
+        if reverse:
+            payload["r"] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, cls=CursorEncoder).encode("utf-8"))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token.decode("ascii"))
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+            values = payload["v"]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            payload["v"] = [
+                self._to_python(field.lstrip("-"), value) for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return payload
+
+    def _value(self, row, name):
+        if name == "pk":
+            return row.pk
+        return getattr(row, name)
+
+    def _output_field(self, name):
+        if name in self.annotations:
+            return self.annotations[name].output_field
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return self.model._meta.pk if name == "pk" else None
+
+    def _to_python(self, name, value):
+        field = self._output_field(name)
+        if field is None or value is None:
+            raise ValueError(name)
+        return field.to_python(value)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _after(ordering, values):
+        return keyset_filter(ordering, values)
+
+
+class WindowKeysetPagination(KeysetPagination):
+    """Keyset pagination for lists merged from several indexes.
+
+    The view's ``get_keyset_window(after, reverse, limit)`` returns the ordering
+    values of the next ``limit`` rows after the cursor ``after`` (None for the
+    first page), ending with the primary key, e.g. ``[(created_at, pk), ...]``;
+    the page is then loaded by primary key from the view's queryset.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+
+        cursor = self.decode_cursor(request)
+        self.has_cursor = cursor is not None
+        self.reverse = bool(cursor and cursor.get("r"))
+
+        window = view.get_keyset_window(cursor["v"] if cursor else None, self.reverse, self.page_size + 1)
+        self.has_more = len(window) > self.page_size
+        ids = [row[-1] for row in window[: self.page_size]]
+        rows = queryset.in_bulk(ids)
+        self.page = [rows[pk] for pk in ids if pk in rows]
+        if self.reverse:
+            self.page.reverse()
+        return self.page
+
+
+def keyset_filter(ordering, values):
+    """Rows strictly after ``values`` in ``ordering``.
+
+    Expands the row comparison into ``a > x OR (a = x AND b > y) ...`` and
+    adds the redundant ``a >= x`` so the planner can range-scan the index.
+    """
+
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    first = ordering[0]
+    bound = "lte" if first.startswith("-") else "gte"
+    return Q(**{f"{first.lstrip('-')}__{bound}": values[0]}) & condition
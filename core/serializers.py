@@ -0,0 +1,26 @@
+"""Serializer helpers shared across apps."""
+
+
+def _field_names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Lets GET requests trim the representation with ``?fields=a,b`` (keep
+    only those) and ``?omit=a,b`` (drop those).
+
+    Dropped fields are removed before serialization, so their getters and the
+    queries behind them never run. Applies to the serializer it is mixed into,
+    not to nested ones; unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = _field_names(request.query_params.get('fields'))
+        omitted = _field_names(request.query_params.get('omit'))
+        for name in list(self.fields):
+            if (requested and name not in requested) or name in omitted:
+                self.fields.pop(name)
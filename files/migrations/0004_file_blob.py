@@ -0,0 +1,20 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_stored_blobs'),
+        ('files', '0003_alter_file_file_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='core.storedblob'),
+        ),
+    ]
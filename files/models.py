@@ -1,4 +1,5 @@
 from django.db import models
+from core.models import StoredBlob
 from posts.models import Post
 from django.core.exceptions import ValidationError
 from django.db.models import JSONField # <--- CHANGE THIS LINE!
@@ -6,6 +7,9 @@ from django.db.models import JSONField # <--- CHANGE THIS LINE!
 class File(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='files', null=True, blank=True)
     file = models.FileField(upload_to='uploads/%Y/%m/%d/')
+    # Content-addressed storage shared by identical uploads (see core/blobs.py).
+    # Null for files uploaded before deduplication.
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, related_name='files', null=True, blank=True)
     #should be set to 50 if possible when migrations fail
     file_type = models.CharField(max_length=255, help_text="e.g., 'image/jpeg', 'application/pdf'")
     size = models.PositiveIntegerField(help_text="File size in bytes")
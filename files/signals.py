@@ -0,0 +1,16 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from core import blobs
+
+from .models import File
+
+
+@receiver(post_delete, sender=File)
+def file_deleted(sender, instance, **kwargs):
+    # Covers the API, the admin, queryset deletes and a post's cascade alike.
+    if instance.blob_id:
+        blob_id = instance.blob_id
+        transaction.on_commit(lambda: blobs.release(blob_id, delete=default_storage.delete))
@@ -1,3 +1,79 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import StoredBlob
+from posts.models import Post
+from users.models import User
+
+from . import views
+from .models import File
+
+
+class FileDeduplicationTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username="uploader", email="uploader@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, name):
+        document = SimpleUploadedFile(name, b"%PDF-1.4 weekly devotional", content_type="application/pdf")
+        return self.client.post(reverse("file-list"), {"file": document}, format="multipart")
+
+    def test_identical_files_share_one_blob(self):
+        first = self._upload("devotional.pdf")
+        second = self._upload("devotional-copy.pdf")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(set(File.objects.values_list("file", flat=True)), {blob.path})
+        path = os.path.join(self.media_root, blob.path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("file-detail", args=[first.data["id"]]))
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("file-detail", args=[second.data["id"]]))
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_deleting_a_post_releases_its_files_blob(self):
+        response = self._upload("devotional.pdf")
+        post = Post.objects.create(author=self.user, title="Notes", content="...")
+        File.objects.filter(pk=response.data["id"]).update(post=post)
+        path = os.path.join(self.media_root, StoredBlob.objects.get().path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+
+        self.assertFalse(File.objects.exists())
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_moderation_runs_outside_the_upload_transaction(self):
+        # Only the test case's own transactions may be open during the call.
+        depth = len(connection.savepoint_ids)
+
+        def moderate(path):
+            self.assertEqual(File.objects.count(), 1)
+            self.assertEqual(len(connection.savepoint_ids), depth)
+            return {"status": "ok", "reason": "checked"}
+
+        with patch.object(views, "moderate_pdf", side_effect=moderate):
+            response = self._upload("devotional.pdf")
+
+        self.assertEqual(response.data["ai_moderation"], {"status": "ok", "reason": "checked"})
+        self.assertEqual(File.objects.get().ai_moderation, {"status": "ok", "reason": "checked"})
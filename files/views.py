@@ -3,7 +3,10 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.http import FileResponse
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 import os
+from core import blobs
 from .models import File
 from .serializers import FileSerializer, FileUploadSerializer
 from posts.models import Post # Import Post model to link files
@@ -37,6 +40,7 @@ class FileViewSet(viewsets.ModelViewSet):
     queryset = File.objects.all()
     serializer_class = FileSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] # Allow anyone to view, only auth to upload/delete
+    cursor_ordering = ('-uploaded_at', '-id')
 
     def create(self, request, *args, **kwargs):
         serializer = FileUploadSerializer(data=request.data)
@@ -51,23 +55,38 @@ class FileViewSet(viewsets.ModelViewSet):
             except Post.DoesNotExist:
                 return Response({'detail': 'Post not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Save the file locally first
-        file_instance = File(post=post, file=uploaded_file, size=uploaded_file.size)
-        file_instance.file_type = uploaded_file.content_type
-        file_instance.save() # This saves the file to MEDIA_ROOT
+        # Stored once per content hash; identical uploads share the object and
+        # its moderation result.
+        extension = os.path.splitext(uploaded_file.name)[1].lower()
+        with transaction.atomic():
+            blob, created = blobs.store(
+                blobs.FILES,
+                uploaded_file,
+                'uploads/blobs',
+                extension,
+                uploaded_file.content_type,
+                save=lambda path: default_storage.save(path, uploaded_file),
+                references=1,
+            )
+            file_instance = File(post=post, blob=blob, size=uploaded_file.size)
+            file_instance.file.name = blob.path
+            file_instance.file_type = uploaded_file.content_type
+            previous = None if created else File.objects.filter(blob=blob).exclude(ai_moderation={}).first()
+            file_instance.save()
 
-        # Trigger AI moderation
-        file_path = file_instance.file.path
-        moderation_result = {}
-        if 'image' in file_instance.file_type:
-            moderation_result = moderate_image(file_path)
+        # Moderation calls out to a model, so it runs after the commit rather
+        # than holding the blob's row lock and a transaction open.
+        if previous is not None:
+            moderation_result = previous.ai_moderation
+        elif 'image' in file_instance.file_type:
+            moderation_result = moderate_image(file_instance.file.path)
         elif 'pdf' in file_instance.file_type:
-            moderation_result = moderate_pdf(file_path)
+            moderation_result = moderate_pdf(file_instance.file.path)
         else:
             moderation_result = {"status": "skipped", "reason": "Unsupported file type for AI moderation."}
 
         file_instance.ai_moderation = moderation_result
-        file_instance.save() # Update with moderation results
+        File.objects.filter(pk=file_instance.pk).update(ai_moderation=moderation_result)
 
         headers = self.get_success_headers(serializer.data)
         return Response(FileSerializer(file_instance).data, status=status.HTTP_201_CREATED, headers=headers)
@@ -89,9 +108,13 @@ class FileViewSet(viewsets.ModelViewSet):
         if file_instance.post and file_instance.post.author != request.user and not request.user.is_staff:
             return Response({'detail': 'You do not have permission to delete this file.'}, status=status.HTTP_403_FORBIDDEN)
 
+        if file_instance.blob_id:
+            # Shared with identical uploads; files/signals.py drops the reference.
+            return super().destroy(request, pk)
+
         # Delete the file from local storage
         file_path = file_instance.file.path
         if os.path.exists(file_path):
             os.remove(file_path)
 
-        return super().destroy(request, pk)
\ No newline at end of file
+        return super().destroy(request, pk)
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import ModerationCacheEntry, ModerationJob
+
+
+@admin.register(ModerationJob)
+class ModerationJobAdmin(admin.ModelAdmin):
+    list_display = ('content_type', 'object_id', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'content_type')
+    search_fields = ('object_id', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'created_at')
+
+
+@admin.register(ModerationCacheEntry)
+class ModerationCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'hit_count', 'created_at', 'last_used_at')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'result', 'hit_count', 'created_at', 'last_used_at')
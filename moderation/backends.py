@@ -0,0 +1,79 @@
+"""Moderators used by the moderation worker.
+
+Every moderator exposes ``moderate(content) -> dict`` returning the same shape as
+``posts.ai_moderate.ai_moderate_content`` (``flagged``, ``categories`` and ``notes``)
+and ``moderate_batch(contents) -> list`` returning one such dict per text.
+"""
+
+import time
+
+from django.conf import settings
+
+
+class GeminiModerator:
+    name = "gemini"
+
+    def moderate(self, content: str) -> dict:
+        # Imported lazily so the stub backend never configures the Gemini client.
+        from posts.ai_moderate import ai_moderate_content
+
+        return ai_moderate_content(content)
+
+    def moderate_batch(self, contents: list) -> list:
+        from posts.ai_moderate import ai_moderate_batch
+
+        return ai_moderate_batch(contents)
+
+
+class StubModerator:
+    """Deterministic offline moderator for tests and load testing.
+
+    Flags content containing any of ``MODERATION_STUB_FLAG_TERMS`` and can sleep
+    ``MODERATION_STUB_LATENCY_MS`` per call to mimic a remote model.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms=None, flag_terms=None):
+        if latency_ms is None:
+            latency_ms = settings.MODERATION_STUB_LATENCY_MS
+        if flag_terms is None:
+            flag_terms = settings.MODERATION_STUB_FLAG_TERMS
+        self.latency = max(latency_ms, 0) / 1000.0
+        self.flag_terms = [term.lower() for term in flag_terms if term]
+
+    def moderate(self, content: str) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._verdict(content)
+
+    def moderate_batch(self, contents: list) -> list:
+        # One simulated round trip per batch, like the Gemini backend.
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._verdict(content) for content in contents]
+
+    def _verdict(self, content: str) -> dict:
+        lowered = (content or "").lower()
+        matched = [term for term in self.flag_terms if term in lowered]
+        return {
+            "flagged": bool(matched),
+            "categories": ["stub"] if matched else [],
+            "notes": f"Stub moderator matched: {', '.join(matched)}" if matched else "Stub moderator: clean.",
+        }
+
+
+MODERATORS = {
+    GeminiModerator.name: GeminiModerator,
+    StubModerator.name: StubModerator,
+}
+
+
+def get_moderator(name=None):
+    """Return a moderator instance for ``name`` (defaults to ``MODERATION_BACKEND``)."""
+
+    name = name or settings.MODERATION_BACKEND
+    try:
+        return MODERATORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown moderation backend '{name}'. Choose from: {', '.join(MODERATORS)}.")
@@ -0,0 +1,115 @@
+"""Persistent moderation result cache.
+
+Verdicts are keyed by ``sha256(namespace + normalized content)`` where the
+namespace identifies the model and prompt version. Entries expire after
+``MODERATION_CACHE_TTL_SECONDS`` and the least recently used entries are evicted
+once the table grows past ``MODERATION_CACHE_MAX_ENTRIES``.
+"""
+
+import hashlib
+import itertools
+import re
+import unicodedata
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+
+from .models import ModerationCacheEntry
+
+HIT_COUNTER = "moderation.cache.hit"
+MISS_COUNTER = "moderation.cache.miss"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_writes = itertools.count(1)
+
+
+def normalize_content(content: str) -> str:
+    """Fold case, Unicode compatibility forms and whitespace runs."""
+
+    normalized = unicodedata.normalize("NFKC", content or "")
+    return _WHITESPACE_RE.sub(" ", normalized).strip().casefold()
+
+
+def content_key(content: str, namespace: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_content(content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _fresh_entries():
+    ttl = timedelta(seconds=settings.MODERATION_CACHE_TTL_SECONDS)
+    return ModerationCacheEntry.objects.filter(created_at__gte=timezone.now() - ttl)
+
+
+def lookup(content: str, namespace: str) -> Optional[dict]:
+    """Return a cached verdict for ``content`` or None, updating hit/miss counters."""
+
+    if not settings.MODERATION_CACHE_ENABLED:
+        return None
+
+    key = content_key(content, namespace)
+    result = _fresh_entries().filter(key=key).values_list("result", flat=True).first()
+    if result is None:
+        metrics.incr(MISS_COUNTER)
+        return None
+
+    metrics.incr(HIT_COUNTER)
+    ModerationCacheEntry.objects.filter(key=key).update(
+        hit_count=F("hit_count") + 1,
+        last_used_at=timezone.now(),
+    )
+    return result
+
+
+def store(content: str, namespace: str, result: dict) -> None:
+    if not settings.MODERATION_CACHE_ENABLED:
+        return
+
+    now = timezone.now()
+    ModerationCacheEntry.objects.bulk_create(
+        [ModerationCacheEntry(key=content_key(content, namespace), result=result, created_at=now, last_used_at=now)],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["result", "created_at", "last_used_at"],
+    )
+
+    if next(_writes) % settings.MODERATION_CACHE_PRUNE_EVERY == 0:
+        prune()
+
+
+def prune() -> dict:
+    """Drop expired entries, then evict least recently used ones above the size limit."""
+
+    ttl = timedelta(seconds=settings.MODERATION_CACHE_TTL_SECONDS)
+    expired, _ = ModerationCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - ttl
+    ).delete()
+
+    evicted = 0
+    excess = ModerationCacheEntry.objects.count() - settings.MODERATION_CACHE_MAX_ENTRIES
+    if excess > 0:
+        oldest = list(
+            ModerationCacheEntry.objects.order_by("last_used_at").values_list("key", flat=True)[:excess]
+        )
+        evicted, _ = ModerationCacheEntry.objects.filter(key__in=oldest).delete()
+
+    return {"expired": expired, "evicted": evicted}
+
+
+def stats() -> dict:
+    counters = metrics.get_counters(HIT_COUNTER, MISS_COUNTER)
+    hits, misses = counters[HIT_COUNTER], counters[MISS_COUNTER]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "entries": ModerationCacheEntry.objects.count(),
+    }
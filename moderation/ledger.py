@@ -0,0 +1,131 @@
+"""Moderation ledger: which content revision of which object has been moderated.
+
+Save paths consult the ledger so that re-saving unchanged content (API double
+saves, admin edits of other fields, shell scripts) never triggers another
+model call.
+"""
+
+from typing import Optional
+
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from core import metrics
+
+from .cache import content_key
+from .models import ModerationRecord
+
+AVOIDED_COUNTER = "moderation.ledger.avoided"
+ENQUEUED_COUNTER = "moderation.ledger.enqueued"
+REUSED_COUNTER = "moderation.ledger.reused"
+
+
+def revision_hash(content: str) -> str:
+    return content_key(content, "revision")
+
+
+def _records_for(obj):
+    return ModerationRecord.objects.filter(
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=str(obj.pk),
+    )
+
+
+def last_revision(obj) -> Optional[ModerationRecord]:
+    if obj.pk is None:
+        return None
+    return _records_for(obj).order_by("-moderated_at").first()
+
+
+def revision_changed(obj, loaded: Optional[str]) -> bool:
+    """Whether ``obj``'s moderation text differs from its last moderated revision.
+
+    Objects moderated before the ledger have no revision; their text is
+    compared with ``loaded``, the text as read from the database.
+    """
+
+    text = obj.get_moderation_text()
+    revision = last_revision(obj)
+    if revision is not None:
+        return revision.content_hash != revision_hash(text)
+    return text != loaded
+
+
+def pending_feedback(feedback) -> dict:
+    """Feedback for an edited revision awaiting its verdict.
+
+    A flagged object stays flagged (hidden) until the new verdict.
+    """
+
+    if (feedback or {}).get("flagged"):
+        return {"status": "pending", "flagged": True}
+    return {"status": "pending"}
+
+
+def find_revision(obj, digest: str) -> Optional[ModerationRecord]:
+    if obj.pk is None:
+        return None
+    return _records_for(obj).filter(content_hash=digest).first()
+
+
+def unchanged(queryset, field: str, digest: Optional[str]):
+    """``queryset`` narrowed to rows whose ``field`` still has revision ``digest``.
+
+    Returns None when the content was edited after that revision was moderated,
+    so the verdict is left for the edit's own job. A None ``digest`` leaves
+    ``queryset`` as is.
+    """
+
+    if digest is None:
+        return queryset
+    current = queryset.values_list(field, flat=True).first()
+    if current is None or revision_hash(current) != digest:
+        return None
+    # Compare-and-set: an edit racing this read fails the update instead.
+    return queryset.filter(**{field: current})
+
+
+def find_revisions(pairs) -> dict:
+    """Map (content_type_id, object_id, digest) -> result for already moderated revisions."""
+
+    wanted = set(pairs)
+    if not wanted:
+        return {}
+    records = ModerationRecord.objects.filter(
+        object_id__in={object_id for _, object_id, _ in wanted},
+        content_hash__in={digest for _, _, digest in wanted},
+    ).values_list("content_type_id", "object_id", "content_hash", "result")
+    return {
+        (content_type_id, object_id, digest): result
+        for content_type_id, object_id, digest, result in records
+        if (content_type_id, object_id, digest) in wanted
+    }
+
+
+def record_revisions(entries) -> None:
+    """Store (obj, digest, result) triples in the ledger."""
+
+    now = timezone.now()
+    ModerationRecord.objects.bulk_create(
+        [
+            ModerationRecord(
+                content_type=ContentType.objects.get_for_model(obj),
+                object_id=str(obj.pk),
+                content_hash=digest,
+                result=result,
+                moderated_at=now,
+            )
+            for obj, digest, result in entries
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def stats() -> dict:
+    counters = metrics.get_counters(AVOIDED_COUNTER, ENQUEUED_COUNTER, REUSED_COUNTER)
+    return {
+        "avoided": counters[AVOIDED_COUNTER],
+        "enqueued": counters[ENQUEUED_COUNTER],
+        "reused": counters[REUSED_COUNTER],
+        "revisions": ModerationRecord.objects.count(),
+    }
@@ -0,0 +1,76 @@
+"""
+Django management command that benchmarks the local moderation pre-filter on a
+synthetic corpus, e.g.:
+
+    python manage.py benchmark_prefilter --documents 200000 --words 80
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from moderation.prefilter import BLOCK, get_prefilter
+
+VOCABULARY = (
+    "grace peace faith hope love prayer church family blessing scripture psalm gospel "
+    "light salt mercy joy kindness patience community worship thanks morning evening "
+    "strength healing journey trust promise shepherd bread water vine harvest seed"
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Measures pre-filter throughput in microseconds per document'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=100000, help='Corpus size.')
+        parser.add_argument('--words', type=int, default=60, help='Average words per document.')
+        parser.add_argument('--blocked-ratio', type=float, default=0.02,
+                            help='Fraction of documents containing a blocklisted term.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        prefilter = get_prefilter()
+        build_ms = (time.perf_counter() - started) * 1000
+        blocked_terms = sorted(
+            pattern
+            for outputs in prefilter.matcher.outputs
+            for pattern, kind in outputs
+            if kind == BLOCK
+        ) or ['spam']
+
+        corpus = []
+        for _ in range(options['documents']):
+            length = max(1, int(rng.gauss(options['words'], options['words'] / 3)))
+            words = rng.choices(VOCABULARY, k=length)
+            if rng.random() < options['blocked_ratio']:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(blocked_terms))
+            corpus.append(' '.join(words))
+        total_chars = sum(len(document) for document in corpus)
+
+        decisions = {'flagged': 0, 'clean': 0, 'ambiguous': 0}
+        started = time.perf_counter()
+        for document in corpus:
+            verdict = prefilter.check(document)
+            if verdict is None:
+                decisions['ambiguous'] += 1
+            elif verdict['flagged']:
+                decisions['flagged'] += 1
+            else:
+                decisions['clean'] += 1
+        elapsed = time.perf_counter() - started
+
+        count = len(corpus)
+        self.stdout.write(f'automaton build: {build_ms:.1f} ms ({len(prefilter.matcher.transitions)} states)')
+        self.stdout.write(f'documents: {count} ({total_chars / count:.0f} chars avg)')
+        self.stdout.write(
+            f"decisions: flagged={decisions['flagged']} clean={decisions['clean']} "
+            f"ambiguous={decisions['ambiguous']}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{elapsed / count * 1e6:.1f} us/document, {count / elapsed:,.0f} documents/s, '
+                f'{total_chars / elapsed / 1e6:.1f} MB/s'
+            )
+        )
@@ -0,0 +1,34 @@
+"""
+Django management command to inspect and maintain the moderation result cache.
+"""
+from django.core.management.base import BaseCommand
+
+from moderation import cache
+from moderation.models import ModerationCacheEntry
+
+
+class Command(BaseCommand):
+    help = 'Reports moderation cache hit/miss counters and optionally prunes or clears the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Drop expired entries and evict least recently used ones above the size limit.')
+        parser.add_argument('--clear', action='store_true', help='Delete every cached verdict.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = ModerationCacheEntry.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} cached verdict(s)'))
+        elif options['prune']:
+            result = cache.prune()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Expired {result['expired']} and evicted {result['evicted']} cached verdict(s)"
+                )
+            )
+
+        stats = cache.stats()
+        self.stdout.write(
+            f"entries={stats['entries']} hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.1%}"
+        )
@@ -0,0 +1,45 @@
+"""
+Django management command that reports moderation pipeline counters: queue
+depth, pre-filter decisions, cache hits and model calls avoided by the ledger
+or by reusing a near-duplicate's verdict.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core import metrics
+from moderation import cache, ledger, prefilter
+from moderation.models import ModerationJob
+
+
+class Command(BaseCommand):
+    help = 'Reports moderation queue depth and avoided model calls'
+
+    def handle(self, *args, **options):
+        queue = {
+            row['status']: row['count']
+            for row in ModerationJob.objects.values('status').annotate(count=Count('id'))
+        }
+        self.stdout.write(
+            'queue: ' + ' '.join(f'{status}={queue.get(status, 0)}' for status in ModerationJob.Status.values)
+        )
+
+        decisions = metrics.get_counters(
+            prefilter.CLEAN_COUNTER, prefilter.FLAGGED_COUNTER, prefilter.AMBIGUOUS_COUNTER
+        )
+        self.stdout.write(
+            f'prefilter: clean={decisions[prefilter.CLEAN_COUNTER]} '
+            f'flagged={decisions[prefilter.FLAGGED_COUNTER]} '
+            f'ambiguous={decisions[prefilter.AMBIGUOUS_COUNTER]}'
+        )
+
+        cache_stats = cache.stats()
+        self.stdout.write(
+            f"cache: entries={cache_stats['entries']} hits={cache_stats['hits']} "
+            f"misses={cache_stats['misses']} hit_rate={cache_stats['hit_rate']:.1%}"
+        )
+
+        ledger_stats = ledger.stats()
+        self.stdout.write(
+            f"ledger: revisions={ledger_stats['revisions']} enqueued={ledger_stats['enqueued']} "
+            f"avoided={ledger_stats['avoided']} reused={ledger_stats['reused']}"
+        )
@@ -0,0 +1,87 @@
+"""
+Django management command that drains the moderation job queue.
+Run one or more of these alongside the web workers, e.g.:
+
+    python manage.py run_moderation_worker --workers 4
+    python manage.py run_moderation_worker --backend stub --once   # offline load test
+"""
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from moderation.backends import MODERATORS, get_moderator
+from moderation.queue import requeue_stale_jobs, run_batch
+
+
+class Command(BaseCommand):
+    help = 'Processes queued moderation jobs with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.MODERATION_WORKERS,
+                            help='Number of worker threads.')
+        parser.add_argument('--batch-size', type=int, default=settings.MODERATION_BATCH_MAX_ITEMS,
+                            help='Jobs claimed and moderated together per round trip.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--backend', choices=sorted(MODERATORS), default=None,
+                            help='Override MODERATION_BACKEND (use "stub" for offline runs).')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever.')
+
+    def handle(self, *args, **options):
+        requeue_stale_jobs()
+
+        stop = threading.Event()
+        totals = []
+        lock = threading.Lock()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        def work(index):
+            moderator = get_moderator(options['backend'])
+            worker_id = f"{prefix}:{index}"
+            processed = 0
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    claimed = run_batch(moderator, options['batch_size'], worker_id)
+                    processed += claimed
+                    if not claimed:
+                        if options['once']:
+                            break
+                        stop.wait(options['poll_interval'])
+            finally:
+                connection.close()
+                with lock:
+                    totals.append(processed)
+
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"moderation-worker-{index}", daemon=True)
+            for index in range(max(options['workers'], 1))
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping moderation workers...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.monotonic() - started
+        processed = sum(totals)
+        rate = processed / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processed {processed} moderation job(s) in {elapsed:.2f}s ({rate:.1f} jobs/s)'
+            )
+        )
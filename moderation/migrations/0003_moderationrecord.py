@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('moderation', '0002_moderationcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=64)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('result', models.JSONField(default=dict)),
+                ('moderated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['content_type', 'object_id', '-moderated_at'], name='moderation_record_latest_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='moderationrecord',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'content_hash'), name='unique_moderated_revision'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+
+class ModerationJob(models.Model):
+    """A queued request to moderate one piece of user content.
+
+    Jobs are drained by ``manage.py run_moderation_worker``. Successful jobs are
+    deleted once the verdict has been applied; failed jobs are kept for inspection.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    target = GenericForeignKey("content_type", "object_id")
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["available_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="moderation_job_ready_idx"),
+        ]
+        constraints = [
+            # At most one queued job per object; re-enqueueing is a no-op.
+            models.UniqueConstraint(
+                fields=["content_type", "object_id"],
+                condition=models.Q(status="queued"),
+                name="unique_queued_moderation_job",
+            )
+        ]
+
+    def __str__(self):
+        return f"Moderation job for {self.content_type.model} {self.object_id} ({self.status})"
+
+
+class ModerationCacheEntry(models.Model):
+    """A stored moderation verdict keyed by a hash of normalized content.
+
+    The key also covers the model and prompt version, so changing either
+    naturally invalidates old verdicts.
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    result = models.JSONField(default=dict)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Moderation cache entries"
+
+    def __str__(self):
+        return f"{self.key[:12]}... ({self.hit_count} hits)"
+
+
+class ModerationRecord(models.Model):
+    """Ledger entry: this content revision of this object has been moderated."""
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    target = GenericForeignKey("content_type", "object_id")
+    content_hash = models.CharField(max_length=64)
+    result = models.JSONField(default=dict)
+    moderated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["content_type", "object_id", "-moderated_at"],
+                name="moderation_record_latest_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "content_hash"],
+                name="unique_moderated_revision",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model} {self.object_id} @ {self.content_hash[:12]}"
@@ -0,0 +1,153 @@
+"""Local rule-based pre-moderation.
+
+A single Aho-Corasick automaton over the blocklist and allowlist scans each text
+in one pass. Texts containing blocklisted terms are flagged and everything else
+is left for the LLM. Publishing short texts without blocklisted terms unseen is
+opt-in (``MODERATION_PREFILTER_CLEAN_MAX_LENGTH``, off by default): a short
+blocklist cannot vouch for a text. The automaton is built once per process
+(see ``get_prefilter``).
+"""
+
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from core import metrics
+
+from .cache import normalize_content
+
+CLEAN_COUNTER = "moderation.prefilter.clean"
+FLAGGED_COUNTER = "moderation.prefilter.flagged"
+AMBIGUOUS_COUNTER = "moderation.prefilter.ambiguous"
+
+BLOCK = 0
+ALLOW = 1
+
+
+class AhoCorasick:
+    """Multi-pattern matcher reporting every (start, end, pattern, kind) occurrence."""
+
+    def __init__(self, patterns: Iterable):
+        # Node 0 is the root; each node has transitions, a failure link and outputs.
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for pattern, kind in patterns:
+            if pattern:
+                self._add(pattern, kind)
+        self._link()
+
+    def _add(self, pattern: str, kind: int) -> None:
+        node = 0
+        for char in pattern:
+            next_node = self.transitions[node].get(char)
+            if next_node is None:
+                next_node = len(self.transitions)
+                self.transitions[node][char] = next_node
+                self.transitions.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            node = next_node
+        self.outputs[node].append((pattern, kind))
+
+    def _link(self) -> None:
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.transitions[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.transitions[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def find_all(self, text: str):
+        transitions, fail, outputs = self.transitions, self.fail, self.outputs
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in transitions[node]:
+                node = fail[node]
+            node = transitions[node].get(char, 0)
+            if outputs[node]:
+                for pattern, kind in outputs[node]:
+                    yield index - len(pattern) + 1, index + 1, pattern, kind
+
+
+def _is_word_boundary(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+class PreFilter:
+    def __init__(self, blocklist: Iterable[str], allowlist: Iterable[str], clean_max_length: int):
+        patterns = [(normalize_content(term), BLOCK) for term in blocklist]
+        patterns += [(normalize_content(term), ALLOW) for term in allowlist]
+        self.matcher = AhoCorasick(patterns)
+        self.clean_max_length = clean_max_length
+
+    def blocked_terms(self, normalized: str) -> list:
+        blocked, allowed = [], []
+        for start, end, pattern, kind in self.matcher.find_all(normalized):
+            if not _is_word_boundary(normalized, start, end):
+                continue
+            (allowed if kind == ALLOW else blocked).append((start, end, pattern))
+        return sorted({
+            pattern
+            for start, end, pattern in blocked
+            if not any(a_start <= start and end <= a_end for a_start, a_end, _ in allowed)
+        })
+
+    def check(self, content: str) -> Optional[dict]:
+        """Return a verdict for clear-cut texts, or None if the LLM should decide."""
+
+        normalized = normalize_content(content)
+        terms = self.blocked_terms(normalized)
+        if terms:
+            return {
+                "flagged": True,
+                "categories": ["blocklist"],
+                "notes": f"Matched blocklisted terms: {', '.join(terms)}",
+                "source": "prefilter",
+            }
+        if self.clean_max_length and len(normalized) <= self.clean_max_length:
+            return {
+                "flagged": False,
+                "categories": [],
+                "notes": "Short text with no blocklisted terms.",
+                "source": "prefilter",
+            }
+        return None
+
+
+def _read_terms(path) -> list:
+    if not path:
+        return []
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+@lru_cache(maxsize=1)
+def get_prefilter() -> PreFilter:
+    return PreFilter(
+        blocklist=_read_terms(settings.MODERATION_BLOCKLIST_FILE) + list(settings.MODERATION_BLOCKLIST),
+        allowlist=_read_terms(settings.MODERATION_ALLOWLIST_FILE) + list(settings.MODERATION_ALLOWLIST),
+        clean_max_length=settings.MODERATION_PREFILTER_CLEAN_MAX_LENGTH,
+    )
+
+
+def prefilter(content: str) -> Optional[dict]:
+    """Run the process-wide pre-filter and record its decision."""
+
+    if not settings.MODERATION_PREFILTER_ENABLED:
+        return None
+    verdict = get_prefilter().check(content)
+    if verdict is None:
+        metrics.incr(AMBIGUOUS_COUNTER)
+    else:
+        metrics.incr(FLAGGED_COUNTER if verdict["flagged"] else CLEAN_COUNTER)
+    return verdict
@@ -0,0 +1,267 @@
+"""Database-backed moderation job queue.
+
+Content models opt in by implementing three methods:
+
+* ``get_moderation_text()`` - the text sent to the moderator.
+* ``apply_moderation_result(result, content_hash=None)`` - persist the verdict
+  (without calling ``save()`` so that applying a verdict never enqueues another
+  job), unless the content no longer has revision ``content_hash``.
+* ``is_awaiting_moderation()`` - whether the object still needs a verdict applied.
+
+They may also implement ``reusable_moderation_result()``, returning the verdict
+of equivalent content moderated before (e.g. a near-duplicate post) or None.
+
+Save paths should call ``request_moderation``, which consults the ledger so each
+content revision is moderated at most once.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+
+from . import ledger
+from .models import ModerationJob
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationError(Exception):
+    """Raised when a moderator could not produce a usable verdict."""
+
+
+def enqueue_moderation(obj) -> None:
+    """Queue ``obj`` for moderation. Enqueueing an already queued object is a no-op."""
+
+    ModerationJob.objects.bulk_create(
+        [
+            ModerationJob(
+                content_type=ContentType.objects.get_for_model(obj),
+                object_id=str(obj.pk),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def request_moderation(obj) -> bool:
+    """Queue ``obj`` unless its current content revision was already moderated.
+
+    For an already moderated revision the recorded verdict is re-applied if the
+    object is awaiting one (e.g. an admin reset the status) and no job is queued;
+    likewise for a verdict from ``reusable_moderation_result()``.
+    Returns True if a job was queued.
+    """
+
+    digest = ledger.revision_hash(obj.get_moderation_text())
+    record = ledger.find_revision(obj, digest)
+    if record is not None:
+        metrics.incr(ledger.AVOIDED_COUNTER)
+        if obj.is_awaiting_moderation():
+            obj.apply_moderation_result(record.result, content_hash=digest)
+        return False
+
+    reusable = getattr(obj, "reusable_moderation_result", None)
+    result = reusable() if reusable is not None else None
+    if result is not None:
+        metrics.incr(ledger.REUSED_COUNTER)
+        ledger.record_revisions([(obj, digest, result)])
+        if obj.is_awaiting_moderation():
+            obj.apply_moderation_result(result, content_hash=digest)
+        return False
+
+    enqueue_moderation(obj)
+    metrics.incr(ledger.ENQUEUED_COUNTER)
+    return True
+
+
+def claim_jobs(limit: int, worker_id: str):
+    """Lock up to ``limit`` ready jobs for ``worker_id`` and mark them running."""
+
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ModerationJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ModerationJob.Status.QUEUED, available_at__lte=now)
+            .order_by("available_at", "id")[:limit]
+        )
+        if not jobs:
+            return []
+        ModerationJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=ModerationJob.Status.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    for job in jobs:
+        job.status = ModerationJob.Status.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def _validate(result) -> dict:
+    if not isinstance(result, dict):
+        raise ModerationError(f"Moderator returned {type(result).__name__}, expected dict.")
+    if result.get("error"):
+        raise ModerationError(result["error"])
+    return result
+
+
+def _handle_failure(job: ModerationJob, exc: Exception, target, digest) -> None:
+    message = str(exc) or exc.__class__.__name__
+
+    if job.attempts >= settings.MODERATION_MAX_ATTEMPTS:
+        logger.error(f"Moderation job {job.id} failed after {job.attempts} attempts: {message}")
+        if target is not None:
+            # Same outcome as the old synchronous path: publish with the error recorded.
+            target.apply_moderation_result({
+                "flagged": False,
+                "categories": [],
+                "notes": "Error during moderation.",
+                "error": message,
+            }, content_hash=digest)
+        ModerationJob.objects.filter(pk=job.pk).update(
+            status=ModerationJob.Status.FAILED, last_error=message
+        )
+        return
+
+    delay = settings.MODERATION_RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1))
+    logger.warning(f"Moderation job {job.id} failed (attempt {job.attempts}), retrying in {delay}s: {message}")
+    try:
+        with transaction.atomic():
+            ModerationJob.objects.filter(pk=job.pk).update(
+                status=ModerationJob.Status.QUEUED,
+                available_at=timezone.now() + timedelta(seconds=delay),
+                locked_by="",
+                locked_at=None,
+                last_error=message,
+            )
+    except IntegrityError:
+        # A newer revision was queued while this one ran; let that job win.
+        job.delete()
+
+
+def _load_targets(jobs):
+    """Fetch the objects behind ``jobs`` with one query per content type."""
+
+    ids_by_type = {}
+    for job in jobs:
+        ids_by_type.setdefault(job.content_type_id, []).append(job.object_id)
+
+    targets = {}
+    for content_type_id, object_ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        for obj in model._default_manager.filter(pk__in=object_ids):
+            targets[(content_type_id, str(obj.pk))] = obj
+    return targets
+
+
+def process_jobs(jobs, moderator) -> int:
+    """Moderate claimed jobs in a single batch call. Returns the number of verdicts applied."""
+
+    targets = _load_targets(jobs)
+    candidates = []
+    for job in jobs:
+        target = targets.get((job.content_type_id, job.object_id))
+        if target is None:
+            job.delete()
+            continue
+        text = target.get_moderation_text()
+        candidates.append((job, target, text, ledger.revision_hash(text)))
+
+    # Revisions moderated since the job was queued reuse the recorded verdict.
+    recorded = ledger.find_revisions(
+        (job.content_type_id, job.object_id, digest) for job, _, _, digest in candidates
+    )
+    applied = 0
+    work = []
+    for job, target, text, digest in candidates:
+        result = recorded.get((job.content_type_id, job.object_id, digest))
+        if result is None:
+            work.append((job, target, text, digest))
+            continue
+        metrics.incr(ledger.AVOIDED_COUNTER)
+        target.apply_moderation_result(result, content_hash=digest)
+        job.delete()
+        applied += 1
+    if not work:
+        return applied
+
+    try:
+        results = moderator.moderate_batch([text for _, _, text, _ in work])
+        if len(results) != len(work):
+            raise ModerationError(f"Moderator returned {len(results)} verdict(s) for {len(work)} item(s).")
+    except Exception as exc:
+        for job, target, _, digest in work:
+            _handle_failure(job, exc, target, digest)
+        return applied
+
+    moderated = []
+    for (job, target, _, digest), result in zip(work, results):
+        try:
+            result = _validate(result)
+        except ModerationError as exc:
+            _handle_failure(job, exc, target, digest)
+            continue
+        # An edit made while the batch ran keeps the object pending for its own job.
+        target.apply_moderation_result(result, content_hash=digest)
+        job.delete()
+        moderated.append((target, digest, result))
+    ledger.record_revisions(moderated)
+    return applied + len(moderated)
+
+
+def process_job(job: ModerationJob, moderator) -> bool:
+    """Moderate a single claimed job. Returns True if a verdict was applied."""
+
+    return process_jobs([job], moderator) == 1
+
+
+def run_batch(moderator, limit: int, worker_id: str) -> int:
+    """Claim one batch (possibly mixing posts, comments and encouragements) and
+    moderate it with a single ``moderate_batch`` call. Returns the number of jobs claimed."""
+
+    jobs = claim_jobs(limit, worker_id)
+    if jobs:
+        process_jobs(jobs, moderator)
+    return len(jobs)
+
+
+def requeue_stale_jobs(timeout_seconds=None) -> int:
+    """Put jobs left running by a crashed worker back on the queue."""
+
+    if timeout_seconds is None:
+        timeout_seconds = settings.MODERATION_JOB_TIMEOUT_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+    stale = ModerationJob.objects.filter(
+        status=ModerationJob.Status.RUNNING, locked_at__lt=cutoff
+    ).order_by("-id")
+
+    requeued = 0
+    for job in stale:
+        try:
+            with transaction.atomic():
+                ModerationJob.objects.filter(pk=job.pk).update(
+                    status=ModerationJob.Status.QUEUED,
+                    available_at=timezone.now(),
+                    locked_by="",
+                    locked_at=None,
+                )
+            requeued += 1
+        except IntegrityError:
+            # A newer job for the same object is already queued.
+            job.delete()
+
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale moderation job(s)")
+    return requeued
@@ -0,0 +1,396 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import metrics
+from posts import ai_moderate
+from comments.models import Comment
+from posts.models import Post
+from prayer_requests.models import PrayerInteraction, PrayerRequest
+from users.models import User
+
+from . import cache as moderation_cache
+from . import ledger
+from .backends import StubModerator
+from .models import ModerationCacheEntry, ModerationJob, ModerationRecord
+from .prefilter import AhoCorasick, PreFilter
+from .queue import claim_jobs, enqueue_moderation, process_job, requeue_stale_jobs, run_batch
+
+
+class FailingModerator:
+    def moderate(self, content):
+        return {"flagged": False, "categories": [], "notes": "Error during moderation.", "error": "boom"}
+
+    def moderate_batch(self, contents):
+        return [self.moderate(content) for content in contents]
+
+
+class RecordingModerator(StubModerator):
+    def __init__(self):
+        super().__init__(latency_ms=0, flag_terms=["spam"])
+        self.batches = []
+
+    def moderate_batch(self, contents):
+        self.batches.append(list(contents))
+        return super().moderate_batch(contents)
+
+
+@override_settings(MODERATION_BACKEND="stub", MODERATION_STUB_FLAG_TERMS=["spam"], MODERATION_STUB_LATENCY_MS=0)
+class ModerationQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password123",
+        )
+
+    def create_post(self, content="Grace and peace to you."):
+        return Post.objects.create(title="Hello", content=content, author=self.user)
+
+    def test_saving_pending_post_enqueues_single_job(self):
+        post = self.create_post()
+        post.save()
+        enqueue_moderation(post)
+
+        self.assertEqual(post.status, "pending")
+        self.assertEqual(ModerationJob.objects.filter(object_id=str(post.pk)).count(), 1)
+
+    def test_worker_publishes_clean_post(self):
+        post = self.create_post()
+
+        processed = run_batch(StubModerator(), limit=10, worker_id="test")
+
+        post.refresh_from_db()
+        self.assertEqual(processed, 1)
+        self.assertEqual(post.status, "published")
+        self.assertFalse(post.ai_moderation_feedback["flagged"])
+        self.assertFalse(ModerationJob.objects.exists())
+
+    def test_worker_flags_matching_post(self):
+        post = self.create_post("Buy cheap spam now")
+
+        run_batch(StubModerator(), limit=10, worker_id="test")
+
+        post.refresh_from_db()
+        self.assertEqual(post.status, "flagged")
+
+    def test_admin_override_is_not_clobbered(self):
+        post = self.create_post("Buy cheap spam now")
+        Post.objects.filter(pk=post.pk).update(status="published")
+
+        run_batch(StubModerator(), limit=10, worker_id="test")
+
+        post.refresh_from_db()
+        self.assertEqual(post.status, "published")
+
+    def test_posts_comments_and_encouragements_share_a_batch(self):
+        post = self.create_post()
+        comment = Comment.objects.create(post=post, author=self.user, content="Amen, spam link")
+        prayer = PrayerRequest.objects.create(user=self.user, short_description="Pray for rain")
+        encouragement = PrayerInteraction.objects.create(
+            prayer_request=prayer,
+            user=self.user,
+            interaction_type=PrayerInteraction.InteractionType.ENCOURAGE,
+            message="Praying with you!",
+        )
+        moderator = RecordingModerator()
+
+        run_batch(moderator, limit=10, worker_id="test")
+
+        self.assertEqual(len(moderator.batches), 1)
+        self.assertEqual(len(moderator.batches[0]), 3)
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        encouragement.refresh_from_db()
+        self.assertEqual(post.status, "published")
+        self.assertTrue(comment.ai_moderation_feedback["flagged"])
+        self.assertFalse(encouragement.ai_moderation_feedback["flagged"])
+
+    def test_edit_during_a_batch_waits_for_its_own_verdict(self):
+        post = self.create_post()
+        comment = Comment.objects.create(post=post, author=self.user, content="Amen")
+        moderator = RecordingModerator()
+        moderate_batch = moderator.moderate_batch
+
+        def edit_then_moderate(contents):
+            # The author edits both while the worker waits on the model.
+            edited = Post.objects.get(pk=post.pk)
+            edited.content = "Buy cheap spam now"
+            edited.save()
+            reply = Comment.objects.get(pk=comment.pk)
+            reply.content = "Amen, spam link"
+            reply.save()
+            return moderate_batch(contents)
+
+        moderator.moderate_batch = edit_then_moderate
+        run_batch(moderator, limit=10, worker_id="test")
+
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.status, "pending")
+        self.assertEqual(ModerationJob.objects.filter(object_id=str(post.pk)).count(), 1)
+
+        moderator.moderate_batch = moderate_batch
+        run_batch(moderator, limit=10, worker_id="test")
+
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.status, "flagged")
+        self.assertTrue(comment.ai_moderation_feedback["flagged"])
+
+    @override_settings(MODERATION_MAX_ATTEMPTS=2, MODERATION_RETRY_BACKOFF_SECONDS=0)
+    def test_failures_are_retried_then_published_with_error(self):
+        post = self.create_post()
+
+        job = claim_jobs(1, "test")[0]
+        process_job(job, FailingModerator())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.Status.QUEUED)
+        self.assertEqual(job.last_error, "boom")
+
+        job = claim_jobs(1, "test")[0]
+        process_job(job, FailingModerator())
+        job.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.Status.FAILED)
+        self.assertEqual(post.status, "published")
+        self.assertEqual(post.ai_moderation_feedback["error"], "boom")
+
+    def test_stale_running_jobs_are_requeued(self):
+        post = self.create_post()
+        claim_jobs(1, "crashed-worker")
+        ModerationJob.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_jobs(timeout_seconds=60), 1)
+        job = ModerationJob.objects.get(object_id=str(post.pk))
+        self.assertEqual(job.status, ModerationJob.Status.QUEUED)
+
+
+@override_settings(MODERATION_BACKEND="stub", MODERATION_STUB_LATENCY_MS=0)
+class ModerationWorkerCommandTests(TransactionTestCase):
+    # Worker threads use their own connections, so the data must be committed.
+
+    def test_worker_command_drains_queue(self):
+        user = User.objects.create_user(username="author", password="password123")
+        posts = [
+            Post.objects.create(title="Hello", content=f"Post number {index}", author=user)
+            for index in range(5)
+        ]
+        out = StringIO()
+
+        call_command("run_moderation_worker", "--once", "--workers", "2", "--backend", "stub", stdout=out)
+
+        self.assertIn("Processed 5 moderation job(s)", out.getvalue())
+        self.assertEqual(
+            Post.objects.filter(pk__in=[post.pk for post in posts], status="published").count(),
+            5,
+        )
+
+
+@override_settings(MODERATION_PREFILTER_ENABLED=False)
+class ModerationCacheTests(TestCase):
+    def setUp(self):
+        metrics.reset(moderation_cache.HIT_COUNTER, moderation_cache.MISS_COUNTER)
+        patcher = mock.patch.object(ai_moderate, "model")
+        self.model = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.model.generate_content.return_value = SimpleNamespace(
+            text='{"flagged": false, "categories": [], "notes": "ok"}'
+        )
+
+    def test_identical_content_only_calls_gemini_once(self):
+        first = ai_moderate.ai_moderate_content("For God so loved the world")
+        second = ai_moderate.ai_moderate_content("  for god so LOVED\nthe world ")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.model.generate_content.call_count, 1)
+        stats = moderation_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(ModerationCacheEntry.objects.get().hit_count, 1)
+
+    def test_unparseable_responses_are_not_cached(self):
+        self.model.generate_content.return_value = SimpleNamespace(text="not json")
+
+        ai_moderate.ai_moderate_content("Hello")
+        ai_moderate.ai_moderate_content("Hello")
+
+        self.assertEqual(self.model.generate_content.call_count, 2)
+        self.assertFalse(ModerationCacheEntry.objects.exists())
+
+    @override_settings(MODERATION_CACHE_TTL_SECONDS=60)
+    def test_expired_entries_are_misses(self):
+        ai_moderate.ai_moderate_content("Hello")
+        ModerationCacheEntry.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        ai_moderate.ai_moderate_content("Hello")
+
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+    @override_settings(MODERATION_CACHE_MAX_ENTRIES=2)
+    def test_prune_evicts_least_recently_used(self):
+        for index, text in enumerate(["one", "two", "three"]):
+            moderation_cache.store(text, "test", {"flagged": False})
+            ModerationCacheEntry.objects.filter(
+                key=moderation_cache.content_key(text, "test")
+            ).update(last_used_at=timezone.now() - timedelta(minutes=10 - index))
+        moderation_cache.lookup("one", "test")
+
+        result = moderation_cache.prune()
+
+        self.assertEqual(result["evicted"], 1)
+        self.assertIsNone(moderation_cache.lookup("two", "test"))
+        self.assertIsNotNone(moderation_cache.lookup("one", "test"))
+
+
+@override_settings(MODERATION_BATCH_MAX_ITEMS=2, MODERATION_BATCH_MAX_CHARS=10000, MODERATION_PREFILTER_ENABLED=False)
+class BatchModerationTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ai_moderate, "model")
+        self.model = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, *texts):
+        self.model.generate_content.side_effect = [SimpleNamespace(text=text) for text in texts]
+
+    def test_items_are_packed_into_bounded_prompts(self):
+        self.respond(
+            '```json\n[{"id": 0, "flagged": false}, {"id": 1, "flagged": true, "categories": ["spam"]}]\n```',
+            '[{"id": 0, "flagged": false, "notes": "fine"}]',
+        )
+
+        results = ai_moderate.ai_moderate_batch(["first", "second", "third", "FIRST"])
+
+        self.assertEqual(self.model.generate_content.call_count, 2)
+        self.assertEqual([result["flagged"] for result in results], [False, True, False, False])
+        self.assertEqual(results[1]["categories"], ["spam"])
+
+    def test_missing_items_fall_back_to_single_calls(self):
+        self.respond(
+            '[{"id": 0, "flagged": false}, {"id": 1, "flagged": "maybe"}]',
+            '{"flagged": true, "categories": ["violence"], "notes": "single"}',
+        )
+
+        results = ai_moderate.ai_moderate_batch(["calm words", "angry words"])
+
+        self.assertFalse(results[0]["flagged"])
+        self.assertEqual(results[1]["notes"], "single")
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+    def test_cached_items_are_not_resent(self):
+        moderation_cache.store("already seen", ai_moderate.CACHE_NAMESPACE, {"flagged": False, "notes": "cached"})
+        self.respond('[{"id": 0, "flagged": false}]')
+
+        results = ai_moderate.ai_moderate_batch(["already seen", "new text"])
+
+        self.assertEqual(results[0]["notes"], "cached")
+        prompt = self.model.generate_content.call_args[0][0]
+        self.assertNotIn("already seen", prompt)
+
+
+class PreFilterTests(TestCase):
+    def setUp(self):
+        self.prefilter = PreFilter(
+            blocklist=["casino", "free money", "he", "hers"],
+            allowlist=["casino royale"],
+            clean_max_length=40,
+        )
+
+    def test_automaton_reports_overlapping_matches(self):
+        matcher = AhoCorasick([("he", 0), ("she", 0), ("hers", 0), ("his", 0)])
+
+        matches = sorted((start, pattern) for start, _, pattern, _ in matcher.find_all("ushers"))
+
+        self.assertEqual(matches, [(1, "she"), (2, "he"), (2, "hers")])
+
+    def test_blocklisted_terms_are_flagged(self):
+        verdict = self.prefilter.check("Win FREE   money at our Casino tonight, and much more besides that")
+
+        self.assertTrue(verdict["flagged"])
+        self.assertEqual(verdict["notes"], "Matched blocklisted terms: casino, free money")
+
+    def test_matches_respect_word_boundaries_and_allowlist(self):
+        self.assertFalse(self.prefilter.check("The shepherd cares for hersheys")["flagged"])
+        self.assertFalse(self.prefilter.check("Watched Casino Royale")["flagged"])
+
+    def test_long_clean_text_is_left_to_the_llm(self):
+        self.assertFalse(self.prefilter.check("Short and kind.")["flagged"])
+        self.assertIsNone(self.prefilter.check("A much longer reflection on grace " * 3))
+
+    def test_clean_text_is_left_to_the_llm_unless_enabled(self):
+        prefilter = PreFilter(blocklist=["casino"], allowlist=[], clean_max_length=0)
+
+        self.assertIsNone(prefilter.check("Short and kind."))
+        self.assertIsNone(prefilter.check(""))
+
+    def test_ai_moderate_content_skips_gemini_only_for_blocked_text(self):
+        with mock.patch.object(ai_moderate, "model") as model:
+            model.generate_content.return_value.text = '{"flagged": false, "categories": [], "notes": ""}'
+            flagged = ai_moderate.ai_moderate_content("Visit my casino")
+            model.generate_content.assert_not_called()
+            clean = ai_moderate.ai_moderate_content("Amen!")
+
+        model.generate_content.assert_called_once()
+        self.assertTrue(flagged["flagged"])
+        self.assertFalse(clean["flagged"])
+
+
+@override_settings(MODERATION_BACKEND="stub", MODERATION_STUB_FLAG_TERMS=["spam"], MODERATION_STUB_LATENCY_MS=0)
+class ModerationLedgerTests(TestCase):
+    def setUp(self):
+        metrics.reset(ledger.AVOIDED_COUNTER, ledger.ENQUEUED_COUNTER)
+        self.user = User.objects.create_user(username="author", password="password123")
+        self.post = Post.objects.create(title="Hello", content="Grace and peace.", author=self.user)
+        self.moderator = RecordingModerator()
+        run_batch(self.moderator, limit=10, worker_id="test")
+        self.post.refresh_from_db()
+
+    def test_moderated_revision_is_recorded(self):
+        record = ModerationRecord.objects.get(object_id=str(self.post.pk))
+        self.assertEqual(record.content_hash, ledger.revision_hash("Grace and peace."))
+
+    def test_resaving_unchanged_content_does_not_requeue(self):
+        self.post.title = "New title"
+        self.post.save()
+        self.post.status = "pending"
+        self.post.save()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.status, "published")
+        self.assertFalse(ModerationJob.objects.exists())
+        self.assertEqual(ledger.stats()["avoided"], 1)
+
+    def test_changed_content_is_moderated_again(self):
+        self.post.content = "Now with spam"
+        self.post.save()
+
+        self.assertEqual(self.post.status, "pending")
+        run_batch(self.moderator, limit=10, worker_id="test")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.status, "flagged")
+        self.assertEqual(len(self.moderator.batches), 2)
+
+    def test_editing_a_post_without_revisions_is_moderated_again(self):
+        ModerationRecord.objects.all().delete()
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = "New title"
+        post.save()
+        self.assertEqual(post.status, "published")
+
+        post.content = "Now with spam"
+        post.save()
+
+        self.assertEqual(post.status, "pending")
+        self.assertTrue(ModerationJob.objects.filter(object_id=str(post.pk)).exists())
+
+    def test_worker_skips_revisions_moderated_after_queueing(self):
+        enqueue_moderation(self.post)
+
+        run_batch(self.moderator, limit=10, worker_id="test")
+
+        self.assertEqual(len(self.moderator.batches), 1)
+        self.assertFalse(ModerationJob.objects.exists())
@@ -0,0 +1,16 @@
+"""Query helpers for hiding flagged content.
+
+A verdict is stored as JSON in ``ai_moderation_feedback``; pending rows hold
+``{"status": "pending"}`` and rows older than moderation hold ``{}``. A bare
+``exclude(ai_moderation_feedback__flagged=True)`` also drops those rows (and
+SQL NULLs): negating a key lookup treats a missing key as a match. Requiring
+the key first keeps only rows that were actually flagged in the negated set.
+"""
+
+from django.db.models import Q
+
+
+def flagged(field="ai_moderation_feedback"):
+    """``Q`` matching rows whose moderation verdict in ``field`` is flagged."""
+
+    return Q(**{f"{field}__has_key": "flagged"}) & Q(**{f"{field}__flagged": True})
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Reaction, PostShare
+from .search import get_search_backend
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -24,6 +25,12 @@ class PostAdmin(admin.ModelAdmin):
     )
     readonly_fields = ('views', 'created_at', 'updated_at', 'ai_moderation_feedback')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of ILIKE scans over title and content.
+        if not search_term.strip():
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
 @admin.register(Reaction)
 class ReactionAdmin(admin.ModelAdmin):
     list_display = ('post', 'user', 'type', 'created_at')
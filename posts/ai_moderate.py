@@ -1,11 +1,25 @@
+import json
+import logging
+import re
+
 import google.generativeai as genai
 from django.conf import settings
 
+from moderation import cache as moderation_cache
+from moderation.prefilter import prefilter
+
+logger = logging.getLogger(__name__)
+
 # Configuration of Gemini with the API key
 genai.configure(api_key=settings.GEMINI_API_KEY)
 
 # Initializing the Gemini model
-model = genai.GenerativeModel("gemini-pro")
+MODEL_NAME = "gemini-pro"
+model = genai.GenerativeModel(MODEL_NAME)
+
+# Bump whenever the prompt changes so cached verdicts are not reused.
+PROMPT_VERSION = 1
+CACHE_NAMESPACE = f"gemini:{MODEL_NAME}:v{PROMPT_VERSION}"
 
 def ai_moderate_content(content: str) -> dict:
     """
@@ -16,7 +30,20 @@ def ai_moderate_content(content: str) -> dict:
 
     Returns:
         dict: A dictionary containing moderation feedback.
+
+    Clear-cut texts are decided locally by the blocklist pre-filter (see
+    moderation.prefilter). Other verdicts are cached by normalized content hash
+    (see moderation.cache), so identical text is only sent to Gemini once per
+    model/prompt version.
     """
+    verdict = prefilter(content)
+    if verdict is not None:
+        return verdict
+
+    cached = moderation_cache.lookup(content, CACHE_NAMESPACE)
+    if cached is not None:
+        return cached
+
     try:
         prompt = (
             "You are a content moderation assistant. "
@@ -30,9 +57,8 @@ def ai_moderate_content(content: str) -> dict:
         moderation = response.text.strip()
 
         # Optional: parse the JSON if Gemini returns structured output
-        import json
         try:
-            return json.loads(moderation)
+            result = json.loads(moderation)
         except json.JSONDecodeError:
             return {
                 "flagged": False,
@@ -48,4 +74,122 @@ def ai_moderate_content(content: str) -> dict:
             "categories": [],
             "notes": "Error during moderation.",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+    moderation_cache.store(content, CACHE_NAMESPACE, result)
+    return result
+
+
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _chunk_for_prompt(items):
+    """Split (index, content) pairs into prompts bounded by item count and size."""
+
+    max_items = settings.MODERATION_BATCH_MAX_ITEMS
+    max_chars = settings.MODERATION_BATCH_MAX_CHARS
+    chunk, size = [], 0
+    for index, content in items:
+        if chunk and (len(chunk) >= max_items or size + len(content) > max_chars):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((index, content))
+        size += len(content)
+    if chunk:
+        yield chunk
+
+
+def _parse_batch_response(text: str) -> dict:
+    """Map item id -> verdict for every well-formed entry in a batch response."""
+
+    try:
+        parsed = json.loads(_CODE_FENCE_RE.sub("", text.strip()))
+    except json.JSONDecodeError:
+        return {}
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results", [])
+    if not isinstance(parsed, list):
+        return {}
+
+    verdicts = {}
+    for entry in parsed:
+        if not isinstance(entry, dict) or not isinstance(entry.get("flagged"), bool):
+            continue
+        try:
+            item_id = int(entry.pop("id"))
+        except (KeyError, TypeError, ValueError):
+            continue
+        entry.setdefault("categories", [])
+        entry.setdefault("notes", "")
+        verdicts[item_id] = entry
+    return verdicts
+
+
+def ai_moderate_batch(contents: list) -> list:
+    """
+    Moderates several texts with as few Gemini calls as possible.
+
+    Pre-filtered and cached verdicts are reused, duplicate texts are sent once, and the rest are
+    packed into prompts of at most MODERATION_BATCH_MAX_ITEMS items /
+    MODERATION_BATCH_MAX_CHARS characters. Items whose verdict is missing or
+    malformed in the response fall back to ai_moderate_content().
+
+    Args:
+        contents (list): The texts to be evaluated.
+
+    Returns:
+        list: One moderation feedback dict per input text, in input order.
+    """
+    results = [None] * len(contents)
+    pending = {}
+    for index, content in enumerate(contents):
+        verdict = prefilter(content)
+        if verdict is not None:
+            results[index] = verdict
+            continue
+        cached = moderation_cache.lookup(content, CACHE_NAMESPACE)
+        if cached is not None:
+            results[index] = cached
+            continue
+        key = moderation_cache.content_key(content, CACHE_NAMESPACE)
+        pending.setdefault(key, []).append(index)
+
+    unique_items = [(indexes[0], contents[indexes[0]]) for indexes in pending.values()]
+
+    for chunk in _chunk_for_prompt(unique_items):
+        prompt = (
+            "You are a content moderation assistant. "
+            "Analyze each of the following items independently and decide whether it is flagged, "
+            "listing any concerning categories (e.g., hate speech, violence, adult content). "
+            "Respond with only a JSON array containing one object per item with keys: "
+            "id (the item id), flagged (true/false), categories (list), and notes (string).\n\n"
+            + "\n".join(f'<item id="{position}">\n{content}\n</item>' for position, (_, content) in enumerate(chunk))
+        )
+        try:
+            response = model.generate_content(prompt)
+            verdicts = _parse_batch_response(response.text)
+        except Exception as e:
+            logger.warning(f"Gemini batch moderation error: {e}")
+            error = {
+                "flagged": False,
+                "categories": [],
+                "notes": "Error during moderation.",
+                "error": str(e)
+            }
+            for index, _ in chunk:
+                results[index] = dict(error)
+            continue
+
+        for position, (index, content) in enumerate(chunk):
+            verdict = verdicts.get(position)
+            if verdict is None:
+                results[index] = ai_moderate_content(content)
+            else:
+                moderation_cache.store(content, CACHE_NAMESPACE, verdict)
+                results[index] = verdict
+
+    for indexes in pending.values():
+        for duplicate in indexes[1:]:
+            results[duplicate] = results[indexes[0]]
+
+    return results
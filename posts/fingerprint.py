@@ -0,0 +1,201 @@
+"""Near-duplicate detection for post content.
+
+Each post's content is reduced to the set of word 3-shingles of its normalized
+text and summarized by a MinHash signature of ``NUM_HASHES`` values; the share
+of equal values between two signatures estimates the Jaccard similarity of the
+shingle sets. The signature is stored in ``PostFingerprint`` and split into
+``BANDS`` bands of ``ROWS`` values, each hashed into an indexed
+``PostFingerprintBand`` row. Copies of a post almost surely agree on a whole
+band and unrelated posts almost never do, so candidates come from one index
+lookup rather than a scan, and only those are compared.
+
+With 16 bands of 4 rows, posts 0.8 alike share a band with probability ~99.9%,
+posts 0.3 alike with ~12%.
+
+Posts shorter than ``POST_FINGERPRINT_MIN_WORDS`` are not fingerprinted; short
+texts ("Amen!") collide without being copies.
+"""
+
+import hashlib
+import random
+import re
+import struct
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from moderation.cache import normalize_content
+from moderation.prefilter import get_prefilter
+
+from .models import Post, PostFingerprint, PostFingerprintBand
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_WORDS = 3
+
+_WORD_RE = re.compile(r"\w+")
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: stored signatures must stay comparable across processes and deploys.
+_rng = random.Random(1611)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_SIGNATURE = struct.Struct(f">{NUM_HASHES}I")
+
+
+def shingles(text):
+    words = _WORD_RE.findall(normalize_content(text))
+    if len(words) < settings.POST_FINGERPRINT_MIN_WORDS:
+        return set()
+    return {" ".join(words[index:index + SHINGLE_WORDS]) for index in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _hash(data, signed=False):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=signed)
+
+
+def signature(text):
+    """MinHash signature of ``text`` as a tuple of ints, or None if it is too short."""
+
+    hashed = [_hash(shingle.encode("utf-8")) for shingle in shingles(text)]
+    if not hashed:
+        return None
+    return tuple(min((a * value + b) % _PRIME & _MAX_HASH for value in hashed) for a, b in _PERMUTATIONS)
+
+
+def pack(values):
+    return _SIGNATURE.pack(*values)
+
+
+def unpack(data):
+    return _SIGNATURE.unpack(bytes(data))
+
+
+def band_values(values):
+    """One signed 64-bit hash (for BigIntegerField) per band of ``values``."""
+
+    packed = pack(values)
+    width = ROWS * 4
+    return [_hash(packed[band * width:(band + 1) * width], signed=True) for band in range(BANDS)]
+
+
+def similarity(first, second):
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_HASHES
+
+
+def _matching_bands(values):
+    """Band rows sharing a whole band with ``values``, as one indexed lookup."""
+
+    matches = Q()
+    for band, value in enumerate(band_values(values)):
+        matches |= Q(band=band, value=value)
+    return PostFingerprintBand.objects.filter(matches)
+
+
+def _score(values, candidates, min_similarity):
+    stored = PostFingerprint.objects.filter(post_id__in=candidates).order_by("post_id")
+    found = []
+    for post_id, other in stored.values_list("post_id", "signature"):
+        score = similarity(values, unpack(other))
+        if score >= min_similarity:
+            found.append((post_id, score))
+    return found
+
+
+def near_duplicates(values, min_similarity=None, exclude_post_id=None):
+    """``[(post_id, similarity)]`` of fingerprinted posts at least ``min_similarity`` alike, oldest first.
+
+    Only the newest ``POST_NEAR_DUPLICATE_MAX_CANDIDATES`` candidates are compared.
+    """
+
+    if values is None:
+        return []
+    if min_similarity is None:
+        min_similarity = settings.POST_NEAR_DUPLICATE_MIN_SIMILARITY
+    rows = _matching_bands(values)
+    if exclude_post_id is not None:
+        rows = rows.exclude(post_id=exclude_post_id)
+    candidates = list(
+        rows.order_by("-post_id").values_list("post_id", flat=True).distinct()[
+            : settings.POST_NEAR_DUPLICATE_MAX_CANDIDATES
+        ]
+    )
+    if not candidates:
+        return []
+    return _score(values, candidates, min_similarity)
+
+
+def sync_post_fingerprint(post):
+    """Store ``post``'s fingerprint and link it to the earliest post it copies."""
+
+    values = signature(post.content)
+    duplicate_of = None
+    with transaction.atomic():
+        PostFingerprintBand.objects.filter(post=post).delete()
+        if values is None:
+            PostFingerprint.objects.filter(post=post).delete()
+        else:
+            PostFingerprint.objects.update_or_create(post=post, defaults={"signature": pack(values)})
+            PostFingerprintBand.objects.bulk_create(
+                PostFingerprintBand(post=post, band=band, value=value) for band, value in enumerate(band_values(values))
+            )
+            earlier = [post_id for post_id, _ in near_duplicates(values, exclude_post_id=post.pk) if post_id < post.pk]
+            if earlier:
+                # Link to the original rather than to another copy.
+                first = Post.objects.filter(pk=earlier[0]).values_list("duplicate_of_id", flat=True).first()
+                duplicate_of = first or earlier[0]
+        if post.duplicate_of_id != duplicate_of:
+            post.duplicate_of_id = duplicate_of
+            Post.objects.filter(pk=post.pk).update(duplicate_of=duplicate_of)
+
+
+def recent_duplicates_by(author, content):
+    """How many of ``author``'s posts in the throttle window ``content`` nearly repeats.
+
+    The band lookup is joined to the author's recent posts in SQL, so copies
+    of the same text by other users (viral chain posts) never crowd them out.
+    """
+
+    values = signature(content)
+    if values is None:
+        return 0
+    since = timezone.now() - timedelta(seconds=settings.POST_DUPLICATE_WINDOW_SECONDS)
+    candidates = _matching_bands(values).filter(post__author=author, post__created_at__gte=since).values("post_id")
+    return len(_score(values, candidates, settings.POST_NEAR_DUPLICATE_MIN_SIMILARITY))
+
+
+def moderated_duplicate_verdict(post):
+    """The verdict of an already moderated post that ``post`` only trims, if any.
+
+    Near-duplicates (``POST_MODERATION_REUSE_MIN_SIMILARITY``) are only
+    candidates: a verdict is reused when every shingle of ``post`` also occurs
+    in the moderated post, so a copy that appends or rewords anything, however
+    little, goes through normal moderation. Only model verdicts are reused,
+    not error fallbacks.
+    """
+
+    if settings.MODERATION_PREFILTER_ENABLED and get_prefilter().blocked_terms(normalize_content(post.content)):
+        return None
+    matches = near_duplicates(
+        signature(post.content), settings.POST_MODERATION_REUSE_MIN_SIMILARITY, exclude_post_id=post.pk
+    )
+    if not matches:
+        return None
+    closest = sorted(matches, key=lambda match: (-match[1], match[0]))
+    moderated = {
+        pk: (content, verdict)
+        for pk, content, verdict in Post.objects.filter(pk__in=[post_id for post_id, _ in closest])
+        .exclude(status="pending")
+        .values_list("pk", "content", "ai_moderation_feedback")
+    }
+    wanted = shingles(post.content)
+    for post_id, _ in closest:
+        content, verdict = moderated.get(post_id, (None, None))
+        if not (isinstance(verdict, dict) and "flagged" in verdict and not verdict.get("error")):
+            continue
+        if wanted and wanted <= shingles(content):
+            return {**verdict, "reused_from": post_id}
+    return None
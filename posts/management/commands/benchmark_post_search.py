@@ -0,0 +1,123 @@
+"""
+Django management command that seeds a synthetic corpus and measures ranked
+post search latency on the configured search backend, e.g.:
+
+    python manage.py benchmark_post_search --posts 1000000 --queries 200 --compare-ilike
+
+The corpus is inserted inside a transaction that is rolled back at the end
+unless --keep is given.
+"""
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from posts.models import Post
+from posts.search import get_search_backend
+from users.models import User
+
+VOCABULARY = (
+    "grace peace faith hope love prayer church family blessing scripture psalm gospel "
+    "light salt mercy joy kindness patience community worship thanks morning evening "
+    "strength healing journey trust promise shepherd bread water vine harvest seed "
+    "forgiveness wisdom covenant kingdom servant neighbour comfort refuge rock fortress"
+).split()
+SYLLABLES = "ba ce di fo gu ha je ki lo mu na pe ri so tu va we xi yo zu".split()
+
+
+def build_vocabulary(rng, size):
+    """Common devotional words followed by pseudo-words, with Zipfian weights."""
+
+    words = list(VOCABULARY)
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    cumulative = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+    return words, cumulative
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks full-text post search on a seeded corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000, help='Corpus size.')
+        parser.add_argument('--words', type=int, default=60, help='Average words per post.')
+        parser.add_argument('--vocabulary', type=int, default=20000, help='Distinct words in the corpus.')
+        parser.add_argument('--queries', type=int, default=100, help='Search queries to time.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per INSERT while seeding.')
+        parser.add_argument('--compare-ilike', action='store_true',
+                            help='Also time the old ILIKE scan for the first few queries.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded posts.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        backend = get_search_backend()
+        words, cumulative = build_vocabulary(rng, options['vocabulary'])
+        author = User.objects.create_user(username=f'search-benchmark-{time.time_ns()}', password=None)
+
+        started = time.perf_counter()
+        remaining = options['posts']
+        while remaining > 0:
+            size = min(options['batch_size'], remaining)
+            Post.objects.bulk_create(
+                self._post(rng, author, words, cumulative, options['words']) for _ in range(size)
+            )
+            remaining -= size
+        seed_seconds = time.perf_counter() - started
+        self.stdout.write(f"seeded {options['posts']} posts in {seed_seconds:.1f}s")
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(Post._meta.db_table)}')
+
+        # Query terms come from the mid-frequency band, like real searches.
+        band = words[len(VOCABULARY):len(VOCABULARY) + 2000]
+        queries = [' '.join(rng.sample(band, rng.choice([1, 2]))) for _ in range(options['queries'])]
+        base = Post.objects.filter(status='published')
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            list(backend.search(base, query).order_by('-search_rank', '-id')[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        self._report(f'{backend.name} full-text', timings)
+
+        if options['compare_ilike']:
+            timings = []
+            for query in queries[:5]:
+                term = query.split()[0]
+                started = time.perf_counter()
+                list(base.filter(Q(title__icontains=term) | Q(content__icontains=term))[:20])
+                timings.append((time.perf_counter() - started) * 1000)
+            self._report('ILIKE scan', timings)
+
+    @staticmethod
+    def _post(rng, author, words, cumulative, average):
+        length = max(3, int(rng.gauss(average, average / 3)))
+        return Post(
+            author=author,
+            title=' '.join(rng.choices(words, cum_weights=cumulative, k=4)).capitalize(),
+            content=' '.join(rng.choices(words, cum_weights=cumulative, k=length)),
+            status='published',
+        )
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{label}: {len(timings)} queries, p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {timings[-1]:.1f} ms'
+            )
+        )
@@ -0,0 +1,97 @@
+"""
+Django management command that measures the write-behind view counter: flush
+latency and how exactly buffered views land in Post.views, e.g.:
+
+    python manage.py benchmark_post_views --posts 2000 --views 200000 --threads 8
+
+Everything runs inside a transaction that is rolled back at the end.
+"""
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.test.utils import override_settings
+
+from posts import view_counter
+from posts.models import Post
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Reports flush latency and accuracy of the buffered post view counter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Posts receiving views.')
+        parser.add_argument('--views', type=int, default=100000, help='Views recorded in total.')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent recording threads.')
+        parser.add_argument('--viewers', type=int, default=0,
+                            help='Distinct viewers for dedupe (0 records every view).')
+        parser.add_argument('--flush-interval', type=float, default=0.1,
+                            help='Seconds between flushes while views are being recorded.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with override_settings(
+            POST_VIEW_FLUSH_INTERVAL_SECONDS=0,
+            POST_VIEW_DEDUPE_WINDOW_SECONDS=3600 if options['viewers'] else 0,
+        ), transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        author = User.objects.create_user(username=f'view-benchmark-{time.time_ns()}', password=None)
+        posts = Post.objects.bulk_create(
+            Post(author=author, title=f'Benchmark {index}', content='Benchmark', status='published')
+            for index in range(options['posts'])
+        )
+        post_ids = [post.pk for post in posts]
+        view_counter.flush()
+
+        # Hot posts get most of the traffic, like real feeds.
+        weights = [1.0 / (rank + 1) for rank in range(len(post_ids))]
+        accepted = [0] * options['threads']
+        per_thread = options['views'] // options['threads']
+
+        def record(index):
+            rng = random.Random(options['seed'] + index)
+            targets = rng.choices(post_ids, weights=weights, k=per_thread)
+            for post_id in targets:
+                viewer = f"v{rng.randrange(options['viewers'])}" if options['viewers'] else None
+                if view_counter.record_view(post_id, viewer):
+                    accepted[index] += 1
+
+        # Flushing happens on this thread (and its connection) so the rollback covers it.
+        flushes = []
+        threads = [threading.Thread(target=record, args=(index,)) for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(options['flush_interval'])
+            flushes.append(view_counter.flush())
+        for thread in threads:
+            thread.join()
+        flushes.append(view_counter.flush())
+        elapsed = time.perf_counter() - started
+        total = per_thread * options['threads']
+
+        stored = Post.objects.filter(pk__in=post_ids).aggregate(total=Sum('views'))['total'] or 0
+        expected = sum(accepted)
+        durations = sorted(result['duration_ms'] for result in flushes if result['posts'])
+        rows = sum(result['posts'] for result in flushes)
+
+        self.stdout.write(f'recorded {total} views over {len(post_ids)} posts in {elapsed:.2f}s '
+                          f'({total / elapsed:,.0f} views/s, {len(threads)} threads)')
+        self.stdout.write(f'deduplicated: {total - expected}')
+        if durations:
+            self.stdout.write(
+                f'flushes: {len(durations)} ({rows} row updates), '
+                f'p50 {durations[len(durations) // 2]:.1f} ms, max {durations[-1]:.1f} ms, '
+                f'max lag {max(result["lag_seconds"] for result in flushes):.2f}s'
+            )
+        accuracy = stored / expected if expected else 1.0
+        style = self.style.SUCCESS if stored == expected else self.style.ERROR
+        self.stdout.write(style(f'accuracy: {stored}/{expected} views persisted ({accuracy:.4%})'))
@@ -0,0 +1,115 @@
+"""
+Django management command that measures scripture reference parsing throughput,
+the cost of indexing a bulk import, and verse-overlap query latency, e.g.:
+
+    python manage.py benchmark_scripture_refs --refs 200000 --posts 50000
+
+The imported posts are inserted inside a transaction that is rolled back at
+the end.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts import scripture
+from posts.models import Post, ScriptureRef
+from users.models import User
+
+
+def random_reference(rng):
+    """A reference string in one of the spellings people actually type."""
+
+    number = rng.randrange(len(scripture.BOOKS))
+    name, chapters, abbreviations = scripture.BOOKS[number]
+    book = rng.choice((name, name.upper(), *abbreviations, f'{abbreviations[0].capitalize()}.'))
+    chapter = rng.randint(1, chapters)
+    verse = rng.randint(1, 40)
+    shape = rng.random()
+    if shape < 0.15:
+        return f'{book} {chapter}'
+    if shape < 0.55:
+        return f'{book} {chapter}:{verse}'
+    if shape < 0.9:
+        return f'{book} {chapter}:{verse}-{verse + rng.randint(1, 10)}'
+    return f'{book} {chapter}:{verse}, {verse + 2}; {max(chapter - 1, 1)}:{verse}'
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks scripture reference parsing and verse-range queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refs', type=int, default=100000, help='Reference strings to parse.')
+        parser.add_argument('--posts', type=int, default=20000, help='Posts in the simulated bulk import.')
+        parser.add_argument('--refs-per-post', type=int, default=3)
+        parser.add_argument('--queries', type=int, default=200, help='Chapter overlap queries to time.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Posts per INSERT and per index chunk.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        refs = [random_reference(rng) for _ in range(options['refs'])]
+        started = time.perf_counter()
+        parsed = sum(len(scripture.parse_references(ref)) for ref in refs)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'parse: {len(refs)} strings -> {parsed} ranges in {elapsed:.2f}s '
+            f'({len(refs) / max(elapsed, 1e-9):,.0f} strings/s)'
+        ))
+
+        with transaction.atomic():
+            self._import(rng, options)
+            transaction.set_rollback(True)
+
+    def _import(self, rng, options):
+        author = User.objects.create_user(username=f'scripture-benchmark-{time.time_ns()}', password=None)
+        batch_size = max(options['batch_size'], 1)
+        per_post = options['refs_per_post']
+
+        insert_seconds = index_seconds = 0.0
+        remaining = options['posts']
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            started = time.perf_counter()
+            posts = Post.objects.bulk_create(
+                Post(
+                    author=author,
+                    title='Imported',
+                    content='...',
+                    status='published',
+                    scripture_refs=[random_reference(rng) for _ in range(per_post)],
+                )
+                for _ in range(size)
+            )
+            insert_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            scripture.rebuild([post.pk for post in posts])
+            index_seconds += time.perf_counter() - started
+            remaining -= size
+        rows = ScriptureRef.objects.filter(post__author=author).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'import: {options["posts"]} posts inserted in {insert_seconds:.2f}s, '
+            f'{rows} ranges indexed in {index_seconds:.2f}s'
+        ))
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (Post, ScriptureRef):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        timings = []
+        base = Post.objects.filter(status='published')
+        for _ in range(options['queries']):
+            number = rng.randrange(len(scripture.BOOKS))
+            name, chapters, _ = scripture.BOOKS[number]
+            passage = f'{name} {rng.randint(1, chapters)}'
+            started = time.perf_counter()
+            list(scripture.filter_by_passage(base, passage).order_by('-created_at', '-id').values_list('pk', flat=True)[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f'overlap: {len(timings)} chapter queries, p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {timings[-1]:.1f} ms'
+        ))
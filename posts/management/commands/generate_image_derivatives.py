@@ -0,0 +1,78 @@
+"""
+Django management command that renders the resized WebP derivatives for post
+images and profile pictures uploaded before derivatives existed (or after
+IMAGE_DERIVATIVE_SIZES changed, with --force):
+
+    python manage.py generate_image_derivatives --chunk-size 100
+"""
+import tempfile
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from salt_and_light.images import create_derivatives
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Renders missing image derivatives for post images and profile pictures in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100, help='Rows loaded per query.')
+        parser.add_argument('--force', action='store_true', help='Re-render images that already have derivatives.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        posts = Post.objects.exclude(image_url__isnull=True).exclude(image_url='')
+        users = User.objects.exclude(profile_picture__isnull=True).exclude(profile_picture='')
+        if not options['force']:
+            posts = posts.filter(image_variants={})
+            users = users.filter(profile_picture_variants={})
+
+        rendered = failed = 0
+        last_pk = 0
+        while True:
+            chunk = list(posts.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'image_url')[:chunk_size])
+            if not chunk:
+                break
+            for pk, image_url in chunk:
+                variants = self._render_url(image_url)
+                if variants:
+                    Post.objects.filter(pk=pk).update(image_variants=variants)
+                    rendered += 1
+                else:
+                    failed += 1
+            last_pk = chunk[-1][0]
+
+        last_pk = 0
+        while True:
+            chunk = list(users.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+            if not chunk:
+                break
+            for user in chunk:
+                try:
+                    variants = user.refresh_profile_picture_variants()
+                except OSError as exc:
+                    self.stderr.write(f'Skipping profile picture of user {user.pk}: {exc}')
+                    variants = {}
+                if variants:
+                    rendered += 1
+                else:
+                    failed += 1
+            last_pk = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered derivatives for {rendered} image(s); {failed} failed'))
+
+    def _render_url(self, url):
+        try:
+            with requests.get(url, stream=True, timeout=settings.STORAGE_TIMEOUT_SECONDS) as response:
+                response.raise_for_status()
+                with tempfile.TemporaryFile() as download:
+                    for chunk in response.iter_content(settings.STORAGE_UPLOAD_CHUNK_SIZE):
+                        download.write(chunk)
+                    return create_derivatives(download, source_url=url)
+        except requests.RequestException as exc:
+            self.stderr.write(f'Skipping {url}: {exc}')
+            return {}
@@ -0,0 +1,39 @@
+"""
+Django management command that recomputes post MinHash fingerprints and
+re-links near-duplicates to their originals, e.g. after changing
+POST_FINGERPRINT_MIN_WORDS or POST_NEAR_DUPLICATE_MIN_SIMILARITY:
+
+    python manage.py rebuild_post_fingerprints --chunk-size 500
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import fingerprint
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recomputes post fingerprints and near-duplicate links in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts fingerprinted per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        processed = 0
+        last_pk = 0
+        # Oldest first, so each post's originals are already fingerprinted.
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content', 'duplicate_of')[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                for post in chunk:
+                    fingerprint.sync_post_fingerprint(post)
+            processed += len(chunk)
+            last_pk = chunk[-1].pk
+
+        linked = Post.objects.filter(duplicate_of__isnull=False).count()
+        self.stdout.write(self.style.SUCCESS(f'Fingerprinted {processed} post(s); {linked} linked as near-duplicates'))
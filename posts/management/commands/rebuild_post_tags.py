@@ -0,0 +1,36 @@
+"""
+Django management command that re-derives the normalized PostTag rows from
+Post.tags and recounts TagStat, e.g. after bulk imports that bypass save():
+
+    python manage.py rebuild_post_tags --chunk-size 500
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import tagging
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the normalized post tag rows and tag counts in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts re-tagged per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        tagged = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                tagged += tagging.rebuild(chunk)
+            last_pk = chunk[-1]
+
+        with transaction.atomic():
+            tags = tagging.rebuild_counts()
+        self.stdout.write(self.style.SUCCESS(f'Re-tagged {tagged} post(s); {tags} tag(s) in use'))
@@ -0,0 +1,35 @@
+"""
+Django management command that re-parses Post.scripture_refs into the
+ScriptureRef verse-range index, e.g. after bulk imports that bypass save() or
+after teaching the parser new abbreviations:
+
+    python manage.py rebuild_scripture_refs --chunk-size 500
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import scripture
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the scripture reference index in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts re-parsed per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        indexed = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                indexed += scripture.rebuild(chunk)
+            last_pk = chunk[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} scripture range(s)'))
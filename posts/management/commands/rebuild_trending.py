@@ -0,0 +1,35 @@
+"""
+Django management command that recomputes trending scores from stored
+reactions, shares, comments and view counts, e.g. after changing
+TRENDING_EVENT_WEIGHTS or TRENDING_HALF_LIFE_HOURS:
+
+    python manage.py rebuild_trending --chunk-size 500
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import trending
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized post trending scores in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts rescored per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        scored = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                scored += trending.rebuild(chunk)
+            last_pk = chunk[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} post(s)'))
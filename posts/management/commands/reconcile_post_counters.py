@@ -0,0 +1,39 @@
+"""
+Django management command that rebuilds the denormalized per-post counters
+(PostStats) from the reaction, share and comment tables, e.g.:
+
+    python manage.py reconcile_post_counters --chunk-size 500
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, PostStats
+
+
+class Command(BaseCommand):
+    help = 'Recounts reactions, shares and comments into PostStats in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts recounted per transaction.')
+        parser.add_argument('--post', type=int, action='append', dest='post_ids',
+                            help='Only reconcile this post id (repeatable).')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        posts = Post.objects.order_by('pk')
+        if options['post_ids']:
+            posts = posts.filter(pk__in=options['post_ids'])
+
+        reconciled = 0
+        last_pk = 0
+        while True:
+            chunk = list(posts.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                # Hold concurrent F() bumps on these rows until the recount lands.
+                list(PostStats.objects.select_for_update().filter(post_id__in=chunk).values_list('pk'))
+                reconciled += PostStats.objects.rebuild(chunk)
+            last_pk = chunk[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters for {reconciled} post(s)'))
@@ -0,0 +1,45 @@
+"""
+Django management command that recomputes the materialized related-posts
+lists of posts marked stale (schedule it, e.g. every minute), or of every post
+with --all after changing RELATED_POSTS_WEIGHTS or RELATED_POSTS_LIMIT:
+
+    python manage.py refresh_related_posts --chunk-size 100
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import related
+from posts.models import Post, RelatedPostsRefresh
+
+
+class Command(BaseCommand):
+    help = 'Refreshes stale related-posts lists in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100, help='Posts refreshed per transaction.')
+        parser.add_argument('--all', action='store_true', help='Recompute the lists of every post.')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        refreshed = 0
+        if options['all']:
+            last_pk = 0
+            while True:
+                chunk = list(
+                    Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+                )
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    # Every list is rebuilt anyway, so neighbours are not revisited.
+                    refreshed += related.refresh(chunk, neighbours=False)
+                    RelatedPostsRefresh.objects.filter(post_id__in=chunk).delete()
+                last_pk = chunk[-1]
+        else:
+            while True:
+                count = related.refresh_stale(chunk_size)
+                if not count:
+                    break
+                refreshed += count
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed related posts of {refreshed} post(s)'))
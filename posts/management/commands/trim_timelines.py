@@ -0,0 +1,20 @@
+"""
+Django management command that caps every home feed timeline at its newest
+FEED_TIMELINE_MAX_ENTRIES entries; meant to run periodically, e.g.:
+
+    python manage.py trim_timelines --max-entries 800
+"""
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Deletes home feed timeline entries beyond the per-user cap'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-entries', type=int, default=None, help='Entries kept per user.')
+
+    def handle(self, *args, **options):
+        deleted = timeline.trim(options['max_entries'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} timeline entr{"y" if deleted == 1 else "ies"}'))
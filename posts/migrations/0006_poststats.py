@@ -0,0 +1,68 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:19
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+import django.utils.timezone
+
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_post_stats(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostStats = apps.get_model('posts', 'PostStats')
+    Reaction = apps.get_model('posts', 'Reaction')
+    PostShare = apps.get_model('posts', 'PostShare')
+    Comment = apps.get_model('comments', 'Comment')
+
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    for offset in range(0, len(post_ids), BACKFILL_CHUNK_SIZE):
+        chunk = post_ids[offset:offset + BACKFILL_CHUNK_SIZE]
+        stats = {post_id: PostStats(post_id=post_id) for post_id in chunk}
+        reactions = (
+            Reaction.objects.filter(post_id__in=chunk)
+            .values_list('post_id', 'type')
+            .annotate(total=Count('id'))
+        )
+        for post_id, reaction_type, total in reactions:
+            setattr(stats[post_id], f'{reaction_type}_count', total)
+            stats[post_id].reaction_count += total
+        for field, model in (('share_count', PostShare), ('comment_count', Comment)):
+            totals = model.objects.filter(post_id__in=chunk).values_list('post_id').annotate(total=Count('id'))
+            for post_id, total in totals:
+                setattr(stats[post_id], field, total)
+        PostStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_postshare'),
+        ('comments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostStats',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.post')),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('love_count', models.PositiveIntegerField(default=0)),
+                ('laugh_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('fire_count', models.PositiveIntegerField(default=0)),
+                ('heart_count', models.PositiveIntegerField(default=0)),
+                ('pray_count', models.PositiveIntegerField(default=0)),
+                ('amen_count', models.PositiveIntegerField(default=0)),
+                ('reaction_count', models.PositiveIntegerField(default=0)),
+                ('share_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Post stats',
+            },
+        ),
+        migrations.RunPython(backfill_post_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_poststats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.post')),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='post_trending_score_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:38
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_CHUNK_SIZE = 1000
+MAX_TAG_LENGTH = 50
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_tags(tags):
+    # Frozen copy of posts.tagging.normalize_tags as of this migration.
+    normalized = []
+    for tag in tags or []:
+        if not isinstance(tag, str):
+            continue
+        tag = _SPACES_RE.sub(" ", tag).strip().lstrip("#").strip().lower()[:MAX_TAG_LENGTH]
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+def backfill_post_tags(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostTag = apps.get_model('posts', 'PostTag')
+    TagStat = apps.get_model('posts', 'TagStat')
+
+    counts = Counter()
+    last_pk = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'tags', 'status')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        rows = []
+        for post_id, tags, status in chunk:
+            published = status == 'published'
+            for tag in normalize_tags(tags):
+                rows.append(PostTag(post_id=post_id, tag=tag, is_published=published))
+                if published:
+                    counts[tag] += 1
+        PostTag.objects.bulk_create(rows)
+        last_pk = chunk[-1][0]
+    TagStat.objects.bulk_create(TagStat(tag=tag, post_count=total) for tag, total in counts.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count', 'tag'], name='tag_stat_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=50)),
+                ('is_published', models.BooleanField(default=False)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_rows', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', 'is_published', 'post'], name='post_tag_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='unique_post_tag'),
+        ),
+        migrations.RunPython(backfill_post_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+BACKFILL_CHUNK_SIZE = 1000
+BACKFILL_POSTS_PER_FOLLOW = 20
+
+
+def backfill_timelines(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+
+    high_reach = set(
+        Follow.objects.values('following_id')
+        .annotate(followers=Count('id'))
+        .filter(followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list('following_id', flat=True)
+    )
+    recent = {}
+    last_pk = 0
+    while True:
+        chunk = list(
+            Follow.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'follower_id', 'following_id')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        entries = []
+        for _, follower_id, author_id in chunk:
+            if author_id in high_reach:
+                continue
+            if author_id not in recent:
+                recent[author_id] = list(
+                    Post.objects.filter(author_id=author_id, status='published')
+                    .order_by('-created_at', '-id')
+                    .values_list('pk', 'created_at')[:BACKFILL_POSTS_PER_FOLLOW]
+                )
+            entries.extend(
+                TimelineEntry(user_id=follower_id, post_id=post_id, author_id=author_id, created_at=created_at)
+                for post_id, created_at in recent[author_id]
+            )
+        TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+        last_pk = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_scripture_refs'),
+        ('users', '0008_follow_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_idx'), models.Index(fields=['user', 'author'], name='timeline_user_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
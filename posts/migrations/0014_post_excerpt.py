@@ -0,0 +1,48 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    # Frozen copy of posts.models.make_excerpt as of this migration.
+    text = " ".join((text or "").split())
+    if len(text) <= length:
+        return text
+    cut = text[: length - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + "\u2026"
+
+
+def backfill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for post in chunk:
+            post.excerpt = make_excerpt(post.content)
+        Post.objects.bulk_update(chunk, ['excerpt'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
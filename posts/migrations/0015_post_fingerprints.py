@@ -0,0 +1,123 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:08
+
+import hashlib
+import random
+import re
+import struct
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# Frozen copy of the MinHash signature in posts.fingerprint (and of
+# moderation.cache.normalize_content and POST_FINGERPRINT_MIN_WORDS) as of this
+# migration, so later changes to live code and settings do not change it.
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_WORDS = 3
+MIN_WORDS = 8
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1611)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_SIGNATURE = struct.Struct(f">{NUM_HASHES}I")
+
+
+def normalize_content(content):
+    normalized = unicodedata.normalize("NFKC", content or "")
+    return _WHITESPACE_RE.sub(" ", normalized).strip().casefold()
+
+
+def _hash(data, signed=False):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=signed)
+
+
+def signature(text):
+    words = _WORD_RE.findall(normalize_content(text))
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[index:index + SHINGLE_WORDS]) for index in range(len(words) - SHINGLE_WORDS + 1)}
+    hashed = [_hash(shingle.encode("utf-8")) for shingle in shingles]
+    return tuple(min((a * value + b) % _PRIME & _MAX_HASH for value in hashed) for a, b in _PERMUTATIONS)
+
+
+def pack(values):
+    return _SIGNATURE.pack(*values)
+
+
+def band_values(values):
+    packed = pack(values)
+    width = ROWS * 4
+    return [_hash(packed[band * width:(band + 1) * width], signed=True) for band in range(BANDS)]
+
+
+def backfill_fingerprints(apps, schema_editor):
+    # Links between copies are left to ``manage.py rebuild_post_fingerprints``.
+    Post = apps.get_model('posts', 'Post')
+    PostFingerprint = apps.get_model('posts', 'PostFingerprint')
+    PostFingerprintBand = apps.get_model('posts', 'PostFingerprintBand')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'content')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        fingerprints, bands = [], []
+        for pk, content in chunk:
+            values = signature(content)
+            if values is None:
+                continue
+            fingerprints.append(PostFingerprint(post_id=pk, signature=pack(values)))
+            bands.extend(
+                PostFingerprintBand(post_id=pk, band=band, value=value)
+                for band, value in enumerate(band_values(values))
+            )
+        PostFingerprint.objects.bulk_create(fingerprints)
+        PostFingerprintBand.objects.bulk_create(bands)
+        last_pk = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostFingerprint',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='posts.post')),
+                ('signature', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='posts.post'),
+        ),
+        migrations.CreateModel(
+            name='PostFingerprintBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('value', models.BigIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_bands', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['value', 'band'], name='post_fingerprint_band_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postfingerprintband',
+            constraint=models.UniqueConstraint(fields=('post', 'band'), name='unique_post_fingerprint_band'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def queue_published_posts(apps, schema_editor):
+    # Lists are computed by `manage.py refresh_related_posts`, not here.
+    Post = apps.get_model('posts', 'Post')
+    RelatedPostsRefresh = apps.get_model('posts', 'RelatedPostsRefresh')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_pk, status='published')
+            .order_by('pk')
+            .values_list('pk', flat=True)[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        RelatedPostsRefresh.objects.bulk_create([RelatedPostsRefresh(post_id=pk) for pk in chunk])
+        last_pk = chunk[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPostsRefresh',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='related_refresh', serialize=False, to='posts.post')),
+                ('requested_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Related posts refreshes',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_rows', to='posts.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_from', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post', '-score'], name='related_post_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedpost',
+            constraint=models.UniqueConstraint(fields=('post', 'related'), name='unique_related_post'),
+        ),
+        migrations.RunPython(queue_published_posts, migrations.RunPython.noop),
+    ]
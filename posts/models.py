@@ -1,8 +1,27 @@
+from django.apps import apps
 from django.db import models
+from django.db.models import Count, F
+from django.utils import timezone
 # Change the import:
 from django.db.models import JSONField # <--- CHANGE THIS LINE!
 from users.models import User # Import the custom User model
-from .ai_moderate import ai_moderate_content
+from moderation.ledger import revision_changed, unchanged
+from moderation.queue import request_moderation
+from salt_and_light.images import variants_for_url
+
+
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """``text`` on one line, cut at a word boundary to at most ``length`` characters."""
+    text = " ".join((text or "").split())
+    if len(text) <= length:
+        return text
+    cut = text[: length - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + "\u2026"
 
 
 class EngagementQuerySet(models.QuerySet):
@@ -18,7 +37,9 @@ class Post(models.Model):
 
     title = models.CharField(max_length=255)
     content = models.TextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='') # Derived from content on save for list cards
     image_url = models.URLField(max_length=1024, blank=True, null=True)
+    image_variants = JSONField(default=dict, blank=True) # e.g., {"thumb": "https://..."}; see salt_and_light/images.py
     tags = JSONField(default=list, blank=True, null=True) # e.g., ["faith", "prayer"]
     scripture_refs = JSONField(default=list, blank=True, null=True) # e.g., ["John 3:16", "Romans 8:28"]
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
@@ -27,17 +48,87 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     ai_moderation_feedback = JSONField(default=dict, blank=True, null=True) # e.g., {"status": "flagged", "reason": "Potential hate speech"}
+    # Earliest post this one nearly copies; see posts/fingerprint.py.
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='near_duplicates')
 
     objects = EngagementQuerySet.as_manager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the save hooks tell a newly published post from a re-saved one.
+        instance._loaded_status = instance.__dict__.get("status")
+        instance._loaded_content = instance.__dict__.get("content")
+        instance._loaded_image_url = instance.__dict__.get("image_url")
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.status == "pending":
-            result = ai_moderate_content(self.content)
-            self.status = "flagged" if result["flagged"] else "published"
-            self.ai_moderation_feedback = result
+        if self.pk and self.status != "pending":
+            # Edited content goes back through moderation; other edits do not.
+            if revision_changed(self, getattr(self, "_loaded_content", None)):
+                self.status = "pending"
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            self.excerpt = make_excerpt(self.content)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "excerpt"}
+                update_fields = kwargs["update_fields"]
+        if self.image_url != getattr(self, "_loaded_image_url", None) and (
+            update_fields is None or "image_url" in update_fields
+        ):
+            self.image_variants = variants_for_url(self.image_url)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "image_variants"}
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        self._loaded_image_url = self.image_url
+        self._loaded_content = self.content
+        if adding:
+            PostStats.objects.create(post=self)
+        # Moderation runs out of band (see moderation.queue); the post stays
+        # pending until a worker applies the verdict.
+        if self.status == "pending":
+            request_moderation(self)
+
+    def get_moderation_text(self):
+        return self.content
+
+    def is_awaiting_moderation(self):
+        return self.status == "pending"
+
+    def reusable_moderation_result(self):
+        from .fingerprint import moderated_duplicate_verdict
+
+        return moderated_duplicate_verdict(self)
+
+    def apply_moderation_result(self, result, content_hash=None):
+        # Only settle posts that are still pending so admin overrides win, and
+        # only with the verdict for the content they still have.
+        pending = unchanged(Post.objects.filter(pk=self.pk, status="pending"), "content", content_hash)
+        if pending is None:
+            return
+        self.status = "flagged" if result.get("flagged") else "published"
+        self.ai_moderation_feedback = result
+        self.updated_at = timezone.now()
+        settled = pending.update(
+            status=self.status,
+            ai_moderation_feedback=result,
+            updated_at=self.updated_at,
+        )
+        if settled:
+            from . import related, timeline
+            from .tagging import sync_post_tags
+
+            sync_post_tags(self)
+            timeline.post_status_changed(self)
+            related.mark_stale([self.pk])
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over (created_at, id); see core.pagination.
+            models.Index(fields=['status', '-created_at', '-id'], name='post_status_created_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -89,3 +180,247 @@ class PostShare(models.Model):
     def __str__(self):
         platform = self.platform or "direct share"
         return f"{self.user} shared {self.post.title} via {platform}"
+
+
+
+class PostStatsManager(models.Manager):
+    def bump(self, post_id, **deltas):
+        """Atomically add ``deltas`` (field name -> int) to a post's counters.
+
+        Rows are created together with their post (and backfilled by
+        ``reconcile_post_counters``), so a missing row is left alone rather than
+        recreated while its post is being deleted.
+        """
+        updates = {field: F(field) + delta for field, delta in deltas.items()}
+        return self.filter(post_id=post_id).update(updated_at=timezone.now(), **updates)
+
+    def bump_reaction(self, post_id, reaction_type, delta):
+        return self.bump(post_id, **{PostStats.reaction_field(reaction_type): delta, "reaction_count": delta})
+
+    def rebuild(self, post_ids):
+        """Recount the counters of ``post_ids`` from the source tables."""
+        post_ids = list(post_ids)
+        Comment = apps.get_model("comments", "Comment")
+        stats = {post_id: PostStats(post_id=post_id) for post_id in post_ids}
+
+        reactions = (
+            Reaction.objects.filter(post_id__in=post_ids)
+            .values_list("post_id", "type")
+            .annotate(total=Count("id"))
+        )
+        for post_id, reaction_type, total in reactions:
+            setattr(stats[post_id], PostStats.reaction_field(reaction_type), total)
+            stats[post_id].reaction_count += total
+
+        for field, model in (("share_count", PostShare), ("comment_count", Comment)):
+            totals = model.objects.filter(post_id__in=post_ids).values_list("post_id").annotate(total=Count("id"))
+            for post_id, total in totals:
+                setattr(stats[post_id], field, total)
+
+        now = timezone.now()
+        for row in stats.values():
+            row.updated_at = now
+        counter_fields = [field.name for field in PostStats._meta.fields if field.name != "post"]
+        self.bulk_create(
+            stats.values(),
+            update_conflicts=True,
+            unique_fields=["post"],
+            update_fields=counter_fields,
+        )
+        return len(stats)
+
+
+class PostStats(models.Model):
+    """Denormalized engagement counters, maintained with F() updates by the
+    signal handlers in posts/signals.py and comments/signals.py."""
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    laugh_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    fire_count = models.PositiveIntegerField(default=0)
+    heart_count = models.PositiveIntegerField(default=0)
+    pray_count = models.PositiveIntegerField(default=0)
+    amen_count = models.PositiveIntegerField(default=0)
+    reaction_count = models.PositiveIntegerField(default=0)
+    share_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = PostStatsManager()
+
+    class Meta:
+        verbose_name_plural = "Post stats"
+
+    def __str__(self):
+        return f"Stats for post {self.post_id}"
+
+    @staticmethod
+    def reaction_field(reaction_type):
+        return f"{reaction_type}_count"
+
+    def reaction_counts(self):
+        counts = {}
+        for reaction_type, _ in Reaction.REACTION_CHOICES:
+            count = getattr(self, self.reaction_field(reaction_type))
+            if count:
+                counts[reaction_type] = count
+        return counts
+
+
+class PostTrendingScore(models.Model):
+    """Materialized trending score, maintained incrementally by posts/trending.py.
+
+    ``score`` is the base-2 logarithm of the forward-decayed engagement mass, so
+    ordering by it at any instant equals ordering by the time-decayed score.
+    """
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="trending")
+    score = models.FloatField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["-score"], name="post_trending_score_idx")]
+
+    def __str__(self):
+        return f"Trending score {self.score:.3f} for post {self.post_id}"
+
+
+class PostTag(models.Model):
+    """One row per (post, normalized tag), kept in sync with ``Post.tags`` by
+    posts/tagging.py. ``is_published`` mirrors the post status so tag queries
+    and facet counts never need to join back to the post table."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="tag_rows")
+    tag = models.CharField(max_length=50)
+    is_published = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "tag"], name="unique_post_tag"),
+        ]
+        indexes = [
+            models.Index(fields=["tag", "is_published", "post"], name="post_tag_lookup_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.tag} on post {self.post_id}"
+
+
+class TagStat(models.Model):
+    """Number of published posts per tag, adjusted with F() on every tag change."""
+
+    tag = models.CharField(max_length=50, primary_key=True)
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["-post_count", "tag"], name="tag_stat_count_idx")]
+
+    def __str__(self):
+        return f"#{self.tag} ({self.post_count})"
+
+
+class ScriptureRef(models.Model):
+    """A verse range cited by a post, parsed from ``Post.scripture_refs`` by
+    posts/scripture.py. ``start`` and ``end`` are ``chapter * 1000 + verse``
+    (verses 0-999 for a whole chapter), so overlap is a range comparison."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="scripture_rows")
+    book = models.PositiveSmallIntegerField()
+    start = models.PositiveIntegerField()
+    end = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "book", "start", "end"], name="unique_post_scripture_range"),
+        ]
+        indexes = [
+            models.Index(fields=["book", "start", "end"], name="scripture_ref_range_idx"),
+        ]
+
+    def __str__(self):
+        from .scripture import format_range
+
+        return f"{format_range(self.book, self.start, self.end)} on post {self.post_id}"
+
+
+class PostFingerprint(models.Model):
+    """MinHash signature of a post's content (see posts/fingerprint.py)."""
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="fingerprint")
+    signature = models.BinaryField()
+
+    def __str__(self):
+        return f"Fingerprint of post {self.post_id}"
+
+
+class PostFingerprintBand(models.Model):
+    """One LSH band of a post's signature; posts sharing any band are candidates."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="fingerprint_bands")
+    band = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "band"], name="unique_post_fingerprint_band"),
+        ]
+        indexes = [models.Index(fields=["value", "band"], name="post_fingerprint_band_idx")]
+
+    def __str__(self):
+        return f"{self.post_id}[{self.band}] = {self.value}"
+
+
+class RelatedPost(models.Model):
+    """One entry of a post's materialized top-K related posts, maintained by
+    posts/related.py from shared tags, scripture and engaged users."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="related_rows")
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="related_from")
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "related"], name="unique_related_post"),
+        ]
+        indexes = [models.Index(fields=["post", "-score"], name="related_post_rank_idx")]
+
+    def __str__(self):
+        return f"Post {self.related_id} related to {self.post_id} ({self.score:.2f})"
+
+
+class RelatedPostsRefresh(models.Model):
+    """A post whose related-posts list is stale; drained by ``refresh_related_posts``."""
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="related_refresh")
+    requested_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Related posts refreshes"
+
+    def __str__(self):
+        return f"Refresh related posts of {self.post_id}"
+
+
+class TimelineEntry(models.Model):
+    """A post delivered to a follower's home feed by fan-out on write (see
+    posts/timeline.py). ``created_at`` copies the post's so the feed can be
+    read newest-first from the index alone."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timeline_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"], name="unique_timeline_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-post"], name="timeline_user_created_idx"),
+            models.Index(fields=["user", "author"], name="timeline_user_author_idx"),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.user_id}'s timeline"
@@ -0,0 +1,124 @@
+"""Reaction writes.
+
+``apply_reaction`` adds, removes or toggles one reaction and returns the new
+count for that reaction type. On PostgreSQL the row change and the PostStats
+update run as one statement (data-modifying CTEs), so a tap costs a single
+round trip, and a concurrent duplicate tap is resolved by
+``ON CONFLICT DO NOTHING`` rather than an IntegrityError; the same statement
+marks the post's related posts stale. Elsewhere it falls back to the ORM,
+where posts/signals.py keeps the counters, trending and related posts.
+"""
+
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import trending
+from .models import PostStats, Reaction, RelatedPostsRefresh
+
+ADD = "add"
+REMOVE = "remove"
+TOGGLE = "toggle"
+ACTIONS = (ADD, REMOVE, TOGGLE)
+REACTION_TYPES = {choice for choice, _ in Reaction.REACTION_CHOICES}
+
+ReactionResult = namedtuple("ReactionResult", ["post_id", "type", "reacted", "changed", "count"])
+
+
+def apply_reaction(post_id, user_id, reaction_type, action=TOGGLE):
+    """Apply ``action`` to the user's ``reaction_type`` reaction on ``post_id``.
+
+    ``reacted`` is whether the reaction exists afterwards, ``changed`` whether
+    this call changed it, and ``count`` the post's total for the type.
+    """
+
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown reaction action '{action}'.")
+    if reaction_type not in REACTION_TYPES:
+        # Also keeps the counter column name below to known values.
+        raise ValueError(f"Invalid reaction type '{reaction_type}'.")
+    if connection.vendor != "postgresql":
+        return _apply_orm(post_id, user_id, reaction_type, action)
+    result = _apply_postgresql(post_id, user_id, reaction_type, action)
+    if result.changed and result.reacted:
+        # No post_save signal fires for the raw INSERT.
+        trending.record_event(post_id, "reaction")
+    return result
+
+
+def _apply_postgresql(post_id, user_id, reaction_type, action):
+    reactions = connection.ops.quote_name(Reaction._meta.db_table)
+    stats = connection.ops.quote_name(PostStats._meta.db_table)
+    column = connection.ops.quote_name(PostStats.reaction_field(reaction_type))
+    refreshes = connection.ops.quote_name(RelatedPostsRefresh._meta.db_table)
+    now = timezone.now()
+
+    if action == ADD:
+        removed = "SELECT NULL::bigint AS id WHERE false"
+    else:
+        removed = f"DELETE FROM {reactions} WHERE post_id = %(post)s AND user_id = %(user)s AND type = %(type)s RETURNING id"
+    if action == REMOVE:
+        added = "SELECT NULL::bigint AS id WHERE false"
+    else:
+        # A toggle only inserts when nothing was deleted; the CTEs share one snapshot.
+        added = (
+            f"INSERT INTO {reactions} (post_id, user_id, type, created_at) "
+            f"SELECT %(post)s, %(user)s, %(type)s, %(now)s WHERE NOT EXISTS (SELECT 1 FROM removed) "
+            f"ON CONFLICT DO NOTHING RETURNING id"
+        )
+    sql = f"""
+        WITH removed AS ({removed}),
+        added AS ({added}),
+        delta AS (SELECT (SELECT COUNT(*) FROM added) - (SELECT COUNT(*) FROM removed) AS value),
+        updated AS (
+            UPDATE {stats}
+            SET {column} = {column} + delta.value,
+                reaction_count = reaction_count + delta.value,
+                updated_at = CASE WHEN delta.value = 0 THEN updated_at ELSE %(now)s END
+            FROM delta
+            WHERE post_id = %(post)s
+            RETURNING {column} AS count
+        ),
+        marked AS (
+            -- What posts/related.py's mark_stale does for the ORM path.
+            INSERT INTO {refreshes} (post_id, requested_at)
+            SELECT %(post)s, %(now)s FROM delta WHERE delta.value <> 0
+            ON CONFLICT (post_id) DO UPDATE SET requested_at = EXCLUDED.requested_at
+        )
+        SELECT
+            (SELECT COUNT(*) FROM added),
+            (SELECT COUNT(*) FROM removed),
+            (SELECT count FROM updated)
+    """
+    params = {"post": post_id, "user": user_id, "type": reaction_type, "now": now}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        added_rows, removed_rows, count = cursor.fetchone()
+    if added_rows:
+        return ReactionResult(post_id, reaction_type, True, True, count)
+    if removed_rows:
+        return ReactionResult(post_id, reaction_type, False, True, count)
+    # Nothing changed: an add of an existing reaction (or one that lost an
+    # insert race), or a remove of a missing one.
+    return ReactionResult(post_id, reaction_type, action != REMOVE, False, count)
+
+
+def _apply_orm(post_id, user_id, reaction_type, action):
+    lookup = {"post_id": post_id, "user_id": user_id, "type": reaction_type}
+    with transaction.atomic():
+        existing = Reaction.objects.select_for_update().filter(**lookup).first()
+        if existing is not None and action in (REMOVE, TOGGLE):
+            existing.delete()
+            reacted, changed = False, True
+        elif existing is None and action in (ADD, TOGGLE):
+            Reaction.objects.create(**lookup)
+            reacted, changed = True, True
+        else:
+            reacted, changed = existing is not None, False
+        count = (
+            PostStats.objects.filter(post_id=post_id)
+            .values_list(PostStats.reaction_field(reaction_type), flat=True)
+            .first()
+        )
+    return ReactionResult(post_id, reaction_type, reacted, changed, count)
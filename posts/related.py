@@ -0,0 +1,157 @@
+"""Related posts.
+
+A post is described by a sparse feature vector: its tags, the scripture ranges
+it cites and the users who reacted to, shared or commented on it. Candidates
+come from the inverted lists that already exist for each feature (``PostTag``
+by tag, ``ScriptureRef`` by range, and the reaction, share and comment tables
+by user), each shared feature adds its weight from ``RELATED_POSTS_WEIGHTS``,
+and the best ``RELATED_POSTS_LIMIT`` are materialized in ``RelatedPost``, so
+serving a list is one indexed lookup.
+
+Lists are rebuilt incrementally: writes that change a post's features mark it
+in ``RelatedPostsRefresh``, and ``refresh_stale`` (run by
+``manage.py refresh_related_posts``) recomputes marked posts together with the
+posts whose lists may gain, lose or re-rank them.
+"""
+
+import math
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import scripture
+from .models import Post, PostShare, PostTag, Reaction, RelatedPost, RelatedPostsRefresh, ScriptureRef, TagStat
+
+
+def mark_stale(post_ids):
+    """Queue ``post_ids`` for a refresh of their related posts."""
+
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    now = timezone.now()
+    RelatedPostsRefresh.objects.bulk_create(
+        [RelatedPostsRefresh(post_id=post_id, requested_at=now) for post_id in post_ids],
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=["requested_at"],
+    )
+
+
+def _engaged_users(post_id):
+    Comment = apps.get_model("comments", "Comment")
+    limit = settings.RELATED_POSTS_MAX_ENGAGED_USERS
+    users = set()
+    for model, field in ((Reaction, "user_id"), (PostShare, "user_id"), (Comment, "author_id")):
+        rows = model.objects.filter(post_id=post_id).order_by("-created_at").values_list(field, flat=True)
+        users.update(rows[:limit])
+    return users
+
+
+def related_scores(post_id):
+    """``[(related post id, score)]`` for ``post_id``, best first, at most ``RELATED_POSTS_LIMIT``."""
+
+    if not Post.objects.filter(pk=post_id, status="published").exists():
+        return []
+    weights = settings.RELATED_POSTS_WEIGHTS
+    cap = settings.RELATED_POSTS_MAX_CANDIDATES
+    scores = defaultdict(float)
+
+    tags = list(PostTag.objects.filter(post_id=post_id).values_list("tag", flat=True))
+    popularity = dict(TagStat.objects.filter(tag__in=tags).values_list("tag", "post_count"))
+    for tag in tags:
+        # A tag on thousands of posts says less than a rare one.
+        weight = weights["tag"] / math.log2(2 + popularity.get(tag, 0))
+        rows = (
+            PostTag.objects.filter(tag=tag, is_published=True)
+            .exclude(post_id=post_id)
+            .order_by("-post_id")
+            .values_list("post_id", flat=True)
+        )
+        for other in rows[:cap]:
+            scores[other] += weight
+
+    ranges = list(ScriptureRef.objects.filter(post_id=post_id).values_list("book", "start", "end"))
+    if ranges:
+        rows = (
+            ScriptureRef.objects.filter(scripture.overlapping([scripture.ScriptureRange(*found) for found in ranges]))
+            .filter(post__status="published")
+            .exclude(post_id=post_id)
+            .order_by("-post_id")
+            .values_list("post_id", flat=True)
+        )
+        for other in rows[:cap]:
+            scores[other] += weights["scripture"]
+
+    users = _engaged_users(post_id)
+    if users:
+        Comment = apps.get_model("comments", "Comment")
+        shared = defaultdict(set)
+        for model, field in ((Reaction, "user_id"), (PostShare, "user_id"), (Comment, "author_id")):
+            rows = (
+                model.objects.filter(**{f"{field}__in": users}, post__status="published")
+                .exclude(post_id=post_id)
+                .order_by("-post_id")
+                .values_list("post_id", field)
+                .distinct()
+            )
+            for other, user_id in rows[:cap]:
+                shared[other].add(user_id)
+        for other, engaged in shared.items():
+            # Logarithmic, so one very busy post does not crowd out the rest.
+            scores[other] += weights["user"] * math.log2(1 + len(engaged))
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+    return ranked[: settings.RELATED_POSTS_LIMIT]
+
+
+def refresh(post_ids, neighbours=True):
+    """Recompute and store the related posts of ``post_ids``.
+
+    Relatedness is symmetric, so with ``neighbours`` the posts that listed any
+    of them, or that they now list, are recomputed as well (one hop only).
+    Returns the number of lists written.
+    """
+
+    post_ids = set(post_ids)
+    lists = {post_id: related_scores(post_id) for post_id in post_ids}
+    if neighbours:
+        affected = set(RelatedPost.objects.filter(related_id__in=post_ids).values_list("post_id", flat=True))
+        for entries in lists.values():
+            affected.update(related_id for related_id, _ in entries)
+        for post_id in affected - post_ids:
+            lists[post_id] = related_scores(post_id)
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=list(lists)).delete()
+        RelatedPost.objects.bulk_create(
+            [
+                RelatedPost(post_id=post_id, related_id=related_id, score=score)
+                for post_id, entries in lists.items()
+                for related_id, score in entries
+            ]
+        )
+    return len(lists)
+
+
+def refresh_stale(limit):
+    """Refresh up to ``limit`` of the posts marked stale, oldest mark first.
+
+    Marks made while the refresh runs are kept for the next call.
+    """
+
+    started = timezone.now()
+    post_ids = list(
+        RelatedPostsRefresh.objects.filter(requested_at__lte=started)
+        .order_by("requested_at")
+        .values_list("post_id", flat=True)[:limit]
+    )
+    if not post_ids:
+        return 0
+    with transaction.atomic():
+        refresh(post_ids)
+        RelatedPostsRefresh.objects.filter(post_id__in=post_ids, requested_at__lte=started).delete()
+    return len(post_ids)
@@ -0,0 +1,308 @@
+"""Scripture reference parsing.
+
+``parse_references("Rom 8:28-30; 12:1, 2")`` turns the free-form strings in
+``Post.scripture_refs`` into canonical ``ScriptureRange`` values: a book number
+(1-66, Protestant canon order) and inclusive ``start``/``end`` positions encoded
+as ``chapter * 1000 + verse``. A whole chapter spans verses 0-999, so any two
+ranges in the same book overlap exactly when ``a.start <= b.end and
+b.start <= a.end``, which is what the ``ScriptureRef`` index answers.
+
+Unrecognized books and impossible chapters are skipped rather than rejected:
+the strings were entered freely and stay on the post as written.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db.models import Count, Q
+
+from .models import Post, ScriptureRef
+
+VERSE_SPAN = 1000
+WHOLE_CHAPTER_END = VERSE_SPAN - 1
+
+# (canonical name, chapters, extra abbreviations). Names and abbreviations are
+# matched case-insensitively with spaces and dots removed.
+BOOKS = (
+    ("Genesis", 50, ("gen", "ge", "gn")),
+    ("Exodus", 40, ("exod", "exo", "ex")),
+    ("Leviticus", 27, ("lev", "le", "lv")),
+    ("Numbers", 36, ("num", "nu", "nm", "numb")),
+    ("Deuteronomy", 34, ("deut", "dt", "de")),
+    ("Joshua", 24, ("josh", "jos", "jsh")),
+    ("Judges", 21, ("judg", "jdg", "jg")),
+    ("Ruth", 4, ("rth", "ru")),
+    ("1 Samuel", 31, ("1sam", "1sa", "1sm")),
+    ("2 Samuel", 24, ("2sam", "2sa", "2sm")),
+    ("1 Kings", 22, ("1kgs", "1ki", "1kg", "1kin")),
+    ("2 Kings", 25, ("2kgs", "2ki", "2kg", "2kin")),
+    ("1 Chronicles", 29, ("1chron", "1chr", "1ch")),
+    ("2 Chronicles", 36, ("2chron", "2chr", "2ch")),
+    ("Ezra", 10, ("ezr",)),
+    ("Nehemiah", 13, ("neh", "ne")),
+    ("Esther", 10, ("esth", "est", "es")),
+    ("Job", 42, ("jb",)),
+    ("Psalms", 150, ("psalm", "ps", "psa", "pss", "psm")),
+    ("Proverbs", 31, ("prov", "pro", "prv", "pr")),
+    ("Ecclesiastes", 12, ("eccl", "eccles", "ecc", "qoh")),
+    ("Song of Solomon", 8, ("songofsongs", "song", "sos", "canticles")),
+    ("Isaiah", 66, ("isa", "is")),
+    ("Jeremiah", 52, ("jer", "je", "jr")),
+    ("Lamentations", 5, ("lam", "la")),
+    ("Ezekiel", 48, ("ezek", "eze", "ezk")),
+    ("Daniel", 12, ("dan", "da", "dn")),
+    ("Hosea", 14, ("hos", "ho")),
+    ("Joel", 3, ("jl",)),
+    ("Amos", 9, ("am",)),
+    ("Obadiah", 1, ("obad", "ob")),
+    ("Jonah", 4, ("jon", "jnh")),
+    ("Micah", 7, ("mic", "mc")),
+    ("Nahum", 3, ("nah", "na")),
+    ("Habakkuk", 3, ("hab", "hb")),
+    ("Zephaniah", 3, ("zeph", "zep", "zp")),
+    ("Haggai", 2, ("hag", "hg")),
+    ("Zechariah", 14, ("zech", "zec", "zc")),
+    ("Malachi", 4, ("mal", "ml")),
+    ("Matthew", 28, ("matt", "mat", "mt")),
+    ("Mark", 16, ("mrk", "mar", "mk", "mr")),
+    ("Luke", 24, ("luk", "lk")),
+    ("John", 21, ("jhn", "jn")),
+    ("Acts", 28, ("act", "ac")),
+    ("Romans", 16, ("rom", "ro", "rm")),
+    ("1 Corinthians", 16, ("1cor", "1co")),
+    ("2 Corinthians", 13, ("2cor", "2co")),
+    ("Galatians", 6, ("gal", "ga")),
+    ("Ephesians", 6, ("eph", "ephes")),
+    ("Philippians", 4, ("phil", "php", "pp")),
+    ("Colossians", 4, ("col", "co")),
+    ("1 Thessalonians", 5, ("1thess", "1thes", "1th")),
+    ("2 Thessalonians", 3, ("2thess", "2thes", "2th")),
+    ("1 Timothy", 6, ("1tim", "1ti")),
+    ("2 Timothy", 4, ("2tim", "2ti")),
+    ("Titus", 3, ("tit", "ti")),
+    ("Philemon", 1, ("philem", "phlm", "phm", "pm")),
+    ("Hebrews", 13, ("heb",)),
+    ("James", 5, ("jas", "jm")),
+    ("1 Peter", 5, ("1pet", "1pe", "1pt")),
+    ("2 Peter", 3, ("2pet", "2pe", "2pt")),
+    ("1 John", 5, ("1jn", "1jhn", "1jo")),
+    ("2 John", 1, ("2jn", "2jhn", "2jo")),
+    ("3 John", 1, ("3jn", "3jhn", "3jo")),
+    ("Jude", 1, ("jud", "jd")),
+    ("Revelation", 22, ("rev", "re", "revelations", "apocalypse")),
+)
+
+_NUMBERED_PREFIXES = {"i": "1", "ii": "2", "iii": "3", "first": "1", "second": "2", "third": "3",
+                      "1st": "1", "2nd": "2", "3rd": "3"}
+_NUMBERED_RE = re.compile(r"^(iii|ii|i|first|second|third|1st|2nd|3rd)(?=\s|\.)", re.IGNORECASE)
+
+
+def _key(name):
+    return re.sub(r"[\s.]+", "", name).lower()
+
+
+def _build_aliases():
+    aliases = {}
+    for number, (name, _, abbreviations) in enumerate(BOOKS, start=1):
+        for alias in (name, *abbreviations):
+            aliases.setdefault(_key(alias), number)
+    return aliases
+
+
+_ALIASES = _build_aliases()
+
+# "<book> <chapter>[:<verse>][-[<chapter>:]<verse>]"; the book may be absent in
+# continuations such as the "12:1" in "Rom 8:28; 12:1".
+_REFERENCE_RE = re.compile(
+    r"""^\s*
+    (?P<book>(?:[1-3]|i{1,3}|first|second|third|1st|2nd|3rd)?\s*\.?\s*[a-z][a-z .]*?)?\s*\.?\s*
+    (?P<chapter>\d+)
+    (?:\s*[:.]\s*(?P<verse>\d+)[a-z]?)?
+    (?:\s*[-–—]\s*(?:(?P<end_chapter>\d+)\s*[:.]\s*)?(?P<end>\d+)[a-z]?)?
+    \s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+_SEPARATOR_RE = re.compile(r"\s*([;,])\s*")
+
+
+class ScriptureRange(namedtuple("ScriptureRange", ["book", "start", "end"])):
+    __slots__ = ()
+
+    @property
+    def book_name(self):
+        return BOOKS[self.book - 1][0]
+
+    def __str__(self):
+        return format_range(self.book, self.start, self.end)
+
+
+def lookup_book(name):
+    """Book number for a name or abbreviation, or None."""
+
+    if not name:
+        return None
+    match = _NUMBERED_RE.match(name.strip())
+    if match:
+        name = _NUMBERED_PREFIXES[match.group(1).lower()] + name.strip()[match.end():]
+    return _ALIASES.get(_key(name))
+
+
+def _range(book, chapter, verse, end_chapter, end_verse):
+    chapters = BOOKS[book - 1][1]
+    if chapters == 1 and verse is None and end_chapter is None:
+        # "Jude 3" and "Philemon 4-6" name verses of the only chapter.
+        chapter, verse, end_verse = 1, chapter, end_verse
+    if verse is None:
+        # "Romans 8" or the chapter range "Romans 8-9".
+        last = end_verse if end_verse is not None else chapter
+        if not 1 <= chapter <= last <= chapters:
+            return None
+        return ScriptureRange(book, chapter * VERSE_SPAN, last * VERSE_SPAN + WHOLE_CHAPTER_END)
+    end_chapter = end_chapter if end_chapter is not None else chapter
+    end_verse = end_verse if end_verse is not None else verse
+    start, end = chapter * VERSE_SPAN + verse, end_chapter * VERSE_SPAN + end_verse
+    if not (1 <= chapter <= end_chapter <= chapters and 1 <= verse and 1 <= end_verse < VERSE_SPAN and start <= end):
+        return None
+    return ScriptureRange(book, start, end)
+
+
+def parse_references(text):
+    """All ranges in ``text``; ``;`` and ``,`` continue the previous book and chapter."""
+
+    ranges = []
+    book = chapter = None
+    in_verses = False
+    parts = _SEPARATOR_RE.split(text or "")
+    separator = ";"
+    for index in range(0, len(parts), 2):
+        part = parts[index]
+        if index:
+            separator = parts[index - 1]
+        match = _REFERENCE_RE.match(part)
+        if not match:
+            continue
+        groups = match.groupdict()
+        numbers = [int(groups[key]) if groups[key] else None for key in ("chapter", "verse", "end_chapter", "end")]
+        if groups["book"] and groups["book"].strip(" ."):
+            book = lookup_book(groups["book"])
+            in_verses = False
+        elif book is None:
+            continue
+        elif separator == "," and in_verses and numbers[1] is None:
+            # "Rom 8:28, 31-32": bare numbers after a comma are more verses.
+            numbers = [chapter, numbers[0], None, numbers[3]]
+        if book is None:
+            continue
+        found = _range(book, *numbers)
+        if found is None:
+            continue
+        ranges.append(found)
+        chapter = found.end // VERSE_SPAN
+        in_verses = found.end % VERSE_SPAN != WHOLE_CHAPTER_END
+    return ranges
+
+
+def parse_post_references(refs):
+    """De-duplicated ranges for every string in a post's ``scripture_refs``."""
+
+    ranges = []
+    for ref in refs or []:
+        if isinstance(ref, str):
+            for found in parse_references(ref):
+                if found not in ranges:
+                    ranges.append(found)
+    return ranges
+
+
+def parse_passage(text):
+    """Ranges for a search such as "Romans 8"; a bare book name covers the whole book."""
+
+    ranges = parse_references(text)
+    if not ranges:
+        book = lookup_book(text)
+        if book is not None:
+            ranges = [ScriptureRange(book, 0, (BOOKS[book - 1][1] + 1) * VERSE_SPAN - 1)]
+    return ranges
+
+
+def format_range(book, start, end):
+    name = BOOKS[book - 1][0]
+    chapter, verse = divmod(start, VERSE_SPAN)
+    end_chapter, end_verse = divmod(end, VERSE_SPAN)
+    if verse == 0 and end_verse == WHOLE_CHAPTER_END:
+        return f"{name} {chapter}" if chapter == end_chapter else f"{name} {chapter}-{end_chapter}"
+    if BOOKS[book - 1][1] == 1:
+        return f"{name} {verse}" if start == end else f"{name} {verse}-{end_verse}"
+    if start == end:
+        return f"{name} {chapter}:{verse}"
+    if chapter == end_chapter:
+        return f"{name} {chapter}:{verse}-{end_verse}"
+    return f"{name} {chapter}:{verse}-{end_chapter}:{end_verse}"
+
+
+def sync_post_references(post):
+    """Bring ``post``'s ScriptureRef rows in line with ``post.scripture_refs``."""
+
+    wanted = set(parse_post_references(post.scripture_refs))
+    existing = {
+        ScriptureRange(*row): pk
+        for pk, *row in ScriptureRef.objects.filter(post=post).values_list("pk", "book", "start", "end")
+    }
+    stale = [pk for found, pk in existing.items() if found not in wanted]
+    if stale:
+        ScriptureRef.objects.filter(pk__in=stale).delete()
+    added = [found for found in wanted if found not in existing]
+    if added:
+        ScriptureRef.objects.bulk_create(
+            [ScriptureRef(post=post, book=found.book, start=found.start, end=found.end) for found in added],
+            ignore_conflicts=True,
+        )
+
+
+def overlapping(ranges):
+    """``Q`` matching ScriptureRef rows that share at least one verse with ``ranges``."""
+
+    condition = Q()
+    for found in ranges:
+        condition |= Q(book=found.book, start__lte=found.end, end__gte=found.start)
+    return condition
+
+
+def filter_by_passage(queryset, text):
+    """Posts citing any verse of the passage ``text``; ValueError if it does not parse."""
+
+    ranges = parse_passage(text)
+    if not ranges:
+        raise ValueError(f'"{text}" is not a recognized scripture reference.')
+    return queryset.filter(pk__in=ScriptureRef.objects.filter(overlapping(ranges)).values("post_id"))
+
+
+def most_cited(limit, book=None):
+    """The ranges cited by the most published posts, optionally within one book."""
+
+    rows = ScriptureRef.objects.filter(post__status="published")
+    if book is not None:
+        rows = rows.filter(book=book)
+    rows = (
+        rows.values_list("book", "start", "end")
+        .annotate(count=Count("post_id"))
+        .order_by("-count", "book", "start", "end")[:limit]
+    )
+    return [
+        {"reference": format_range(book, start, end), "book": BOOKS[book - 1][0], "count": count}
+        for book, start, end, count in rows
+    ]
+
+
+def rebuild(post_ids):
+    """Re-parse ``scripture_refs`` for ``post_ids`` into ScriptureRef rows."""
+
+    posts = list(Post.objects.filter(pk__in=post_ids).values_list("pk", "scripture_refs"))
+    ScriptureRef.objects.filter(post_id__in=post_ids).delete()
+    rows = [
+        ScriptureRef(post_id=post_id, book=found.book, start=found.start, end=found.end)
+        for post_id, refs in posts
+        for found in parse_post_references(refs)
+    ]
+    ScriptureRef.objects.bulk_create(rows)
+    return len(rows)
@@ -0,0 +1,126 @@
+"""Ranked full-text search over posts.
+
+Two backends share one interface, ``search(queryset, query)``, which filters
+``queryset`` to matching posts and annotates ``search_rank`` (higher is better)
+and ``headline`` (a snippet with matches wrapped in ``<mark>``):
+
+* ``postgres``: a generated ``search_vector`` tsvector column (title weighted
+  above content) with a GIN index, created by migration 0009. PostgreSQL keeps
+  the column current on every write, including ``update()`` and ``bulk_create``.
+* ``sqlite``: an FTS5 table ``posts_post_fts`` keyed by post id, kept in sync
+  by the save/delete hooks in posts/signals.py (see ``index_post``).
+
+``get_search_backend()`` picks the backend for the default database unless
+``POST_SEARCH_BACKEND`` names one explicitly.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, TextField
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+SEARCH_CONFIG = "english"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+FTS_TABLE = "posts_post_fts"
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class PostgresSearchBackend:
+    name = "postgres"
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+
+        table = connection.ops.quote_name(Post._meta.db_table)
+        vector = RawSQL(f"{table}.search_vector", [], output_field=SearchVectorField())
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.alias(search_vector=vector)
+            .filter(search_vector=search_query)
+            .annotate(
+                search_rank=SearchRank(vector, search_query, normalization=32),
+                headline=SearchHeadline(
+                    "content",
+                    search_query,
+                    config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START,
+                    stop_sel=HIGHLIGHT_STOP,
+                    max_words=35,
+                    min_words=15,
+                ),
+            )
+        )
+
+
+class SQLiteSearchBackend:
+    name = "sqlite"
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        table = connection.ops.quote_name(Post._meta.db_table)
+        # bm25() and snippet() only work inside an FTS query, hence the
+        # correlated subqueries; bm25 is negated so that higher ranks better.
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        headline = RawSQL(
+            f"SELECT snippet({FTS_TABLE}, 1, %s, %s, '…', 24) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id",
+            [HIGHLIGHT_START, HIGHLIGHT_STOP, match],
+            output_field=TextField(),
+        )
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank, headline=headline)
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input cannot inject FTS5 query syntax.
+        terms = _TERM_RE.findall(query)
+        return " ".join(f'"{term}"' for term in terms)
+
+
+SEARCH_BACKENDS = {
+    PostgresSearchBackend.name: PostgresSearchBackend,
+    SQLiteSearchBackend.name: SQLiteSearchBackend,
+}
+
+_VENDOR_BACKENDS = {"postgresql": PostgresSearchBackend.name, "sqlite": SQLiteSearchBackend.name}
+
+
+def get_search_backend(name=None):
+    name = name or settings.POST_SEARCH_BACKEND or _VENDOR_BACKENDS.get(connection.vendor)
+    try:
+        return SEARCH_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"No post search backend for '{name or connection.vendor}'.")
+
+
+def index_post(post):
+    """Refresh ``post`` in the FTS5 table (no-op on databases with a generated column)."""
+
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)",
+            [post.pk, post.title, post.content],
+        )
+
+
+def unindex_post(post_id):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
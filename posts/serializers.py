@@ -1,15 +1,54 @@
-from django.db.models import Count
+from django.db import models
 from rest_framework import serializers
-from .models import Post, Reaction
-from users.serializers import UserProfileSerializer # To display author info
+from salt_and_light.images import pick, requested_size
+from .models import Post, PostShare, PostStats, Reaction
+from core.serializers import SparseFieldsetMixin
+from users.serializers import UserProfileSerializer, UserSummarySerializer, attach_follow_stats # To display author info
 
-class PostSerializer(serializers.ModelSerializer):
+
+class PostListSerializer(serializers.ListSerializer):
+    """Loads the viewer's reactions/shares and the authors' follow stats for a
+    whole page up front, so the number of queries does not grow with page size."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager) else data)
+        request = self.context.get('request')
+        viewer = getattr(request, 'user', None)
+        post_ids = [post.pk for post in posts]
+        # Only load what the (possibly trimmed, see SparseFieldsetMixin) child renders.
+        fields = self.child.fields
+        authenticated = viewer is not None and viewer.is_authenticated and post_ids
+
+        if 'user_reactions' in fields:
+            reactions = {post_id: [] for post_id in post_ids}
+            if authenticated:
+                for post_id, reaction_type in Reaction.objects.filter(
+                    user=viewer, post_id__in=post_ids
+                ).values_list('post_id', 'type'):
+                    reactions[post_id].append(reaction_type)
+            for post in posts:
+                post.viewer_reactions = reactions[post.pk]
+        if 'has_shared' in fields:
+            shared = set()
+            if authenticated:
+                shared = set(
+                    PostShare.objects.filter(user=viewer, post_id__in=post_ids).values_list('post_id', flat=True)
+                )
+            for post in posts:
+                post.viewer_has_shared = post.pk in shared
+        if isinstance(fields.get('author'), UserProfileSerializer):
+            attach_follow_stats([post.author for post in posts], viewer)
+
+        return super().to_representation(posts)
+
+
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserProfileSerializer(read_only=True) # Embed author details
     reaction_counts = serializers.SerializerMethodField()
     share_count = serializers.SerializerMethodField()
     user_reactions = serializers.SerializerMethodField()
     has_shared = serializers.SerializerMethodField()
-    comment_count = serializers.IntegerField(read_only=True, default=0)
+    comment_count = serializers.SerializerMethodField()
     # You might want to include files here too, but for simplicity, let's assume files are managed separately
     # and linked later or fetched by a separate API call.
 
@@ -28,6 +67,7 @@ class PostSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
             'ai_moderation_feedback',
+            'duplicate_of',
             'reaction_counts',
             'share_count',
             'user_reactions',
@@ -41,6 +81,7 @@ class PostSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
             'ai_moderation_feedback',
+            'duplicate_of',
             'reaction_counts',
             'share_count',
             'user_reactions',
@@ -50,6 +91,7 @@ class PostSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'image_url': {'required': False, 'allow_null': True, 'allow_blank': True},
         }
+        list_serializer_class = PostListSerializer
 
     def create(self, validated_data):
         # The author will be automatically set by the view based on the authenticated user
@@ -62,25 +104,76 @@ class PostSerializer(serializers.ModelSerializer):
         # post.save()
         return post
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        size = requested_size(self.context)
+        if size and data.get('image_url'):
+            data['image_url'] = pick(data['image_url'], instance.image_variants, size)
+        return data
+
+    def _stats(self, obj):
+        # Counters are denormalized onto PostStats (see posts/signals.py).
+        try:
+            return obj.stats
+        except PostStats.DoesNotExist:
+            return PostStats(post=obj)
+
     def get_reaction_counts(self, obj):
-        reaction_summary = obj.reactions.values('type').annotate(count=Count('id'))
-        return {item['type']: item['count'] for item in reaction_summary}
+        return self._stats(obj).reaction_counts()
 
     def get_share_count(self, obj):
-        return obj.shares.count()
+        return self._stats(obj).share_count
+
+    def get_comment_count(self, obj):
+        return self._stats(obj).comment_count
 
     def get_user_reactions(self, obj):
+        annotated_value = getattr(obj, 'viewer_reactions', None)
+        if annotated_value is not None:
+            return annotated_value
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return list(obj.reactions.filter(user=request.user).values_list('type', flat=True))
         return []
 
     def get_has_shared(self, obj):
+        annotated_value = getattr(obj, 'viewer_has_shared', None)
+        if annotated_value is not None:
+            return annotated_value
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.shares.filter(user=request.user).exists()
         return False
 
+class PostCardSerializer(PostSerializer):
+    """Compact list item for feeds: no body, moderation data or viewer state,
+    and a byline instead of the full author profile."""
+
+    author = UserSummarySerializer(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = [
+            'id',
+            'title',
+            'excerpt',
+            'image_url',
+            'author',
+            'created_at',
+            'reaction_counts',
+            'share_count',
+            'comment_count',
+        ]
+        read_only_fields = fields
+
+
+class PostSearchResultSerializer(PostSerializer):
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['rank', 'headline']
+
+
 class ReactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reaction
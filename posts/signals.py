@@ -0,0 +1,86 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import blobs
+from salt_and_light.storage import get_storage
+from users.models import Follow
+
+from . import fingerprint, related, scripture, search, tagging, timeline, trending
+from .models import Post, PostShare, PostStats, Reaction, RelatedPost
+
+
+@receiver(post_save, sender=Reaction)
+def reaction_added(sender, instance, created, **kwargs):
+    if created:
+        PostStats.objects.bump_reaction(instance.post_id, instance.type, 1)
+        trending.record_event(instance.post_id, "reaction", instance.created_at)
+        related.mark_stale([instance.post_id])
+
+
+@receiver(post_delete, sender=Reaction)
+def reaction_removed(sender, instance, **kwargs):
+    PostStats.objects.bump_reaction(instance.post_id, instance.type, -1)
+    related.mark_stale([instance.post_id])
+
+
+@receiver(post_save, sender=PostShare)
+def share_added(sender, instance, created, **kwargs):
+    if created:
+        PostStats.objects.bump(instance.post_id, share_count=1)
+        trending.record_event(instance.post_id, "share", instance.created_at)
+        related.mark_stale([instance.post_id])
+
+
+@receiver(post_delete, sender=PostShare)
+def share_removed(sender, instance, **kwargs):
+    PostStats.objects.bump(instance.post_id, share_count=-1)
+    related.mark_stale([instance.post_id])
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"title", "content"} & set(update_fields):
+        search.index_post(instance)
+    if update_fields is None or "content" in update_fields:
+        fingerprint.sync_post_fingerprint(instance)
+    if update_fields is None or {"tags", "status"} & set(update_fields):
+        tagging.sync_post_tags(instance)
+    if update_fields is None or "scripture_refs" in update_fields:
+        scripture.sync_post_references(instance)
+    if update_fields is None or "status" in update_fields:
+        timeline.post_status_changed(instance)
+    if update_fields is None or {"tags", "status", "scripture_refs"} & set(update_fields):
+        related.mark_stale([instance.pk])
+    previous_image_url = getattr(instance, "_loaded_image_url", None)
+    if (update_fields is None or "image_url" in update_fields) and instance.image_url != previous_image_url:
+        blobs.retain_url(blobs.POST_IMAGES, instance.image_url)
+        blobs.release_url(blobs.POST_IMAGES, previous_image_url, delete=_delete_post_image)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # PostTag rows go with the post, so release its tag counts first.
+    tagging.forget_post_tags(instance)
+    # Lists that show the post lose a row to the cascade; refill them.
+    related.mark_stale(RelatedPost.objects.filter(related=instance).values_list("post_id", flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+    blobs.release_url(blobs.POST_IMAGES, instance.image_url, delete=_delete_post_image)
+
+
+def _delete_post_image(path):
+    get_storage().delete(path)
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(sender, instance, created, **kwargs):
+    if created:
+        timeline.followed(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(sender, instance, **kwargs):
+    timeline.unfollowed(instance.follower_id, instance.following_id)
@@ -0,0 +1,155 @@
+"""Normalized post tags.
+
+``Post.tags`` stays the source of truth; every write mirrors it into
+``PostTag`` rows (indexed by tag) and adjusts the per-tag published counts in
+``TagStat`` by the difference, so tag filters and the facet endpoint read small
+indexed tables instead of decoding every post's JSON.
+"""
+
+import re
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Post, PostTag, TagStat
+
+MAX_TAG_LENGTH = 50
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_tags(tags):
+    """Lower-case, trim and de-duplicate tags, dropping a leading '#'."""
+
+    normalized = []
+    for tag in tags or []:
+        if not isinstance(tag, str):
+            continue
+        tag = _SPACES_RE.sub(" ", tag).strip().lstrip("#").strip().lower()[:MAX_TAG_LENGTH]
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+def _is_published(post):
+    return post.status == "published"
+
+
+def sync_post_tags(post):
+    """Bring ``post``'s PostTag rows and the TagStat counts in line with the post."""
+
+    wanted = set(normalize_tags(post.tags))
+    published = _is_published(post)
+    existing = dict(PostTag.objects.filter(post=post).values_list("tag", "is_published"))
+
+    deltas = Counter()
+    removed = [tag for tag in existing if tag not in wanted]
+    flipped = [tag for tag in existing if tag in wanted and existing[tag] != published]
+    added = [tag for tag in wanted if tag not in existing]
+
+    with transaction.atomic():
+        if removed:
+            PostTag.objects.filter(post=post, tag__in=removed).delete()
+            for tag in removed:
+                if existing[tag]:
+                    deltas[tag] -= 1
+        if flipped:
+            PostTag.objects.filter(post=post, tag__in=flipped).update(is_published=published)
+            for tag in flipped:
+                deltas[tag] += 1 if published else -1
+        if added:
+            PostTag.objects.bulk_create(
+                [PostTag(post=post, tag=tag, is_published=published) for tag in added],
+                ignore_conflicts=True,
+            )
+            if published:
+                for tag in added:
+                    deltas[tag] += 1
+        _apply_deltas(deltas)
+
+
+def forget_post_tags(post):
+    """Drop a post's contribution to the tag counts before it is deleted."""
+
+    tags = list(PostTag.objects.filter(post=post, is_published=True).values_list("tag", flat=True))
+    _apply_deltas(Counter({tag: -1 for tag in tags}))
+
+
+def _apply_deltas(deltas):
+    for tag, delta in deltas.items():
+        if not delta:
+            continue
+        if TagStat.objects.filter(tag=tag).update(post_count=Greatest(F("post_count") + delta, 0)):
+            continue
+        if delta > 0:
+            try:
+                with transaction.atomic():
+                    TagStat.objects.create(tag=tag, post_count=delta)
+            except IntegrityError:
+                TagStat.objects.filter(tag=tag).update(post_count=F("post_count") + delta)
+
+
+def filter_by_tags(queryset, tags, match="any"):
+    """Restrict a post queryset to posts carrying any (or all) of ``tags``."""
+
+    tags = normalize_tags(tags)
+    if not tags:
+        return queryset
+    rows = PostTag.objects.filter(tag__in=tags)
+    if match == "all" and len(tags) > 1:
+        post_ids = rows.values("post_id").annotate(matched=Count("tag")).filter(matched=len(tags)).values("post_id")
+    else:
+        post_ids = rows.values("post_id")
+    return queryset.filter(pk__in=post_ids)
+
+
+def tag_facets(limit, tags=None):
+    """``[{"tag", "count"}]`` for the most used tags among published posts.
+
+    With ``tags``, counts the other tags on published posts carrying all of them.
+    """
+
+    tags = normalize_tags(tags)
+    if not tags:
+        rows = TagStat.objects.filter(post_count__gt=0).order_by("-post_count", "tag")[:limit]
+        return [{"tag": row.tag, "count": row.post_count} for row in rows]
+
+    post_ids = filter_by_tags(Post.objects.filter(status="published"), tags, match="all").values("pk")
+    rows = (
+        PostTag.objects.filter(post_id__in=post_ids, is_published=True)
+        .exclude(tag__in=tags)
+        .values("tag")
+        .annotate(count=Count("post_id"))
+        .order_by("-count", "tag")[:limit]
+    )
+    return list(rows)
+
+
+def rebuild(post_ids):
+    """Re-derive PostTag rows for ``post_ids`` from ``Post.tags``."""
+
+    posts = list(Post.objects.filter(pk__in=post_ids).only("pk", "tags", "status"))
+    PostTag.objects.filter(post_id__in=post_ids).delete()
+    PostTag.objects.bulk_create(
+        [
+            PostTag(post=post, tag=tag, is_published=_is_published(post))
+            for post in posts
+            for tag in normalize_tags(post.tags)
+        ]
+    )
+    return len(posts)
+
+
+def rebuild_counts():
+    counts = dict(
+        PostTag.objects.filter(is_published=True).values_list("tag").annotate(total=Count("post_id"))
+    )
+    TagStat.objects.exclude(tag__in=list(counts)).delete()
+    TagStat.objects.bulk_create(
+        [TagStat(tag=tag, post_count=total) for tag, total in counts.items()],
+        update_conflicts=True,
+        unique_fields=["tag"],
+        update_fields=["post_count"],
+    )
+    return len(counts)
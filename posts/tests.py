@@ -1,3 +1,1273 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import tracemalloc
+from concurrent.futures import Future
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from comments.models import Comment
+from core.models import StoredBlob
+from moderation.models import ModerationJob
+from salt_and_light import images, storage, supabase_client
+from users.models import Follow, User
+from . import fingerprint, reactions, related, scripture, search, tagging, timeline, trending, view_counter
+from .models import (
+    Post,
+    PostShare,
+    PostStats,
+    PostTag,
+    PostTrendingScore,
+    Reaction,
+    RelatedPost,
+    RelatedPostsRefresh,
+    TagStat,
+    TimelineEntry,
+)
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class PostAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password123",
+        )
+        self.list_url = reverse("post-list")
+
+    def test_create_post_is_queued_for_moderation(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.list_url,
+            {"title": "Morning devotion", "content": "Give thanks in all circumstances."},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get(pk=response.data["id"])
+        self.assertEqual(post.status, "pending")
+        self.assertEqual(ModerationJob.objects.filter(object_id=str(post.pk)).count(), 1)
+
+
+@override_settings(MODERATION_BACKEND="stub", POST_VIEW_FLUSH_INTERVAL_SECONDS=0)
+class PostCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="password123",
+        )
+        self.post = Post.objects.create(
+            author=self.user, title="Psalm 23", content="The Lord is my shepherd.", status="published"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_counters_follow_reactions_shares_and_comments(self):
+        react_url = reverse("post-react", args=[self.post.pk])
+        self.client.post(react_url, {"type": "amen"}, format="json")
+        self.client.post(react_url, {"type": "pray"}, format="json")
+        self.client.post(reverse("post-share", args=[self.post.pk]), {"platform": "link"}, format="json")
+        comment = Comment.objects.create(post=self.post, author=self.user, content="Amen!")
+
+        response = self.client.get(reverse("post-detail", args=[self.post.pk]))
+        self.assertEqual(response.data["reaction_counts"], {"pray": 1, "amen": 1})
+        self.assertEqual(response.data["share_count"], 1)
+        self.assertEqual(response.data["comment_count"], 1)
+
+        self.client.post(react_url, {"type": "amen"}, format="json")
+        comment.delete()
+        stats = PostStats.objects.get(post=self.post)
+        self.assertEqual((stats.amen_count, stats.pray_count, stats.reaction_count), (0, 1, 1))
+        self.assertEqual(stats.comment_count, 0)
+
+    def test_reconcile_command_rebuilds_drifted_counters(self):
+        Reaction.objects.create(post=self.post, user=self.user, type="like")
+        PostShare.objects.create(post=self.post, user=self.user, platform="link")
+        PostStats.objects.filter(post=self.post).update(like_count=7, reaction_count=7, share_count=0)
+
+        call_command("reconcile_post_counters", chunk_size=1, stdout=StringIO())
+
+        stats = PostStats.objects.get(post=self.post)
+        self.assertEqual((stats.like_count, stats.reaction_count, stats.share_count), (1, 1, 1))
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class PostListQueryTests(APITestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(
+            username="viewer",
+            email="viewer@example.com",
+            password="password123",
+        )
+        self.client.force_authenticate(user=self.viewer)
+
+    def _add_posts(self, count):
+        for index in range(count):
+            author = User.objects.create_user(
+                username=f"author{Post.objects.count()}",
+                email=f"author{Post.objects.count()}@example.com",
+                password="password123",
+            )
+            Follow.objects.create(follower=self.viewer, following=author)
+            post = Post.objects.create(author=author, title="Verse", content="Be still.", status="published")
+            Reaction.objects.create(post=post, user=self.viewer, type="amen")
+            if index % 2:
+                PostShare.objects.create(post=post, user=self.viewer, platform="link")
+
+    def _list_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("post-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def _list_sql(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("post-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, " ".join(query["sql"] for query in queries)
+
+    def test_card_view_skips_viewer_state_and_heavy_columns(self):
+        self._add_posts(3)
+        Post.objects.update(content="word " * 100)
+        _, full_queries = self._list_queries()
+        response, card_queries = self._list_queries(view="card")
+
+        self.assertLess(card_queries, full_queries)
+        item = response.data["results"][0]
+        self.assertEqual(
+            set(item),
+            {"id", "title", "excerpt", "image_url", "author", "created_at", "reaction_counts", "share_count", "comment_count"},
+        )
+        self.assertEqual(set(item["author"]), {"id", "username", "profile_picture"})
+        self.assertEqual(item["reaction_counts"]["amen"], 1)
+
+        _, sql = self._list_sql(view="card")
+        self.assertNotIn('"posts_post"."content"', sql)
+        self.assertNotIn('"posts_reaction"', sql)
+        self.assertNotIn('"users_follow"', sql)
+
+    def test_fields_and_omit_trim_the_representation(self):
+        self._add_posts(2)
+        response, sql = self._list_sql(fields="id,title")
+        self.assertEqual(set(response.data["results"][0]), {"id", "title"})
+        self.assertNotIn('"posts_post"."ai_moderation_feedback"', sql)
+        self.assertNotIn('"posts_postshare"', sql)
+
+        response = self.client.get(reverse("post-list"), {"omit": "content,author,user_reactions"})
+        item = response.data["results"][0]
+        self.assertNotIn("content", item)
+        self.assertNotIn("author", item)
+        self.assertIn("has_shared", item)
+
+    def test_excerpt_is_cut_at_a_word_boundary(self):
+        author = User.objects.create_user(username="writer", email="writer@example.com", password="password123")
+        post = Post.objects.create(author=author, title="Long", content="Grace  upon\ngrace " * 40)
+        self.assertLessEqual(len(post.excerpt), 200)
+        self.assertTrue(post.excerpt.startswith("Grace upon grace"))
+        self.assertTrue(post.excerpt.endswith("\u2026"))
+        self.assertIn(post.excerpt[:-1].split()[-1], {"Grace", "upon", "grace"})
+
+        post.content = "Short and sweet."
+        post.save(update_fields=["content"])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, "Short and sweet.")
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self._add_posts(2)
+        _, small_page = self._list_queries()
+        self._add_posts(8)
+        response, large_page = self._list_queries()
+
+        self.assertEqual(small_page, large_page)
+        results = response.data["results"]
+        self.assertEqual(len(results), 10)
+        for item in results:
+            self.assertEqual(item["user_reactions"], ["amen"])
+            self.assertTrue(item["author"]["is_following"])
+            self.assertEqual(item["author"]["follower_count"], 1)
+        self.assertEqual(sum(item["has_shared"] for item in results), 5)
+
+
+@override_settings(
+    MODERATION_BACKEND="stub",
+    POST_VIEW_FLUSH_INTERVAL_SECONDS=0,
+    POST_VIEW_DEDUPE_WINDOW_SECONDS=60,
+)
+class PostViewCounterTests(APITestCase):
+    def setUp(self):
+        view_counter.flush()
+        self.author = User.objects.create_user(
+            username="writer",
+            email="writer@example.com",
+            password="password123",
+        )
+        self.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="password123",
+        )
+        self.post = Post.objects.create(author=self.author, title="Hope", content="Rejoice.", status="published")
+        self.url = reverse("post-detail", args=[self.post.pk])
+
+    def tearDown(self):
+        view_counter.flush()
+        cache.clear()
+
+    def test_views_are_buffered_deduplicated_and_flushed(self):
+        self.client.force_authenticate(user=self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.author)
+        self.client.get(self.url)
+        self.client.force_authenticate(user=None)
+        self.client.get(self.url, HTTP_USER_AGENT="browser")
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        self.assertEqual(view_counter.pending_views(), {self.post.pk: 3})
+
+        result = view_counter.flush()
+        self.assertEqual((result["posts"], result["views"], result["deduped"]), (1, 3, 1))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+
+    def test_unpublished_posts_are_not_counted(self):
+        Post.objects.filter(pk=self.post.pk).update(status="flagged")
+        self.client.force_authenticate(user=self.author)
+        self.client.get(self.url)
+        self.assertEqual(view_counter.pending_views(), {})
+
+    def test_flusher_keeps_running_after_unexpected_errors(self):
+        with patch.object(view_counter, "flush", side_effect=[RuntimeError("boom"), {}]) as flush, patch.object(
+            view_counter.time, "sleep", side_effect=[None, None, SystemExit]
+        ), patch.object(view_counter, "close_old_connections"), patch.object(view_counter, "connection"):
+            with self.assertRaises(SystemExit):
+                view_counter._flush_loop(1)
+        self.assertEqual(flush.call_count, 2)
+
+
+@override_settings(MODERATION_BACKEND="stub", POST_VIEW_FLUSH_INTERVAL_SECONDS=0)
+class PostTrendingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username="writer",
+            email="writer@example.com",
+            password="password123",
+        )
+        self.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="password123",
+        )
+        self.shared = Post.objects.create(author=self.author, title="Shared", content="Go.", status="published")
+        self.reacted = Post.objects.create(author=self.author, title="Reacted", content="Stay.", status="published")
+        PostShare.objects.create(post=self.shared, user=self.author, platform="link")
+        Reaction.objects.create(post=self.reacted, user=self.reader, type="amen")
+        self.url = reverse("post-trending")
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_newer_events_outweigh_older_ones(self):
+        now = timezone.now()
+        self.assertGreater(
+            trending.event_score("reaction", now),
+            trending.event_score("reaction", now - timedelta(days=2)) + 1.9,
+        )
+        self.assertAlmostEqual(trending.log_add(3.0, 3.0), 4.0)
+
+    def test_ranking_is_shared_but_viewer_state_is_not(self):
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(self.url)
+        self.assertEqual([item["id"] for item in response.data], [self.shared.pk, self.reacted.pk])
+        self.assertEqual(response.data[1]["user_reactions"], ["amen"])
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data[1]["user_reactions"], [])
+
+    def test_window_limits_to_recent_posts(self):
+        Post.objects.filter(pk=self.shared.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        response = self.client.get(self.url, {"window": "7d"})
+        self.assertEqual([item["id"] for item in response.data], [self.reacted.pk])
+        response = self.client.get(self.url, {"window": "all"})
+        self.assertEqual(len(response.data), 2)
+        response = self.client.get(self.url, {"window": "soon"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_matches_incremental_scores(self):
+        Comment.objects.create(post=self.reacted, author=self.author, content="Amen.")
+        incremental = dict(PostTrendingScore.objects.values_list("post_id", "score"))
+        PostTrendingScore.objects.all().delete()
+
+        call_command("rebuild_trending", stdout=StringIO())
+
+        rebuilt = dict(PostTrendingScore.objects.values_list("post_id", "score"))
+        self.assertEqual(rebuilt.keys(), incremental.keys())
+        for post_id, score in incremental.items():
+            self.assertAlmostEqual(rebuilt[post_id], score, places=6)
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class PostPaginationTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="writer",
+            email="writer@example.com",
+            password="password123",
+        )
+        posts = Post.objects.bulk_create(
+            Post(author=self.author, title=f"Post {index}", content="Walk in the light.", status="published")
+            for index in range(5)
+        )
+        # Ties on created_at must be broken by id.
+        Post.objects.filter(pk__in=[post.pk for post in posts[:3]]).update(created_at=timezone.now())
+        self.expected = list(Post.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+
+    def _walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.append([item["id"] for item in response.data["results"]])
+            url = response.data[link]
+        return ids
+
+    def test_pages_forward_and_back_without_gaps(self):
+        pages = self._walk(reverse("post-list") + "?page_size=2", "next")
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
+        last_page = self.client.get(reverse("post-list") + "?page_size=2")
+        while last_page.data["next"]:
+            last_page = self.client.get(last_page.data["next"])
+        back = self._walk(last_page.data["previous"], "previous")
+        self.assertEqual(back, [pages[1], pages[0]])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("post-list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="writer",
+            email="writer@example.com",
+            password="password123",
+        )
+        self.title_match = Post.objects.create(
+            author=self.author, title="Shepherds and sheep", content="A psalm of David.", status="published"
+        )
+        self.content_match = Post.objects.create(
+            author=self.author, title="Morning", content="The shepherd leaves the ninety-nine.", status="published"
+        )
+        Post.objects.create(author=self.author, title="Evening", content="Rest in peace.", status="published")
+        self.url = reverse("post-search")
+
+    def test_results_are_ranked_and_highlighted(self):
+        response = self.client.get(self.url, {"q": "shepherd"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([item["id"] for item in results], [self.title_match.pk, self.content_match.pk])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+        self.assertIn("<mark>shepherd</mark>", results[1]["headline"])
+
+    def test_index_follows_edits_and_visibility(self):
+        Post.objects.filter(pk=self.content_match.pk).update(status="flagged")
+        self.title_match.content = "A song about the good shepherd and still waters."
+        self.title_match.save()
+        # Edited content is searchable once moderation approves it.
+        self.assertEqual(self.title_match.status, "pending")
+        self.title_match.apply_moderation_result({"flagged": False, "categories": [], "notes": ""})
+
+        response = self.client.get(self.url, {"q": "still waters"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.title_match.pk])
+        response = self.client.get(self.url, {"q": "ninety-nine"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_short_queries_are_rejected(self):
+        response = self.client.get(self.url, {"q": " "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sqlite_match_expression_quotes_terms(self):
+        self.assertEqual(search.SQLiteSearchBackend.match_expression('grace "OR" NEAR(x'), '"grace" "OR" "NEAR" "x"')
+
+
+@override_settings(MODERATION_BACKEND="stub", TAG_FACETS_CACHE_SECONDS=0)
+class PostTagTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="tagger",
+            email="tagger@example.com",
+            password="password123",
+        )
+        self.both = Post.objects.create(
+            author=self.author, title="Both", content="...", tags=["Faith", "#prayer"], status="published"
+        )
+        self.faith = Post.objects.create(
+            author=self.author, title="Faith", content="...", tags=["faith", "hope"], status="published"
+        )
+        self.hidden = Post.objects.create(
+            author=self.author, title="Hidden", content="...", tags=["prayer"], status="flagged"
+        )
+
+    def _counts(self, **params):
+        response = self.client.get(reverse("post-tags"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item["tag"]: item["count"] for item in response.data}
+
+    def test_normalize_tags(self):
+        self.assertEqual(tagging.normalize_tags(["  #Faith ", "faith", "Good   News", 3, ""]), ["faith", "good news"])
+
+    def test_filter_any_and_all(self):
+        url = reverse("post-list")
+        response = self.client.get(url, {"tag": ["prayer", "hope"]})
+        self.assertEqual({item["id"] for item in response.data["results"]}, {self.both.pk, self.faith.pk})
+
+        response = self.client.get(url, {"tag": ["faith", "prayer"], "tag_match": "all"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.both.pk])
+
+    def test_facets_follow_post_writes(self):
+        self.assertEqual(self._counts(), {"faith": 2, "prayer": 1, "hope": 1})
+        self.assertEqual(self._counts(tag="faith"), {"prayer": 1, "hope": 1})
+
+        self.faith.tags = ["faith"]
+        self.faith.save(update_fields=["tags"])
+        self.hidden.status = "published"
+        self.hidden.save()
+        self.both.delete()
+
+        self.assertEqual(self._counts(), {"faith": 1, "prayer": 1})
+        self.assertEqual(PostTag.objects.filter(tag="hope").count(), 0)
+
+    def test_moderation_verdict_publishes_tags(self):
+        post = Post.objects.create(author=self.author, title="New", content="...", tags=["joy"])
+        self.assertEqual(self._counts().get("joy"), None)
+
+        post.apply_moderation_result({"flagged": False})
+        self.assertEqual(self._counts()["joy"], 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        Post.objects.filter(pk=self.faith.pk).update(tags=["grace"])
+        TagStat.objects.filter(tag="faith").update(post_count=40)
+
+        call_command("rebuild_post_tags", "--chunk-size", "1", stdout=StringIO())
+
+        self.assertEqual(self._counts(), {"faith": 1, "prayer": 1, "grace": 1})
+
+
+@override_settings(MODERATION_BACKEND="stub", SCRIPTURE_PASSAGES_CACHE_SECONDS=0)
+class ScriptureReferenceTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="preacher",
+            email="preacher@example.com",
+            password="password123",
+        )
+
+    def _post(self, refs, status="published"):
+        return Post.objects.create(author=self.author, title="Sermon", content="...", scripture_refs=refs, status=status)
+
+    def test_parser_normalizes_references(self):
+        cases = {
+            "John 3:16": ["John 3:16"],
+            "Rom 8:28-30": ["Romans 8:28-30"],
+            "1 cor. 13": ["1 Corinthians 13"],
+            "II Tim 3:16-4:2": ["2 Timothy 3:16-4:2"],
+            "Jude 3": ["Jude 3"],
+            "Ps 23:1, 4; 24": ["Psalms 23:1", "Psalms 23:4", "Psalms 24"],
+            "Hezekiah 1:1": [],
+            "John 22:1": [],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual([str(found) for found in scripture.parse_references(text)], expected)
+
+    def test_filter_matches_overlapping_ranges(self):
+        inside = self._post(["Rom 8:28-30"])
+        spanning = self._post(["Romans 7:24-8:2"])
+        self._post(["Romans 9:1"])
+        self._post(["John 8:12"])
+
+        response = self.client.get(reverse("post-list"), {"scripture": "Romans 8"})
+        self.assertEqual({item["id"] for item in response.data["results"]}, {inside.pk, spanning.pk})
+
+        response = self.client.get(reverse("post-list"), {"scripture": "Rom 8:29"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [inside.pk])
+
+        response = self.client.get(reverse("post-list"), {"scripture": "Nowhere 1"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_most_cited_passages_follow_edits(self):
+        first = self._post(["John 3:16"])
+        self._post(["jn 3:16", "Phil 4:13"])
+        self._post(["Phil 4:13"], status="flagged")
+        first.scripture_refs = ["Phil 4:13"]
+        first.save(update_fields=["scripture_refs"])
+
+        response = self.client.get(reverse("post-passages"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["reference"], item["count"]) for item in response.data],
+            [("Philippians 4:13", 2), ("John 3:16", 1)],
+        )
+        response = self.client.get(reverse("post-passages"), {"book": "jn"})
+        self.assertEqual([item["reference"] for item in response.data], ["John 3:16"])
+
+
+@override_settings(MODERATION_BACKEND="stub", FEED_FANOUT_MAX_FOLLOWERS=2, FEED_FANOUT_BATCH_SIZE=1)
+class HomeFeedTests(APITestCase):
+    def setUp(self):
+        cache.delete(timeline.HIGH_REACH_CACHE_KEY)
+        self.reader = User.objects.create_user(username="reader", email="reader@example.com", password="password123")
+        self.friend = User.objects.create_user(username="friend", email="friend@example.com", password="password123")
+        self.famous = User.objects.create_user(username="famous", email="famous@example.com", password="password123")
+        self.stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="password123")
+        for follower in (self.reader, self.stranger):
+            Follow.objects.create(follower=follower, following=self.friend)
+        for username in ("fan1", "fan2"):
+            fan = User.objects.create_user(username=username, email=f"{username}@example.com", password="password123")
+            Follow.objects.create(follower=fan, following=self.famous)
+        Follow.objects.create(follower=self.reader, following=self.famous)
+        self.client.force_authenticate(self.reader)
+
+    def _publish(self, author, title):
+        post = Post.objects.create(author=author, title=title, content="...")
+        with self.captureOnCommitCallbacks(execute=True):
+            post.apply_moderation_result({"flagged": False})
+        return post
+
+    def _feed(self):
+        response = self.client.get(reverse("post-feed"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["title"] for item in response.data["results"]]
+
+    def test_publishing_fans_out_to_followers(self):
+        post = self._publish(self.friend, "From a friend")
+
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post=post).values_list("user_id", flat=True)),
+            {self.reader.pk, self.stranger.pk},
+        )
+        self.assertEqual(self._feed(), ["From a friend"])
+
+    def test_high_reach_authors_are_read_on_demand(self):
+        self._publish(self.friend, "Friend")
+        famous_post = self._publish(self.famous, "Famous")
+        self._publish(self.stranger, "Stranger")
+        self._publish(self.reader, "Mine")
+
+        self.assertFalse(TimelineEntry.objects.filter(post=famous_post).exists())
+        self.assertEqual(self._feed(), ["Mine", "Famous", "Friend"])
+
+    def test_feed_pages_merge_timeline_and_pulled_posts_by_keyset(self):
+        titles = []
+        for index in range(3):
+            for author in (self.friend, self.famous):
+                titles.append(f"{author.username} {index}")
+                self._publish(author, titles[-1])
+        titles.reverse()
+
+        seen, pages = [], []
+        url = reverse("post-feed") + "?page_size=4"
+        while url:
+            response = self.client.get(url)
+            pages.append(response)
+            seen.extend(item["title"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, titles)
+        self.assertEqual(len(pages), 2)
+
+        previous = self.client.get(pages[1].data["previous"])
+        self.assertEqual([item["title"] for item in previous.data["results"]], titles[:4])
+
+    def test_follow_changes_and_unpublishing_update_the_timeline(self):
+        post = self._publish(self.stranger, "Earlier post")
+        self.assertEqual(self._feed(), [])
+
+        Follow.objects.create(follower=self.reader, following=self.stranger)
+        self.assertEqual(self._feed(), ["Earlier post"])
+
+        post.status = "flagged"
+        post.save(update_fields=["status"])
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        Follow.objects.filter(follower=self.reader, following=self.stranger).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader, author=self.stranger).exists())
+
+    def test_trim_keeps_newest_entries(self):
+        for index in range(3):
+            self._publish(self.friend, f"Post {index}")
+
+        self.assertEqual(timeline.trim(max_entries=2), 2)
+        self.assertEqual(self._feed(), ["Post 2", "Post 1"])
+
+
+@override_settings(MODERATION_BACKEND="stub", POST_VIEW_FLUSH_INTERVAL_SECONDS=0)
+class PostConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="etag", email="etag@example.com", password="password123")
+        self.reader = User.objects.create_user(username="etag-reader", email="etag-reader@example.com", password="password123")
+        self.post = Post.objects.create(author=self.author, title="Cached", content="...", status="published")
+        self.detail_url = reverse("post-detail", args=[self.post.pk])
+        self.client.force_authenticate(self.reader)
+
+    def test_matching_etag_skips_serialization(self):
+        for url in (self.detail_url, reverse("post-list")):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertTrue(response["ETag"].startswith('W/"'))
+
+                with CaptureQueriesContext(connection) as queries:
+                    revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(revalidated.content, b"")
+                # Only the page or object itself is loaded.
+                self.assertEqual(len(queries), 1)
+
+        response = self.client.get(self.detail_url)
+        revalidated = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_lists_revalidate_by_etag_only(self):
+        list_url = reverse("post-list")
+        response = self.client.get(list_url)
+        self.assertNotIn("Last-Modified", response)
+
+        # Unpublishing a post leaves the page's latest updated_at as it was,
+        # yet the list changed.
+        newer = Post.objects.create(author=self.author, title="Newer", content="...", status="published")
+        seen = self.client.get(reverse("post-detail", args=[newer.pk]))["Last-Modified"]
+        Post.objects.filter(pk=self.post.pk).update(status="flagged")
+        response = self.client.get(list_url, HTTP_IF_MODIFIED_SINCE=seen)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_varies_with_query_parameters(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        response = self.client.get(self.detail_url, {"view": "card"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_with_engagement_and_viewer(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        self.client.post(reverse("post-react", args=[self.post.pk]), {"type": "amen"})
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["user_reactions"], ["amen"])
+
+        self.client.force_authenticate(self.author)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(MODERATION_BACKEND="stub")
+class ReactionWriteTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="reacted", email="reacted@example.com", password="password123")
+        self.reader = User.objects.create_user(username="reactor", email="reactor@example.com", password="password123")
+        self.post = Post.objects.create(author=self.author, title="React", content="...", status="published")
+        self.other = Post.objects.create(author=self.author, title="Other", content="...", status="published")
+        self.client.force_authenticate(self.reader)
+
+    def test_toggle_is_one_statement_and_returns_the_count(self):
+        Reaction.objects.create(post=self.post, user=self.author, type="amen")
+
+        with CaptureQueriesContext(connection) as queries:
+            result = reactions.apply_reaction(self.post.pk, self.reader.pk, "amen")
+        self.assertEqual((result.reacted, result.changed, result.count), (True, True, 2))
+        self.assertTrue(RelatedPostsRefresh.objects.filter(post=self.post).exists())
+        if connection.vendor == "postgresql":
+            # The toggle itself plus the trending upsert.
+            self.assertEqual(len(queries), 2)
+
+        response = self.client.post(reverse("post-react", args=[self.post.pk]), {"type": "amen"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["reacted"], response.data["count"]), (False, 1))
+        stats = PostStats.objects.get(post=self.post)
+        self.assertEqual((stats.amen_count, stats.reaction_count), (1, 1))
+        self.assertFalse(Reaction.objects.filter(post=self.post, user=self.reader).exists())
+
+    def test_add_and_remove_are_idempotent(self):
+        for _ in range(2):
+            result = reactions.apply_reaction(self.post.pk, self.reader.pk, "pray", reactions.ADD)
+        self.assertEqual((result.reacted, result.changed, result.count), (True, False, 1))
+        for _ in range(2):
+            result = reactions.apply_reaction(self.post.pk, self.reader.pk, "pray", reactions.REMOVE)
+        self.assertEqual((result.reacted, result.changed, result.count), (False, False, 0))
+
+    def test_bulk_endpoint_applies_changes_in_order(self):
+        response = self.client.post(
+            reverse("post-bulk-react"),
+            [
+                {"post": self.post.pk, "type": "amen", "action": "add"},
+                {"post": self.other.pk, "type": "pray"},
+                {"post": self.post.pk, "type": "amen", "action": "remove"},
+                {"post": self.post.pk, "type": "fire"},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["post_id"], item["type"], item["reacted"], item["count"]) for item in response.data],
+            [(self.post.pk, "amen", True, 1), (self.other.pk, "pray", True, 1),
+             (self.post.pk, "amen", False, 0), (self.post.pk, "fire", True, 1)],
+        )
+        self.assertEqual(PostStats.objects.get(post=self.post).reaction_count, 1)
+
+    def test_bulk_endpoint_rejects_bad_changes(self):
+        hidden = Post.objects.create(author=self.author, title="Hidden", content="...", status="flagged")
+        url = reverse("post-bulk-react")
+
+        response = self.client.post(url, [{"post": self.post.pk, "type": "wave"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, [{"post": hidden.pk, "type": "amen"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Reaction.objects.exists())
+
+
+class _FakeResponse:
+    def __init__(self, status_code=204, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+
+
+class _FakeTusSession:
+    """Accepts TUS requests, keeping only a digest of what it receives."""
+
+    def __init__(self, fail_patch=None, fail_status=None):
+        self.offset = 0
+        self.patches = []
+        self.fail_patch = fail_patch
+        self.fail_status = fail_status
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        return _FakeResponse(201, {"Location": "https://storage.test/upload/1"})
+
+    def patch(self, url, data=None, headers=None, timeout=None):
+        self.patches.append((int(headers["Upload-Offset"]), len(data)))
+        if len(self.patches) == self.fail_patch and self.fail_status:
+            return _FakeResponse(self.fail_status)
+        if len(self.patches) == self.fail_patch:
+            # The server kept half of the chunk before the connection dropped.
+            self.offset += len(data) // 2
+            raise storage.requests.ConnectionError("connection reset")
+        self.offset = int(headers["Upload-Offset"]) + len(data)
+        return _FakeResponse(204, {"Upload-Offset": str(self.offset)})
+
+    def head(self, url, headers=None, timeout=None):
+        return _FakeResponse(200, {"Upload-Offset": str(self.offset)})
+
+
+@override_settings(
+    STORAGE_UPLOAD_CHUNK_SIZE=1024 * 1024,
+    STORAGE_UPLOAD_RETRY_BACKOFF_SECONDS=0,
+    SUPABASE_URL="https://storage.test",
+    SUPABASE_KEY="key",
+    IMAGE_DERIVATIVE_WORKERS=0,
+)
+class StreamingUploadTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(username="uploader", email="uploader@example.com", password="password123")
+
+    def _large_upload(self, megabytes):
+        upload = TemporaryUploadedFile("large.jpg", "image/jpeg", megabytes * 1024 * 1024, None)
+        block = os.urandom(1024 * 1024)
+        for _ in range(megabytes):
+            upload.write(block)
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        return upload
+
+    def _peak_bytes(self, save):
+        tracemalloc.start()
+        try:
+            save()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_upload_view_streams_to_local_storage(self):
+        self.client.force_authenticate(self.user)
+        image = SimpleUploadedFile("photo.png", b"\x89PNG fake image bytes", content_type="image/png")
+        with self.settings(MEDIA_STORAGE_BACKEND="local", MEDIA_ROOT=self.media_root):
+            response = self.client.post(reverse("upload-image"), {"image": image}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data["url"].startswith("/media/"))
+        stored = os.path.join(self.media_root, storage.LocalStorage().bucket, response.data["path"])
+        with open(stored, "rb") as handle:
+            self.assertEqual(handle.read(), b"\x89PNG fake image bytes")
+
+    def test_memory_stays_bounded_per_upload(self):
+        upload = self._large_upload(24)
+        with self.settings(MEDIA_ROOT=self.media_root):
+            peak = self._peak_bytes(lambda: storage.LocalStorage().save("posts/1/large.jpg", upload, "image/jpeg"))
+        self.assertLess(peak, 3 * 1024 * 1024)
+
+        upload.seek(0)
+        session = _FakeTusSession()
+        peak = self._peak_bytes(lambda: storage.SupabaseStorage(session=session).save("posts/1/large.jpg", upload, "image/jpeg"))
+        self.assertLess(peak, 3 * 1024 * 1024)
+        self.assertEqual(len(session.patches), 24)
+
+    def test_resumable_upload_resumes_from_server_offset(self):
+        upload = self._large_upload(3)
+        session = _FakeTusSession(fail_patch=2)
+
+        storage.SupabaseStorage(session=session).save("posts/1/large.jpg", upload, "image/jpeg")
+
+        chunk = 1024 * 1024
+        self.assertEqual(
+            session.patches,
+            [(0, chunk), (chunk, chunk), (chunk + chunk // 2, chunk), (2 * chunk + chunk // 2, chunk // 2)],
+        )
+        self.assertEqual(session.offset, 3 * chunk)
+
+    def test_resumable_upload_retries_only_server_errors(self):
+        upload = self._large_upload(2)
+        session = _FakeTusSession(fail_patch=1, fail_status=503)
+        storage.SupabaseStorage(session=session).save("posts/1/large.jpg", upload, "image/jpeg")
+        self.assertEqual(len(session.patches), 3)
+
+        upload.seek(0)
+        session = _FakeTusSession(fail_patch=1, fail_status=413)
+        with self.assertRaises(storage.StorageError):
+            storage.SupabaseStorage(session=session).save("posts/1/large.jpg", upload, "image/jpeg")
+        self.assertEqual(len(session.patches), 1)
+
+
+class _FakeBucket:
+    def __init__(self):
+        self.signed = []
+
+    def create_signed_url(self, path, expires_in):
+        self.signed.append((path, expires_in))
+        return {"signedURL": f"https://project.supabase.co/storage/v1/object/sign/bucket/{path}?token={len(self.signed)}"}
+
+
+@override_settings(SUPABASE_URL="https://project.supabase.co/", SUPABASE_POST_IMAGE_BUCKET="post-images")
+class SupabaseURLTests(APITestCase):
+    def setUp(self):
+        supabase_client.clear_signed_url_cache()
+        self.addCleanup(supabase_client.clear_signed_url_cache)
+        self.bucket = _FakeBucket()
+        client = patch.object(supabase_client, "get_supabase_client")
+        self.get_client = client.start()
+        self.addCleanup(client.stop)
+        self.get_client.return_value.storage.from_.return_value = self.bucket
+
+    def test_public_url_is_built_without_the_client(self):
+        url = storage.SupabaseStorage().public_url("posts/ab/abc.png")
+        self.assertEqual(url, "https://project.supabase.co/storage/v1/object/public/post-images/posts/ab/abc.png")
+        self.get_client.assert_not_called()
+
+    def test_signed_urls_are_cached_per_path_and_expiry(self):
+        first = supabase_client.create_signed_url("private/a.pdf", 600)
+        self.assertEqual(supabase_client.create_signed_url("private/a.pdf", 600), first)
+        supabase_client.create_signed_url("private/a.pdf", 3600)
+        supabase_client.create_signed_url("private/b.pdf", 600)
+        self.assertEqual(self.bucket.signed, [("private/a.pdf", 600), ("private/a.pdf", 3600), ("private/b.pdf", 600)])
+
+    def test_signed_urls_expire_from_cache_before_the_url_does(self):
+        supabase_client.create_signed_url("private/a.pdf", supabase_client.SIGNED_URL_MARGIN_SECONDS)
+        supabase_client.create_signed_url("private/a.pdf", supabase_client.SIGNED_URL_MARGIN_SECONDS)
+        self.assertEqual(len(self.bucket.signed), 2)
+
+
+@override_settings(MODERATION_BACKEND="stub", MEDIA_STORAGE_BACKEND="local", IMAGE_DERIVATIVE_WORKERS=0)
+class ImageDerivativeTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username="photographer", email="photo@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def _jpeg(self, name="photo.jpg", color=(200, 120, 40)):
+        output = BytesIO()
+        Image.new("RGB", (2000, 1200), color).save(output, "JPEG")
+        return SimpleUploadedFile(name, output.getvalue(), content_type="image/jpeg")
+
+    def _stored(self, url):
+        return os.path.join(self.media_root, url[len("/media/"):])
+
+    def test_upload_renders_webp_derivatives_served_by_size(self):
+        response = self.client.post(reverse("upload-image"), {"image": self._jpeg()}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        variants = response.data["variants"]
+        self.assertEqual(set(variants), {"thumb", "small", "medium"})
+        with Image.open(self._stored(variants["thumb"])) as thumb:
+            self.assertEqual(thumb.format, "WEBP")
+            self.assertEqual(thumb.size, (160, 96))
+
+        post = Post.objects.create(
+            author=self.user, title="Sunrise", content="Morning light", image_url=response.data["url"], status="published"
+        )
+        self.assertEqual(post.image_variants, variants)
+
+        original = self.client.get(reverse("post-detail", args=[post.pk]))
+        self.assertEqual(original.data["image_url"], response.data["url"])
+        small = self.client.get(reverse("post-detail", args=[post.pk]), {"size": "small"})
+        self.assertEqual(small.data["image_url"], variants["small"])
+
+    def test_identical_images_share_derivatives(self):
+        upload = self.client.post(reverse("upload-image"), {"image": self._jpeg()}, format="multipart")
+        self.user.profile_picture = self._jpeg("avatar.jpg")
+        with patch.object(images, "render_derivatives") as render:
+            self.user.save()
+        render.assert_not_called()
+        self.assertEqual(self.user.profile_picture_variants, upload.data["variants"])
+        self.assertIn(storage.content_hash(self._jpeg()), upload.data["variants"]["thumb"])
+
+    def test_profile_picture_derivatives(self):
+        self.user.profile_picture = self._jpeg("avatar.jpg", color=(10, 80, 160))
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(set(self.user.profile_picture_variants), {"thumb", "small", "medium"})
+
+        post = Post.objects.create(author=self.user, title="Hello", content="Hi", status="published")
+        response = self.client.get(reverse("post-detail", args=[post.pk]), {"size": "thumb"})
+        self.assertEqual(response.data["author"]["profile_picture"], self.user.profile_picture_variants["thumb"])
+
+        self.user.first_name = "Unchanged picture"
+        with patch.object(images, "render_derivatives") as render:
+            self.user.save()
+        render.assert_not_called()
+
+
+    @override_settings(IMAGE_DERIVATIVE_WORKERS=2)
+    def test_upload_does_not_wait_for_the_render(self):
+        submitted = []
+
+        saved = []
+
+        class PendingExecutor:
+            def submit(self, fn, *args):
+                submitted.append((Future(), args))
+                return submitted[-1][0]
+
+        class SaverExecutor:
+            def submit(self, fn, *args):
+                saved.append(args)
+                fn(*args)
+
+        with patch.object(images, "_executor", PendingExecutor):
+            response = self.client.post(reverse("upload-image"), {"image": self._jpeg()}, format="multipart")
+        self.assertEqual(response.data["variants"], {})
+        post = Post.objects.create(
+            author=self.user, title="Sunrise", content="Morning light", image_url=response.data["url"], status="published"
+        )
+        self.assertEqual(post.image_variants, {})
+        rendered_before = post.updated_at
+
+        future, args = submitted[0]
+        with patch.object(images, "_saver", SaverExecutor):
+            future.set_result(images.render_derivatives(*args))
+
+        self.assertEqual(len(saved), 1)
+        post.refresh_from_db()
+        self.assertEqual(set(post.image_variants), {"thumb", "small", "medium"})
+        self.assertGreater(post.updated_at, rendered_before)
+
+    def test_unreadable_profile_picture_does_not_fail_the_save(self):
+        self.user.profile_picture.name = "profile_pictures/missing.jpg"
+        self.user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_variants, {})
+
+@override_settings(MODERATION_BACKEND="stub", MEDIA_STORAGE_BACKEND="local", IMAGE_DERIVATIVE_WORKERS=0)
+class ContentAddressedUploadTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username="reposter", email="reposter@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        self.data = b"\x89PNG the same picture posted twice"
+
+    def _upload(self, name="photo.png"):
+        image = SimpleUploadedFile(name, self.data, content_type="image/png")
+        return self.client.post(reverse("upload-image"), {"image": image}, format="multipart")
+
+    def _exists(self, blob):
+        return os.path.exists(os.path.join(self.media_root, storage.LocalStorage().bucket, blob.path))
+
+    def test_upload_handlers_hash_files_while_parsing(self):
+        request = RequestFactory().post("/", {"image": SimpleUploadedFile("photo.png", self.data)})
+        self.assertEqual(request.FILES["image"].sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_duplicate_upload_skips_storage(self):
+        first = self._upload()
+        with patch.object(storage.LocalStorage, "save") as save:
+            second = self._upload("copy.png")
+        save.assert_not_called()
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data["url"], second.data["url"])
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertIn(blob.sha256, first.data["path"])
+        self.assertEqual(blob.ref_count, 0)
+
+    def test_posts_reference_blob_until_last_is_deleted(self):
+        url = self._upload().data["url"]
+        first = Post.objects.create(author=self.user, title="One", content="First", image_url=url)
+        second = Post.objects.create(author=self.user, title="Two", content="Second", image_url=url)
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(self._exists(blob))
+
+        StoredBlob.objects.update(leased_until=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image_url = "https://example.com/elsewhere.png"
+            second.save()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(self._exists(blob))
+
+    def test_reupload_is_leased_until_its_post_exists(self):
+        url = self._upload().data["url"]
+        earlier = Post.objects.create(author=self.user, title="One", content="First", image_url=url)
+        # Someone uploads the same picture, then the only post using it goes.
+        self._upload("copy.png")
+        with self.captureOnCommitCallbacks(execute=True):
+            earlier.delete()
+
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 0)
+        self.assertTrue(self._exists(blob))
+        Post.objects.create(author=self.user, title="Two", content="Second", image_url=url)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+    def test_prune_deletes_unused_uploads_after_their_lease(self):
+        self._upload()
+        blob = StoredBlob.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("prune_blobs", stdout=StringIO())
+        self.assertTrue(self._exists(blob))
+
+        StoredBlob.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("prune_blobs", stdout=StringIO())
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(self._exists(blob))
+
+
+CHAIN_POST = (
+    "Forward this prayer to ten friends before midnight and watch what happens. "
+    "Last year {} shared it and received a miracle within three days, but the "
+    "ones who ignored it lost their blessing. Do not break the chain, type amen "
+    "and pass it on to everyone you love."
+)
+
+
+@override_settings(MODERATION_BACKEND="stub", POST_DUPLICATE_LIMIT=2)
+class NearDuplicateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="author", password="password123")
+        self.original = Post.objects.create(author=self.user, title="Chain", content=CHAIN_POST.format("Maria"))
+        self.original.apply_moderation_result({"flagged": False, "reason": ""})
+        ModerationJob.objects.all().delete()
+
+    def test_copy_is_linked_to_original(self):
+        copy = Post.objects.create(author=self.user, title="Chain", content=CHAIN_POST.format("Joseph"))
+        second = Post.objects.create(author=self.user, title="Chain", content=CHAIN_POST.format("Ruth"))
+
+        self.assertEqual(copy.duplicate_of_id, self.original.pk)
+        self.assertEqual(second.duplicate_of_id, self.original.pk)
+        self.assertGreater(
+            fingerprint.similarity(
+                fingerprint.signature(CHAIN_POST.format("Maria")), fingerprint.signature(CHAIN_POST.format("Joseph"))
+            ),
+            0.7,
+        )
+
+    def test_unrelated_post_is_not_linked(self):
+        post = Post.objects.create(
+            author=self.user,
+            title="Sermon notes",
+            content="Blessed are the peacemakers, for they shall be called children of God. "
+            "This week we read the beatitudes together and talked about mercy.",
+        )
+
+        self.assertIsNone(post.duplicate_of_id)
+        self.assertEqual(post.fingerprint_bands.count(), fingerprint.BANDS)
+
+    def test_short_posts_are_not_fingerprinted(self):
+        post = Post.objects.create(author=self.user, title="Amen", content="Amen! Praise God.")
+
+        self.assertFalse(fingerprint.PostFingerprint.objects.filter(post=post).exists())
+        self.assertFalse(post.fingerprint_bands.exists())
+
+    def test_copy_of_moderated_post_reuses_verdict(self):
+        copy = Post.objects.create(author=self.user, title="Chain", content=CHAIN_POST.format("Maria") + " 🙏🙏")
+
+        copy.refresh_from_db()
+        self.assertEqual(copy.status, "published")
+        self.assertEqual(copy.ai_moderation_feedback["reused_from"], self.original.pk)
+        self.assertFalse(ModerationJob.objects.exists())
+
+    @override_settings(POST_MODERATION_REUSE_MIN_SIMILARITY=0.7)
+    def test_copy_adding_words_is_moderated(self):
+        content = CHAIN_POST.format("Maria") + " and by the way go hurt yourself"
+        self.assertGreaterEqual(
+            fingerprint.similarity(fingerprint.signature(content), fingerprint.signature(self.original.content)), 0.7
+        )
+
+        copy = Post.objects.create(author=self.user, title="Chain", content=content)
+
+        copy.refresh_from_db()
+        self.assertEqual(copy.status, "pending")
+        self.assertEqual(copy.duplicate_of_id, self.original.pk)
+        self.assertTrue(ModerationJob.objects.filter(object_id=str(copy.pk)).exists())
+
+    @override_settings(MODERATION_BLOCKLIST=["curse"])
+    def test_copy_adding_blocked_term_is_moderated(self):
+        from moderation.prefilter import get_prefilter
+
+        get_prefilter.cache_clear()
+        self.addCleanup(get_prefilter.cache_clear)
+        copy = Post.objects.create(author=self.user, title="Chain", content=CHAIN_POST.format("Maria") + " curse")
+
+        copy.refresh_from_db()
+        self.assertNotIn("reused_from", copy.ai_moderation_feedback or {})
+        self.assertEqual(copy.duplicate_of_id, self.original.pk)
+
+    def test_repeated_copies_by_author_are_throttled(self):
+        self.client.force_authenticate(user=self.user)
+        payload = {"title": "Chain", "content": CHAIN_POST.format("Peter")}
+
+        first = self.client.post(reverse("post-list"), payload, format="json")
+        response = self.client.post(reverse("post-list"), payload, format="json")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(Post.objects.count(), 2)
+
+    @override_settings(POST_NEAR_DUPLICATE_MAX_CANDIDATES=5)
+    def test_throttle_counts_the_authors_copies_among_many_others(self):
+        other = User.objects.create_user(username="forwarder", password="password123")
+        for name in ["Anna", "Paul", "Lydia", "Silas", "Mark"]:
+            Post.objects.create(author=other, title="Chain", content=CHAIN_POST.format(name))
+        for name in ["Joseph", "Ruth"]:
+            Post.objects.create(author=self.user, title="Chain", content=CHAIN_POST.format(name))
+
+        self.assertEqual(fingerprint.recent_duplicates_by(self.user, CHAIN_POST.format("Peter")), 3)
+        self.assertEqual(len(fingerprint.near_duplicates(fingerprint.signature(CHAIN_POST.format("Peter")))), 5)
+
+
+@override_settings(MODERATION_BACKEND="stub", RELATED_POSTS_LIMIT=3)
+class RelatedPostTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="password123")
+        self.reader = User.objects.create_user(username="reader", password="password123")
+
+        def publish(title, **fields):
+            return Post.objects.create(author=self.author, title=title, content="...", status="published", **fields)
+
+        self.post = publish("Hope", tags=["hope", "faith"], scripture_refs=["Romans 8:28"])
+        self.tagged = publish("Faith", tags=["faith"])
+        self.cited = publish("Romans", scripture_refs=["Romans 8"])
+        self.engaged = publish("Engaged")
+        self.unrelated = publish("Cooking", tags=["recipes"])
+        self.hidden = Post.objects.create(
+            author=self.author, title="Hidden", content="...", tags=["hope", "faith"], status="flagged"
+        )
+        for post in (self.post, self.engaged):
+            Reaction.objects.create(post=post, user=self.reader, type="amen")
+
+    def _related(self, post, **params):
+        response = self.client.get(reverse("post-related", args=[post.pk]), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["id"] for item in response.data]
+
+    def test_related_posts_ranked_by_shared_features(self):
+        call_command("refresh_related_posts", stdout=StringIO())
+
+        self.assertEqual(self._related(self.post), [self.cited.pk, self.tagged.pk, self.engaged.pk])
+        self.assertEqual(self._related(self.post, limit=1), [self.cited.pk])
+        self.assertEqual(self._related(self.unrelated), [])
+        self.assertFalse(RelatedPostsRefresh.objects.exists())
+
+    def test_request_is_a_single_query(self):
+        related.refresh([self.post.pk])
+
+        with CaptureQueriesContext(connection) as queries:
+            self._related(self.post, view="card")
+        self.assertEqual(len(queries), 1)
+        self.assertIn("posts_relatedpost", queries[0]["sql"])
+
+    def test_writes_mark_lists_stale_and_refresh_neighbours(self):
+        related.refresh([self.post.pk])
+        RelatedPostsRefresh.objects.all().delete()
+
+        newcomer = Post.objects.create(
+            author=self.author, title="New", content="...", tags=["hope", "faith"], status="published"
+        )
+        self.assertEqual(list(RelatedPostsRefresh.objects.values_list("post_id", flat=True)), [newcomer.pk])
+
+        related.refresh_stale(10)
+        self.assertEqual(self._related(self.post)[0], newcomer.pk)
+        self.assertFalse(RelatedPostsRefresh.objects.exists())
+
+        newcomer.status = "flagged"
+        newcomer.save()
+        related.refresh_stale(10)
+        self.assertNotIn(newcomer.pk, self._related(self.post))
+        self.assertFalse(RelatedPost.objects.filter(related=self.hidden).exists())
+
+    def test_missing_post_is_not_found(self):
+        response = self.client.get(reverse("post-related", args=[self.hidden.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("post-related", args=["abc"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_post_published_by_moderation_is_refreshed_again(self):
+        pending = Post.objects.create(author=self.author, title="Pending", content="...", tags=["hope", "faith"])
+        related.refresh_stale(10)
+        self.assertFalse(RelatedPostsRefresh.objects.exists())
+
+        pending.apply_moderation_result({"flagged": False})
+        related.refresh_stale(10)
+
+        self.assertIn(pending.pk, self._related(self.post))
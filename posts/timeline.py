@@ -0,0 +1,169 @@
+"""Home feed timelines.
+
+Publishing a post copies its id into each follower's ``TimelineEntry`` rows
+(fan-out on write, in batches of ``FEED_FANOUT_BATCH_SIZE``), so reading a feed
+is an index scan of the viewer's own entries rather than a join over ``Follow``.
+
+Authors with more than ``FEED_FANOUT_MAX_FOLLOWERS`` followers are not fanned
+out: one post would mean that many inserts. Their posts are pulled in at read
+time instead (fan-out on read), which stays cheap because a viewer follows few
+such authors. ``feed_window`` reads both sources with the same keyset and
+merges them.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core import metrics
+from core.pagination import keyset_filter
+from users.models import Follow
+
+from .models import Post, TimelineEntry
+
+HIGH_REACH_CACHE_KEY = "feed:high_reach_author_ids"
+
+
+def high_reach_author_ids():
+    """Ids of authors whose posts are read on demand rather than fanned out."""
+
+    author_ids = cache.get(HIGH_REACH_CACHE_KEY)
+    if author_ids is None:
+        author_ids = set(
+            Follow.objects.values("following_id")
+            .annotate(followers=Count("id"))
+            .filter(followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS)
+            .values_list("following_id", flat=True)
+        )
+        cache.set(HIGH_REACH_CACHE_KEY, author_ids, timeout=settings.FEED_HIGH_REACH_CACHE_SECONDS)
+    return author_ids
+
+
+def is_high_reach(author_id):
+    limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+    # Counting stops at limit + 1 rows, however many followers there are.
+    return Follow.objects.filter(following_id=author_id)[: limit + 1].count() > limit
+
+
+def post_status_changed(post):
+    """Deliver a newly published post, or withdraw one that was unpublished."""
+
+    was_published = getattr(post, "_loaded_status", None) == "published"
+    published = post.status == "published"
+    post._loaded_status = post.status
+    if published and not was_published:
+        post_id = post.pk
+        transaction.on_commit(lambda: fan_out(post_id))
+    elif was_published and not published:
+        TimelineEntry.objects.filter(post=post).delete()
+
+
+def fan_out(post_id):
+    """Insert ``post_id`` into its author's followers' timelines; returns entries written."""
+
+    post = Post.objects.filter(pk=post_id, status="published").only("pk", "author_id", "created_at").first()
+    if post is None:
+        return 0
+    if is_high_reach(post.author_id):
+        known = cache.get(HIGH_REACH_CACHE_KEY)
+        if known is not None and post.author_id not in known:
+            # Crossed the threshold since the set was cached.
+            cache.delete(HIGH_REACH_CACHE_KEY)
+        metrics.incr("posts.timeline.fanout_skipped")
+        return 0
+
+    follower_ids = list(Follow.objects.filter(following_id=post.author_id).values_list("follower_id", flat=True))
+    batch_size = max(settings.FEED_FANOUT_BATCH_SIZE, 1)
+    for offset in range(0, len(follower_ids), batch_size):
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                [
+                    TimelineEntry(user_id=user_id, post_id=post.pk, author_id=post.author_id, created_at=post.created_at)
+                    for user_id in follower_ids[offset:offset + batch_size]
+                ],
+                ignore_conflicts=True,
+            )
+    metrics.incr("posts.timeline.fanout_entries", len(follower_ids))
+    return len(follower_ids)
+
+
+def followed(follower_id, author_id):
+    """Backfill a new follower's timeline with the author's recent posts."""
+
+    if is_high_reach(author_id):
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id, status="published")
+        .order_by("-created_at", "-id")
+        .values_list("pk", "created_at")[: settings.FEED_FOLLOW_BACKFILL_POSTS]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=follower_id, post_id=post_id, author_id=author_id, created_at=created_at)
+            for post_id, created_at in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def unfollowed(follower_id, author_id):
+    TimelineEntry.objects.filter(user_id=follower_id, author_id=author_id).delete()
+
+
+def pulled_author_ids(user):
+    """Authors whose posts ``user``'s feed reads from ``Post`` rather than the timeline."""
+
+    author_ids = [user.pk]
+    high_reach = high_reach_author_ids()
+    if high_reach:
+        author_ids.extend(
+            Follow.objects.filter(follower=user, following_id__in=high_reach).values_list("following_id", flat=True)
+        )
+    return author_ids
+
+
+def feed_window(user, after, reverse, limit):
+    """``[(created_at, post id)]`` of the next ``limit`` posts in ``user``'s home feed.
+
+    Newest first after the keyset ``after`` (a ``(created_at, post id)`` pair,
+    or None from the top), oldest first with ``reverse``. Each source is read
+    as one keyset range of its own index, the timeline by ``(user, created_at,
+    post)`` and pulled authors' posts by ``(author, created_at, id)``, so every
+    page costs the same however deep the feed goes.
+    """
+
+    sources = (
+        (TimelineEntry.objects.filter(user=user), "post", "post_id"),
+        (Post.objects.filter(status="published", author_id__in=pulled_author_ids(user)), "id", "id"),
+    )
+    keys = set()
+    for queryset, key, column in sources:
+        ordering = ["created_at", key] if reverse else ["-created_at", f"-{key}"]
+        queryset = queryset.order_by(*ordering)
+        if after is not None:
+            queryset = queryset.filter(keyset_filter(ordering, after))
+        keys.update(queryset.values_list("created_at", column)[:limit])
+    return sorted(keys, reverse=not reverse)[:limit]
+
+
+def trim(max_entries=None):
+    """Drop entries beyond the newest ``max_entries`` per user; returns rows deleted."""
+
+    max_entries = max_entries or settings.FEED_TIMELINE_MAX_ENTRIES
+    deleted = 0
+    user_ids = (
+        TimelineEntry.objects.values("user_id")
+        .annotate(entries=Count("id"))
+        .filter(entries__gt=max_entries)
+        .values_list("user_id", flat=True)
+    )
+    for user_id in list(user_ids):
+        keep = (
+            TimelineEntry.objects.filter(user_id=user_id)
+            .order_by("-created_at", "-post")
+            .values_list("pk", flat=True)[:max_entries]
+        )
+        with transaction.atomic():
+            deleted += TimelineEntry.objects.filter(user_id=user_id).exclude(pk__in=list(keep)).delete()[0]
+    return deleted
@@ -0,0 +1,159 @@
+"""Time-decayed trending scores.
+
+Uses forward decay: an event of weight ``w`` at time ``t`` adds
+``w * 2 ** ((t - TRENDING_EPOCH) / half_life)`` to its post, so older
+contributions never need to be rewritten; ranking by the sum at any instant is
+the same as ranking by the exponentially decayed score. To keep the numbers
+finite the table stores ``log2`` of that sum, and new events are merged with a
+log-add-exp update. Removals (un-reacting, deleting a comment) are ignored.
+"""
+
+import math
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Abs, Greatest, Ln, Power
+from django.utils import timezone
+
+from .models import Post, PostShare, PostTrendingScore, Reaction
+
+_WINDOW_RE = re.compile(r"^(\d+)([hd])$")
+
+
+@lru_cache(maxsize=1)
+def _epoch():
+    return datetime.fromisoformat(settings.TRENDING_EPOCH)
+
+
+def event_score(kind, when=None, count=1):
+    """Log2 of the forward-decayed contribution of ``count`` events of ``kind``."""
+
+    weight = settings.TRENDING_EVENT_WEIGHTS[kind] * count
+    when = when or timezone.now()
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    return math.log2(weight) + (when - _epoch()).total_seconds() / half_life
+
+
+def log_add(a, b):
+    """log2(2**a + 2**b) without overflowing."""
+
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def parse_window(value):
+    """Turn ``24h`` / ``7d`` into a timedelta; ``all`` means no window."""
+
+    if value == "all":
+        return None
+    match = _WINDOW_RE.match(value or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("window must look like '24h', '7d' or 'all'.")
+    amount, unit = int(match.group(1)), match.group(2)
+    return timedelta(hours=amount) if unit == "h" else timedelta(days=amount)
+
+
+def _combine(events):
+    scores = {}
+    for post_id, kind, when, count in events:
+        if count > 0 and settings.TRENDING_EVENT_WEIGHTS.get(kind, 0) > 0:
+            scores[post_id] = log_add(scores.get(post_id), event_score(kind, when, count))
+    return scores
+
+
+def record_event(post_id, kind, when=None, count=1):
+    record_events([(post_id, kind, when, count)])
+
+
+def record_events(events):
+    """Merge ``(post_id, kind, when, count)`` events into the trending table."""
+
+    scores = _combine(events)
+    if not scores:
+        return
+    if connection.vendor == "postgresql":
+        _upsert_postgresql(scores)
+    else:
+        _upsert_orm(scores)
+
+
+def _upsert_postgresql(scores):
+    # One statement for the whole batch; the join skips posts deleted meanwhile.
+    table = connection.ops.quote_name(PostTrendingScore._meta.db_table)
+    posts = connection.ops.quote_name(Post._meta.db_table)
+    rows = ", ".join(["(%s::bigint, %s::double precision)"] * len(scores))
+    params = [value for item in sorted(scores.items()) for value in item]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (post_id, score, updated_at)
+            SELECT v.post_id, v.score, %s
+            FROM (VALUES {rows}) AS v (post_id, score)
+            JOIN {posts} p ON p.id = v.post_id
+            ON CONFLICT (post_id) DO UPDATE SET
+                score = GREATEST({table}.score, EXCLUDED.score)
+                    + LN(1 + POWER(2.0, -ABS({table}.score - EXCLUDED.score))) / LN(2),
+                updated_at = EXCLUDED.updated_at
+            """,
+            [timezone.now(), *params],
+        )
+
+
+def _upsert_orm(scores):
+    now = timezone.now()
+    for post_id, value in scores.items():
+        merged = Greatest(F("score"), value) + Ln(1 + Power(2.0, -Abs(F("score") - value))) / math.log(2)
+        if PostTrendingScore.objects.filter(post_id=post_id).update(score=merged, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                PostTrendingScore.objects.create(post_id=post_id, score=value, updated_at=now)
+        except IntegrityError:
+            # Created concurrently, or the post is gone.
+            PostTrendingScore.objects.filter(post_id=post_id).update(score=merged, updated_at=now)
+
+
+def top_post_ids(limit, window=None):
+    """Ids of the highest scoring published posts created within ``window``."""
+
+    queryset = PostTrendingScore.objects.filter(post__status="published")
+    if window is not None:
+        queryset = queryset.filter(post__created_at__gte=timezone.now() - window)
+    return list(queryset.order_by("-score").values_list("post_id", flat=True)[:limit])
+
+
+def rebuild(post_ids):
+    """Recompute the scores of ``post_ids`` from stored reactions, shares and comments.
+
+    Views carry no timestamps, so a post's accumulated views count as of its
+    creation time.
+    """
+
+    Comment = apps.get_model("comments", "Comment")
+    post_ids = list(post_ids)
+    events = []
+    for post_id, created_at, views in Post.objects.filter(pk__in=post_ids).values_list("pk", "created_at", "views"):
+        events.append((post_id, "view", created_at, views))
+    for kind, model in (("reaction", Reaction), ("share", PostShare), ("comment", Comment)):
+        events.extend(
+            (post_id, kind, created_at, 1)
+            for post_id, created_at in model.objects.filter(post_id__in=post_ids).values_list("post_id", "created_at")
+        )
+
+    scores = _combine(events)
+    now = timezone.now()
+    PostTrendingScore.objects.filter(post_id__in=post_ids).exclude(post_id__in=list(scores)).delete()
+    PostTrendingScore.objects.bulk_create(
+        [PostTrendingScore(post_id=post_id, score=score, updated_at=now) for post_id, score in scores.items()],
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=["score", "updated_at"],
+    )
+    return len(scores)
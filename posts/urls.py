@@ -1,11 +1,12 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import PostViewSet, ReactionViewSet
+from .views import HomeFeedView, PostViewSet, ReactionViewSet
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet)
 router.register(r'reactions', ReactionViewSet) # If you want a separate endpoint for managing reactions directly
 
 urlpatterns = [
+    path('feed/', HomeFeedView.as_view(), name='post-feed'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
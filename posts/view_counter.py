@@ -0,0 +1,183 @@
+"""Write-behind view counting for posts.
+
+Retrieving a post only bumps an in-process counter; a background thread folds
+the buffered deltas into ``Post.views`` every ``POST_VIEW_FLUSH_INTERVAL_SECONDS``
+with one ``UPDATE ... SET views = views + CASE id WHEN ... END`` per chunk, so
+reads never write to the database. Repeat views by the same viewer within
+``POST_VIEW_DEDUPE_WINDOW_SECONDS`` are ignored; the dedupe markers live in the
+Django cache and are therefore shared between processes when a shared cache is
+configured.
+"""
+
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections, connection
+
+from core import metrics
+
+from . import trending
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+DEDUPED_COUNTER = "posts.views.deduped"
+FLUSHED_COUNTER = "posts.views.flushed"
+FLUSH_COUNTER = "posts.views.flushes"
+FLUSH_FAILED_COUNTER = "posts.views.flush_failed"
+
+_lock = threading.Lock()
+_pending = Counter()
+_oldest_pending = None
+_deduped = 0
+_flusher = None
+last_flush = {}
+
+
+def viewer_key(request):
+    """Identify the viewer for dedupe: the user id, else a hash of IP and user agent."""
+
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"u{user.pk}"
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    address = forwarded.split(",")[0].strip() or request.META.get("REMOTE_ADDR", "")
+    agent = request.META.get("HTTP_USER_AGENT", "")
+    return "a" + hashlib.sha1(f"{address}|{agent}".encode("utf-8")).hexdigest()[:16]
+
+
+def record_view(post_id, viewer=None) -> bool:
+    """Buffer one view of ``post_id``; return False if it was deduplicated."""
+
+    global _oldest_pending, _deduped
+
+    window = settings.POST_VIEW_DEDUPE_WINDOW_SECONDS
+    if viewer and window > 0 and not cache.add(f"post-views:seen:{post_id}:{viewer}", 1, timeout=window):
+        with _lock:
+            _deduped += 1
+        return False
+
+    with _lock:
+        _pending[post_id] += 1
+        if _oldest_pending is None:
+            _oldest_pending = time.monotonic()
+    _ensure_flusher()
+    return True
+
+
+def pending_views() -> dict:
+    with _lock:
+        return dict(_pending)
+
+
+def _apply_deltas(chunk):
+    # Built by hand: resolving thousands of When() expressions through the ORM
+    # costs far more than the UPDATE itself.
+    table = connection.ops.quote_name(Post._meta.db_table)
+    cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+    placeholders = ", ".join(["%s"] * len(chunk))
+    params = [value for item in chunk for value in item] + [post_id for post_id, _ in chunk]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET views = views + CASE id {cases} ELSE 0 END WHERE id IN ({placeholders})",
+            params,
+        )
+
+
+def flush() -> dict:
+    """Apply buffered view deltas to ``Post.views`` and return flush statistics."""
+
+    global _oldest_pending, _deduped
+
+    with _lock:
+        deltas = dict(_pending)
+        _pending.clear()
+        oldest, _oldest_pending = _oldest_pending, None
+        deduped, _deduped = _deduped, 0
+
+    started = time.monotonic()
+    result = {
+        "posts": len(deltas),
+        "views": sum(deltas.values()),
+        "deduped": deduped,
+        "lag_seconds": started - oldest if oldest is not None else 0.0,
+    }
+    if deduped:
+        metrics.incr(DEDUPED_COUNTER, deduped)
+    if not deltas:
+        result["duration_ms"] = 0.0
+        return result
+
+    items = sorted(deltas.items())
+    size = max(settings.POST_VIEW_FLUSH_BATCH_SIZE, 1)
+    written = 0
+    try:
+        for offset in range(0, len(items), size):
+            chunk = items[offset:offset + size]
+            _apply_deltas(chunk)
+            written = offset + len(chunk)
+    except DatabaseError:
+        # Put the unwritten deltas back so the next flush retries them.
+        with _lock:
+            _pending.update(dict(items[written:]))
+            if _oldest_pending is None:
+                _oldest_pending = oldest
+        metrics.incr(FLUSH_FAILED_COUNTER)
+        logger.exception("Flushing %s buffered post view(s) failed", result["views"])
+        raise
+
+    try:
+        trending.record_events([(post_id, "view", None, delta) for post_id, delta in items])
+    except DatabaseError:
+        # The view counts are already stored; only their trending boost is lost.
+        logger.exception("Updating trending scores for %s post(s) failed", len(items))
+
+    result["duration_ms"] = (time.monotonic() - started) * 1000
+    metrics.incr(FLUSHED_COUNTER, result["views"])
+    metrics.incr(FLUSH_COUNTER)
+    last_flush.clear()
+    last_flush.update(result)
+    return result
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        close_old_connections()
+        try:
+            flush()
+        except DatabaseError:
+            pass  # Logged by flush(); the deltas are retried next time.
+        except Exception:
+            # Keep flushing for the rest of the process whatever went wrong.
+            logger.exception("Post view flusher failed")
+        finally:
+            connection.close()
+
+
+def _ensure_flusher():
+    """Start this process's background flusher on first use."""
+
+    global _flusher
+
+    interval = settings.POST_VIEW_FLUSH_INTERVAL_SECONDS
+    if _flusher is not None or interval <= 0:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, args=(interval,), name="post-view-flusher", daemon=True)
+            _flusher.start()
+            atexit.register(_flush_at_exit)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Final post view flush failed")
@@ -1,43 +1,68 @@
 import mimetypes
-import uuid
 
 from django.conf import settings
-from rest_framework import viewsets, status, permissions
+from rest_framework import generics, viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled, ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
+from core.conditional import ConditionalGetMixin
+from core.pagination import WindowKeysetPagination
 from .models import Post, Reaction, PostShare
-from .serializers import PostSerializer, ReactionSerializer
+from . import fingerprint, reactions, related, scripture, tagging, timeline, trending
+from .search import get_search_backend
+from .serializers import PostCardSerializer, PostSearchResultSerializer, PostSerializer, ReactionSerializer
+from .view_counter import record_view, viewer_key
 from .permissions import IsAuthorOrReadOnly, IsAdminUserOrReadOnly # Custom permissions (define below)
 from django.db import models # <--- ADD THIS LINE!
-from django.db.models import Count
-from storage3.utils import StorageException
+from django.db import transaction
+from django.utils import timezone
 
-from salt_and_light.supabase_client import get_supabase_client, get_public_url, extract_response_error
+from core import blobs
+from salt_and_light.images import create_derivatives, variants_for_url
+from salt_and_light.storage import StorageError, get_storage
 
 
-class PostViewSet(viewsets.ModelViewSet):
+# Columns a list can skip loading when the serializer does not render them.
+DEFERRABLE_POST_FIELDS = ('content', 'excerpt', 'ai_moderation_feedback', 'tags', 'scripture_refs', 'image_variants')
+
+
+def post_list_serializer_class(request, default=PostSerializer):
+    """``?view=card`` selects the compact representation for post lists."""
+    if request.query_params.get('view') == 'card':
+        return PostCardSerializer
+    return default
+
+
+def defer_unrendered(queryset, serializer):
+    rendered = set(serializer.fields)
+    if 'image_url' in rendered:
+        rendered.add('image_variants')  # For ?size=
+    return queryset.defer(*[name for name in DEFERRABLE_POST_FIELDS if name not in rendered])
+
+
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = (
         Post.objects.filter(status='published')
-        .annotate(comment_count=Count('comments'))
-        .prefetch_related('reactions__user', 'shares')
+        .select_related('author', 'stats')
     ) # Only show published posts by default
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
             if user.is_staff:  # Admin can see all
-                queryset = Post.objects.all().annotate(comment_count=Count('comments')).prefetch_related('reactions__user', 'shares')
+                queryset = Post.objects.all().select_related('author', 'stats')
             else:  # Author can see their own drafts/pending posts
                 queryset = (
                     Post.objects.filter(models.Q(status='published') | models.Q(author=user))
-                    .annotate(comment_count=Count('comments'))
-                    .prefetch_related('reactions__user', 'shares')
+                    .select_related('author', 'stats')
                 )
         else:
             queryset = super().get_queryset()
@@ -56,15 +81,64 @@ class PostViewSet(viewsets.ModelViewSet):
         if status_param:
             queryset = queryset.filter(status=status_param)
 
+        tags = self.request.query_params.getlist('tag')
+        if tags and self.action != 'tags':
+            match = 'all' if self.request.query_params.get('tag_match') == 'all' else 'any'
+            queryset = tagging.filter_by_tags(queryset, tags, match=match)
+
+        passage = self.request.query_params.get('scripture')
+        if passage:
+            try:
+                queryset = scripture.filter_by_passage(queryset, passage)
+            except ValueError as exc:
+                raise ValidationError({'scripture': str(exc)})
+
+        if self.action in ('list', 'retrieve', 'trending', 'related'):
+            queryset = defer_unrendered(queryset, self.get_serializer())
         return queryset
 
+    def get_serializer_class(self):
+        if self.action in ('list', 'trending', 'related'):
+            return post_list_serializer_class(self.request)
+        return super().get_serializer_class()
+
+    def get_cursor_ordering(self):
+        if self.action == 'search':
+            return ('-search_rank', '-id')
+        return self.cursor_ordering
+
+    def retrieve(self, request, *args, **kwargs):
+        post = self.get_object()
+        if post.status == 'published':
+            # Buffered and flushed to Post.views in bulk; see posts/view_counter.py.
+            record_view(post.pk, viewer_key(request))
+        return self.conditional_retrieve(request, post)
+
+    def get_etag_parts(self, post):
+        # PostStats.updated_at moves with every reaction, share and comment,
+        # including the viewer's own. The buffered view count is left out so it
+        # does not invalidate clients every flush; it refreshes with the next change.
+        # The author's updated_at covers their name and avatar copies.
+        stats = getattr(post, 'stats', None)
+        return (post.pk, post.updated_at, post.status, stats and stats.updated_at, post.author.updated_at)
+
+    def get_last_modified(self, post):
+        stats = getattr(post, 'stats', None)
+        modified = max(post.updated_at, post.author.updated_at)
+        return max(modified, stats.updated_at) if stats else modified
+
     def perform_create(self, serializer):
-        # Set the author automatically to the current user
+        # Copy-pasting the same text over and over is throttled; copies that get
+        # through are linked to the original (see posts/fingerprint.py).
+        content = serializer.validated_data.get('content', '')
+        if fingerprint.recent_duplicates_by(self.request.user, content) >= settings.POST_DUPLICATE_LIMIT:
+            raise Throttled(
+                wait=settings.POST_DUPLICATE_WINDOW_SECONDS,
+                detail='You have recently posted this several times already.',
+            )
+        # Set the author automatically to the current user. New posts start out
+        # 'pending' and saving them queues AI moderation (see Post.save).
         serializer.save(author=self.request.user)
-        # In a real scenario, this would likely trigger an async AI moderation task
-        # For now, let's set it to 'pending'
-        serializer.instance.status = 'pending'
-        serializer.instance.save()
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def share(self, request, pk=None):
@@ -108,45 +182,177 @@ class PostViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Reaction type is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Ensure reaction type is valid
-        if reaction_type not in [choice[0] for choice in Reaction.REACTION_CHOICES]:
+        if reaction_type not in reactions.REACTION_TYPES:
             return Response({'detail': 'Invalid reaction type.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Toggle reaction (add if not exists, remove if exists)
-        reaction, created = Reaction.objects.get_or_create(
-            post=post, user=request.user, type=reaction_type
-        )
-        if not created:
-            reaction.delete()
-            return Response({'detail': f'Reaction "{reaction_type}" removed.'}, status=status.HTTP_200_OK)
-        return Response({'detail': f'Reaction "{reaction_type}" added.'}, status=status.HTTP_201_CREATED)
+        # Toggle reaction (add if not exists, remove if exists) in one statement.
+        result = reactions.apply_reaction(post.pk, request.user.pk, reaction_type)
+        payload = {'type': reaction_type, 'reacted': result.reacted, 'count': result.count}
+        if not result.reacted:
+            return Response({'detail': f'Reaction "{reaction_type}" removed.', **payload}, status=status.HTTP_200_OK)
+        return Response({'detail': f'Reaction "{reaction_type}" added.', **payload}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='react', permission_classes=[permissions.IsAuthenticated])
+    def bulk_react(self, request):
+        # Applies [{"post": id, "type": "amen", "action": "add|remove|toggle"}, ...]
+        # in order, all or nothing.
+        changes = request.data
+        if not isinstance(changes, list) or not changes:
+            return Response({'detail': 'Expected a non-empty list of reaction changes.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(changes) > settings.POST_BULK_REACTION_LIMIT:
+            return Response(
+                {'detail': f'At most {settings.POST_BULK_REACTION_LIMIT} reaction changes per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        parsed = []
+        for index, change in enumerate(changes):
+            try:
+                post_id = int(change['post'])
+                reaction_type = change['type']
+                reaction_action = change.get('action', reactions.TOGGLE)
+            except (KeyError, TypeError, ValueError):
+                return Response({'detail': f'Change {index} needs "post" and "type".'}, status=status.HTTP_400_BAD_REQUEST)
+            if reaction_type not in reactions.REACTION_TYPES or reaction_action not in reactions.ACTIONS:
+                return Response({'detail': f'Change {index} has an invalid type or action.'}, status=status.HTTP_400_BAD_REQUEST)
+            parsed.append((post_id, reaction_type, reaction_action))
+
+        visible = set(self.get_queryset().filter(pk__in={post_id for post_id, _, _ in parsed}).values_list('pk', flat=True))
+        missing = sorted({post_id for post_id, _, _ in parsed} - visible)
+        if missing:
+            return Response({'detail': f'Posts not found: {missing}.'}, status=status.HTTP_404_NOT_FOUND)
+
+        with transaction.atomic():
+            results = [
+                reactions.apply_reaction(post_id, request.user.pk, reaction_type, reaction_action)
+                for post_id, reaction_type, reaction_action in parsed
+            ]
+        return Response([result._asdict() for result in results], status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
     def trending(self, request):
-        # Implement trending logic based on views, reactions, etc.
-        # Cache this heavily as it's a frequently accessed endpoint
-        trending_posts = cache.get('trending_posts')
-        if not trending_posts:
-            # Example: Posts with most views in the last 7 days
-            from django.utils import timezone
-            from datetime import timedelta
-            seven_days_ago = timezone.now() - timedelta(days=7)
-            trending_posts = (
-    self.get_queryset()
-    .filter(created_at__gte=seven_days_ago)
-    .annotate(reaction_count=Count('reactions'))
-    .order_by('-views', '-reaction_count')[:10]
-)
-            serializer = self.get_serializer(trending_posts, many=True)
-            trending_posts = serializer.data
-            cache.set('trending_posts', trending_posts, timeout=60 * 60) # Cache for 1 hour
-
-        return Response(trending_posts)
+        # Scores are maintained incrementally (see posts/trending.py); only the
+        # ranked ids are cached so viewer-specific fields stay per request.
+        window_param = request.query_params.get('window', settings.TRENDING_DEFAULT_WINDOW)
+        try:
+            window = trending.parse_window(window_param)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = f'trending_post_ids:{window_param}:{limit}'
+        post_ids = cache.get(cache_key)
+        if post_ids is None:
+            post_ids = trending.top_post_ids(limit, window)
+            cache.set(cache_key, post_ids, timeout=settings.TRENDING_CACHE_SECONDS)
+
+        posts = self.get_queryset().in_bulk(post_ids)
+        serializer = self.get_serializer([posts[pk] for pk in post_ids if pk in posts], many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        # Served from the materialized top-K lists (see posts/related.py): one
+        # query through the RelatedPost index, no scoring at request time.
+        try:
+            limit = int(request.query_params.get('limit', settings.RELATED_POSTS_LIMIT))
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), settings.RELATED_POSTS_LIMIT)
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        posts = list(
+            self.get_queryset()
+            .filter(related_from__post_id=pk)
+            .order_by('-related_from__score', '-pk')[:limit]
+        )
+        if not posts:
+            # Only an empty list costs a second query, to tell it from a missing post.
+            get_object_or_404(self.get_queryset(), pk=pk)
+        serializer = self.get_serializer(posts, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def tags(self, request):
+        # Counts of published posts per tag; with ?tag= the counts of tags that
+        # co-occur with all of the given ones, for drilling down.
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        tags = tagging.normalize_tags(request.query_params.getlist('tag'))
+
+        cache_key = f"tag_facets:{limit}:{','.join(sorted(tags))}"
+        facets = cache.get(cache_key)
+        if facets is None:
+            facets = tagging.tag_facets(limit, tags)
+            cache.set(cache_key, facets, timeout=settings.TAG_FACETS_CACHE_SECONDS)
+        return Response(facets)
+
+    @action(detail=False, methods=['get'])
+    def passages(self, request):
+        # Most cited verse ranges across published posts, from the ScriptureRef index.
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        book_param = request.query_params.get('book')
+        book = scripture.lookup_book(book_param) if book_param else None
+        if book_param and book is None:
+            return Response({'detail': f'Unknown book "{book_param}".'}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = f'scripture_passages:{book or "all"}:{limit}'
+        passages = cache.get(cache_key)
+        if passages is None:
+            passages = scripture.most_cited(limit, book)
+            cache.set(cache_key, passages, timeout=settings.SCRIPTURE_PASSAGES_CACHE_SECONDS)
+        return Response(passages)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = (request.query_params.get('q') or '').strip()
+        if len(query) < 2:
+            return Response({'detail': 'Search query "q" must be at least 2 characters.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = get_search_backend().search(self.get_queryset(), query)
+        page = self.paginate_queryset(queryset)
+        serializer = PostSearchResultSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def moderation_feedback(self, request, pk=None):
         post = self.get_object()
         return Response(post.ai_moderation_feedback)
 
+class HomeFeedView(generics.ListAPIView):
+    """Published posts from the people the viewer follows, newest first.
+
+    Reads the viewer's fan-out timeline plus posts by followed high-reach
+    authors; see posts/timeline.py.
+    """
+
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = WindowKeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        # Only the page's posts are loaded, by id; see get_keyset_window.
+        queryset = Post.objects.filter(status='published').select_related('author', 'stats')
+        return defer_unrendered(queryset, self.get_serializer())
+
+    def get_keyset_window(self, after, reverse, limit):
+        return timeline.feed_window(self.request.user, after, reverse, limit)
+
+    def get_serializer_class(self):
+        return post_list_serializer_class(self.request)
+
+
 class ReactionViewSet(viewsets.ModelViewSet):
     queryset = Reaction.objects.all()
     serializer_class = ReactionSerializer
@@ -176,30 +382,40 @@ class UploadPostImageView(APIView):
             if len(name_parts) == 2:
                 extension = f".{name_parts[1]}"
 
-        unique_name = f"posts/{request.user.id}/{uuid.uuid4().hex}{extension}"
-
-        client = get_supabase_client()
-        bucket = client.storage.from_(settings.SUPABASE_POST_IMAGE_BUCKET)
-
-        file_bytes = image_file.read()
-
+        # Stored once per content hash; a repost of known bytes skips the upload.
+        storage = get_storage()
         try:
-            response = bucket.upload(unique_name, file_bytes, {
-                "contentType": content_type,
-                "cacheControl": "31536000",
-                "upsert": "false",
-            })
-        except StorageException as exc:
-            detail = getattr(exc, 'message', None) or getattr(exc, 'error', None) or str(exc)
-            return Response({'detail': f'Image upload failed: {detail}'}, status=status.HTTP_502_BAD_GATEWAY)
-
-        error_message = extract_response_error(response)
-        if error_message:
-            return Response({'detail': f'Image upload failed: {error_message}'}, status=status.HTTP_502_BAD_GATEWAY)
-
-        public_url = get_public_url(unique_name)
+            blob, created = blobs.store(
+                blobs.POST_IMAGES,
+                image_file,
+                'posts',
+                extension,
+                content_type,
+                save=lambda path: storage.save(path, image_file, content_type),
+                url_for=storage.public_url,
+                lease=settings.BLOB_UPLOAD_LEASE_SECONDS,
+            )
+        except StorageError as exc:
+            return Response({'detail': f'Image upload failed: {exc}'}, status=status.HTTP_502_BAD_GATEWAY)
+
+        public_url = blob.url
         if not public_url:
             return Response({'detail': 'Unable to resolve public URL for uploaded image.'}, status=status.HTTP_502_BAD_GATEWAY)
 
-        return Response({'url': public_url, 'path': unique_name}, status=status.HTTP_201_CREATED)
+        # Posts created with this URL pick the derivatives up in Post.save();
+        # posts created while they are still rendering get them in on_done.
+        if created:
+            variants = create_derivatives(
+                image_file,
+                source_url=public_url,
+                storage=storage,
+                on_done=lambda variants: Post.objects.filter(image_url=public_url).update(
+                    # Moves the posts' ETags and Last-Modified along with the representation.
+                    image_variants=variants, updated_at=timezone.now()
+                ),
+            )
+        else:
+            variants = variants_for_url(public_url)
+
+        return Response({'url': public_url, 'path': blob.path, 'variants': variants}, status=status.HTTP_201_CREATED)
 
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_requests', '0003_prayerinteraction_prayernotification_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prayerinteraction',
+            name='ai_moderation_feedback',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
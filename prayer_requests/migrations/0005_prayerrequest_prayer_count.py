@@ -0,0 +1,47 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:27
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    PrayerRequest = apps.get_model('prayer_requests', 'PrayerRequest')
+    PrayerInteraction = apps.get_model('prayer_requests', 'PrayerInteraction')
+    prayed = (
+        PrayerInteraction.objects.filter(prayer_request=OuterRef('pk'), interaction_type='prayed')
+        .order_by()
+        .values('prayer_request')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    PrayerRequest.objects.update(prayer_count=Coalesce(Subquery(prayed), 0))
+    PrayerRequest.objects.filter(status='answered', answered_at__isnull=True).update(answered_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_requests', '0004_prayerinteraction_ai_moderation_feedback'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prayerrequest',
+            name='prayer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='prayerrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='prayer_request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prayerrequest',
+            index=models.Index(fields=['-prayer_count', '-created_at', '-id'], name='prayer_request_prayed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prayerrequest',
+            index=models.Index(fields=['status', '-answered_at', '-created_at', '-id'], name='prayer_request_answered_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:47
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def backfill_activity_at(apps, schema_editor):
+    PrayerRequest = apps.get_model('prayer_requests', 'PrayerRequest')
+    PrayerRequest.objects.update(activity_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_requests', '0005_prayerrequest_prayer_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prayerrequest',
+            name='activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_activity_at, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,10 @@ import uuid
 
 from django.db import models
 from django.db.models import JSONField
+from django.utils import timezone
 
+from moderation.ledger import pending_feedback, revision_changed, unchanged
+from moderation.queue import request_moderation
 from users.models import User
 
 
@@ -39,11 +42,30 @@ class PrayerRequest(models.Model):
     answered_note = models.CharField(max_length=200, blank=True, default="")
     answered_scripture = models.CharField(max_length=120, blank=True, default="")
     answered_at = models.DateTimeField(null=True, blank=True)
+    # Maintained with F() by prayer_requests/signals.py so "most prayed" can be
+    # served from an index.
+    prayer_count = models.PositiveIntegerField(default=0)
+    # Last time an interaction was added, removed or moderated; together with
+    # updated_at it versions the request for conditional GETs.
+    activity_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="prayer_request_created_idx"),
+            models.Index(fields=["-prayer_count", "-created_at", "-id"], name="prayer_request_prayed_idx"),
+            models.Index(fields=["status", "-answered_at", "-created_at", "-id"], name="prayer_request_answered_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Answered requests are paged by answered_at, which must not be null.
+        if self.status == self.Status.ANSWERED and self.answered_at is None:
+            self.answered_at = timezone.now()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "answered_at"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         display_name = (
@@ -76,6 +98,7 @@ class PrayerInteraction(models.Model):
         default=InteractionType.PRAYED,
     )
     message = models.CharField(max_length=100, blank=True)
+    ai_moderation_feedback = JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -91,6 +114,44 @@ class PrayerInteraction(models.Model):
     def __str__(self):
         return f"{self.user} {self.interaction_type} {self.prayer_request_id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_message = instance.__dict__.get("message")
+        return instance
+
+    def save(self, *args, **kwargs):
+        encouragement = self.interaction_type == self.InteractionType.ENCOURAGE
+        update_fields = kwargs.get("update_fields")
+        if (
+            encouragement
+            and not self._state.adding
+            and (update_fields is None or "message" in update_fields)
+            and revision_changed(self, getattr(self, "_loaded_message", None))
+        ):
+            # Edited text waits for its own verdict, like an edited post.
+            self.ai_moderation_feedback = pending_feedback(self.ai_moderation_feedback)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "ai_moderation_feedback"}
+        super().save(*args, **kwargs)
+        self._loaded_message = self.message
+        if encouragement:
+            request_moderation(self)
+
+    def get_moderation_text(self):
+        return self.message
+
+    def is_awaiting_moderation(self):
+        return not self.ai_moderation_feedback or self.ai_moderation_feedback.get("status") == "pending"
+
+    def apply_moderation_result(self, result, content_hash=None):
+        interaction = unchanged(PrayerInteraction.objects.filter(pk=self.pk), "message", content_hash)
+        if interaction is None:
+            return
+        self.ai_moderation_feedback = result
+        interaction.update(ai_moderation_feedback=result)
+        PrayerRequest.objects.filter(pk=self.prayer_request_id).update(activity_at=timezone.now())
+
 
 class PrayerNotification(models.Model):
     class NotificationType(models.TextChoices):
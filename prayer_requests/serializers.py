@@ -2,6 +2,7 @@ from typing import Any, Dict, Optional
 
 from rest_framework import serializers
 
+from salt_and_light.images import pick, requested_size
 from users.serializers import UserProfileSerializer  # Optional for displaying author info
 
 from .models import PrayerInteraction, PrayerRequest
@@ -22,7 +23,7 @@ class PrayerEncouragementSerializer(serializers.ModelSerializer):
         profile_picture = getattr(obj.user, "profile_picture", None)
         if profile_picture and hasattr(profile_picture, "url"):
             try:
-                avatar = profile_picture.url
+                avatar = pick(profile_picture.url, obj.user.profile_picture_variants, requested_size(self.context))
             except Exception:
                 avatar = None
         return {
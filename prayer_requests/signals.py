@@ -0,0 +1,24 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import PrayerInteraction, PrayerRequest
+
+
+def _interaction_changed(interaction, delta):
+    updates = {"activity_at": timezone.now()}
+    if interaction.interaction_type == PrayerInteraction.InteractionType.PRAYED:
+        updates["prayer_count"] = F("prayer_count") + delta
+    PrayerRequest.objects.filter(pk=interaction.prayer_request_id).update(**updates)
+
+
+@receiver(post_save, sender=PrayerInteraction)
+def interaction_added(sender, instance, created, **kwargs):
+    if created:
+        _interaction_changed(instance, 1)
+
+
+@receiver(post_delete, sender=PrayerInteraction)
+def interaction_removed(sender, instance, **kwargs):
+    _interaction_changed(instance, -1)
@@ -126,3 +126,89 @@ class PrayerRequestAPITests(APITestCase):
             ).count(),
             1,
         )
+
+    def test_unflagged_encouragements_are_listed_and_counted(self):
+        prayer = PrayerRequest.objects.create(user=self.user, short_description="Pray for rest")
+        for user, feedback in ((self.friend, {}), (self.other_user, {"flagged": True, "categories": [], "notes": ""})):
+            interaction = PrayerInteraction.objects.create(
+                prayer_request=prayer,
+                user=user,
+                interaction_type=PrayerInteraction.InteractionType.ENCOURAGE,
+                message="You are not alone",
+            )
+            PrayerInteraction.objects.filter(pk=interaction.pk).update(ai_moderation_feedback=feedback)
+
+        self.client.force_authenticate(user=self.friend)
+        response = self.client.get(reverse("prayerrequest-detail", args=[prayer.pk]))
+        self.assertEqual(response.data["encouragement_count"], 1)
+        self.assertEqual(len(response.data["recent_encouragements"]), 1)
+
+        response = self.client.get(reverse("prayerrequest-encouragements", args=[prayer.pk]))
+        self.assertEqual(len(response.data), 1)
+
+    def test_edited_encouragement_waits_for_its_own_verdict(self):
+        prayer = PrayerRequest.objects.create(user=self.user, short_description="Pray for rest")
+        interaction = PrayerInteraction.objects.create(
+            prayer_request=prayer,
+            user=self.friend,
+            interaction_type=PrayerInteraction.InteractionType.ENCOURAGE,
+            message="You are not alone",
+        )
+        interaction.apply_moderation_result({"flagged": False, "categories": [], "notes": ""})
+
+        interaction = PrayerInteraction.objects.get(pk=interaction.pk)
+        interaction.message = "You are not alone, friend"
+        interaction.save()
+
+        interaction.refresh_from_db()
+        self.assertEqual(interaction.ai_moderation_feedback, {"status": "pending"})
+        self.assertTrue(interaction.is_awaiting_moderation())
+
+    def test_most_prayed_pages_follow_denormalized_prayer_count(self):
+        requests = [
+            PrayerRequest.objects.create(user=self.user, short_description=f"Request {index}")
+            for index in range(3)
+        ]
+        for prayer_request, users in zip(requests, [[self.friend], [self.friend, self.other_user], []]):
+            for user in users:
+                PrayerInteraction.objects.create(prayer_request=prayer_request, user=user)
+        PrayerInteraction.objects.filter(prayer_request=requests[0]).delete()
+
+        self.client.force_authenticate(user=self.user)
+        seen = []
+        url = self.list_url + "?sort=most_prayed&page_size=1"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend((item["id"], item["prayer_count"]) for item in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(
+            seen,
+            [(str(requests[1].id), 2), (str(requests[2].id), 0), (str(requests[0].id), 0)],
+        )
+
+    def test_conditional_get_revalidates_until_someone_prays(self):
+        prayer = PrayerRequest.objects.create(user=self.user, short_description="Pray for rain")
+        detail_url = reverse("prayerrequest-detail", args=[prayer.pk])
+        self.client.force_authenticate(user=self.other_user)
+
+        for url in (detail_url, self.list_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual("Last-Modified" in response, url == detail_url)
+                etag = response["ETag"]
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response["ETag"], etag)
+
+        etag = self.client.get(detail_url)["ETag"]
+        self.client.force_authenticate(user=self.friend)
+        self.client.post(reverse("prayerrequest-pray", args=[prayer.pk]))
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["prayer_count"], 1)
+
@@ -5,6 +5,8 @@ from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from core.conditional import ConditionalGetMixin
+from moderation.visibility import flagged
 from users.models import Follow
 
 from .models import PrayerInteraction, PrayerNotification, PrayerRequest
@@ -18,7 +20,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         return obj.user_id == getattr(request.user, "id", None)
 
 
-class PrayerRequestViewSet(viewsets.ModelViewSet):
+class PrayerRequestViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = PrayerRequest.objects.all()
     serializer_class = PrayerRequestSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -29,18 +31,12 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
         queryset = (
             PrayerRequest.objects.select_related("user")
             .annotate(
-                prayer_count=Count(
-                    "interactions",
-                    filter=models.Q(
-                        interactions__interaction_type=PrayerInteraction.InteractionType.PRAYED
-                    ),
-                    distinct=True,
-                ),
                 encouragement_count=Count(
                     "interactions",
                     filter=models.Q(
                         interactions__interaction_type=PrayerInteraction.InteractionType.ENCOURAGE
-                    ),
+                    )
+                    & ~flagged("interactions__ai_moderation_feedback"),
                     distinct=True,
                 ),
             )
@@ -50,6 +46,7 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
                     queryset=PrayerInteraction.objects.filter(
                         interaction_type=PrayerInteraction.InteractionType.ENCOURAGE
                     )
+                    .exclude(flagged())
                     .select_related("user")
                     .order_by("-created_at")[:5],
                     to_attr="_recent_encouragements",
@@ -95,17 +92,37 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
         if category:
             queryset = queryset.filter(category__iexact=category.strip())
 
+        sort = self.request.query_params.get("sort", "newest").lower()
+        if sort == "answered":
+            queryset = queryset.filter(status=PrayerRequest.Status.ANSWERED)
+
+        return queryset.order_by(*self.get_cursor_ordering())
+
+    def get_cursor_ordering(self):
+        # Each ordering is backed by one of the PrayerRequest Meta indexes.
         sort = self.request.query_params.get("sort", "newest").lower()
         if sort == "most_prayed":
-            queryset = queryset.order_by("-prayer_count", "-created_at")
-        elif sort == "answered":
-            queryset = queryset.filter(status=PrayerRequest.Status.ANSWERED).order_by(
-                "-answered_at", "-created_at"
-            )
-        else:
-            queryset = queryset.order_by("-created_at")
+            return ("-prayer_count", "-created_at", "-id")
+        if sort == "answered":
+            return ("-answered_at", "-created_at", "-id")
+        return ("-created_at", "-id")
+
+    def get_etag_parts(self, prayer_request):
+        # activity_at moves with every prayer and encouragement, so it also
+        # covers the counts, has_prayed and the recent encouragements.
+        return (
+            prayer_request.pk,
+            prayer_request.updated_at,
+            prayer_request.activity_at,
+            prayer_request.prayer_count,
+            getattr(prayer_request, "encouragement_count", None),
+            getattr(prayer_request, "has_prayed", None),
+            prayer_request.user and prayer_request.user.updated_at,
+        )
 
-        return queryset
+    def get_last_modified(self, prayer_request):
+        modified = max(prayer_request.updated_at, prayer_request.activity_at)
+        return max(modified, prayer_request.user.updated_at) if prayer_request.user else modified
 
     def get_permissions(self):
         if self.action in ["update", "partial_update", "destroy"]:
@@ -117,6 +134,10 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save()
 
+    def _prayer_count(self, prayer_request):
+        prayer_request.refresh_from_db(fields=["prayer_count"])
+        return prayer_request.prayer_count
+
     @action(detail=True, methods=["post"], url_path="pray")
     def pray(self, request, pk=None):
         prayer_request = self.get_object()
@@ -131,10 +152,7 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
             return Response(
                 {
                     "detail": "You have already recorded a prayer for this request.",
-                    "prayer_count": PrayerInteraction.objects.filter(
-                        prayer_request=prayer_request,
-                        interaction_type=PrayerInteraction.InteractionType.PRAYED,
-                    ).count(),
+                    "prayer_count": self._prayer_count(prayer_request),
                 },
                 status=status.HTTP_200_OK,
             )
@@ -153,10 +171,7 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
                 },
             )
 
-        prayer_count = PrayerInteraction.objects.filter(
-            prayer_request=prayer_request,
-            interaction_type=PrayerInteraction.InteractionType.PRAYED,
-        ).count()
+        prayer_count = self._prayer_count(prayer_request)
 
         return Response(
             {"detail": "Prayer recorded.", "prayer_count": prayer_count},
@@ -179,10 +194,7 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        prayer_count = PrayerInteraction.objects.filter(
-            prayer_request=prayer_request,
-            interaction_type=PrayerInteraction.InteractionType.PRAYED,
-        ).count()
+        prayer_count = self._prayer_count(prayer_request)
 
         return Response(
             {"detail": "Prayer removed.", "prayer_count": prayer_count},
@@ -221,10 +233,14 @@ class PrayerRequestViewSet(viewsets.ModelViewSet):
             serializer = PrayerEncouragementSerializer(encouragement)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        queryset = PrayerInteraction.objects.filter(
-            prayer_request=prayer_request,
-            interaction_type=PrayerInteraction.InteractionType.ENCOURAGE,
-        ).select_related("user")
+        queryset = (
+            PrayerInteraction.objects.filter(
+                prayer_request=prayer_request,
+                interaction_type=PrayerInteraction.InteractionType.ENCOURAGE,
+            )
+            .exclude(flagged())
+            .select_related("user")
+        )
         serializer = PrayerEncouragementSerializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -0,0 +1,218 @@
+"""Resized WebP derivatives of uploaded images.
+
+``create_derivatives`` renders one WebP per entry in ``IMAGE_DERIVATIVE_SIZES``
+(longest edge in pixels, never upscaled) and stores them under
+``derivatives/<sha256 of the original>/``. Decoding and resizing run in a
+process pool of ``IMAGE_DERIVATIVE_WORKERS`` processes (0 renders inline), so
+Pillow's CPU time does not hold the web worker's GIL. Upload paths pass
+``on_done`` and do not wait for the pool: when the render finishes, a small
+thread pool stores the derivatives and hands them to ``on_done``. An image whose hash was seen before
+reuses the stored derivatives without rendering.
+
+Serializers pick a derivative with ``?size=<name>`` (see ``pick``); without it
+the original URL is returned.
+"""
+
+from __future__ import annotations
+
+import atexit
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from .storage import StorageError, content_hash, get_storage
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_FORMAT = "webp"
+DERIVATIVE_CONTENT_TYPE = "image/webp"
+
+_pool = None
+_save_pool = None
+
+
+def render_derivatives(source, sizes: Dict[str, int], quality: int) -> Dict[str, bytes]:
+    """Encode ``source`` (a path or bytes) as one WebP per ``{name: longest edge}``.
+
+    Runs in a pool process, so it takes and returns only plain values.
+    """
+
+    from PIL import Image, ImageOps
+
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as image:
+        largest = max(sizes.values())
+        # Lets the JPEG decoder skip straight to a reduced scale.
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    rendered = {}
+    # Largest first, each resized from the previous one, which is cheaper than
+    # resampling the original every time.
+    for name, edge in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, DERIVATIVE_FORMAT.upper(), quality=quality, method=4)
+        rendered[name] = output.getvalue()
+    return rendered
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_DERIVATIVE_WORKERS)
+        atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def _saver():
+    global _save_pool
+    if _save_pool is None:
+        _save_pool = ThreadPoolExecutor(
+            max_workers=max(settings.IMAGE_DERIVATIVE_WORKERS, 1), thread_name_prefix="image-derivatives"
+        )
+    return _save_pool
+
+
+def derivative_path(digest: str, name: str) -> str:
+    return f"derivatives/{digest[:2]}/{digest}/{name}.{DERIVATIVE_FORMAT}"
+
+
+def _source(fileobj):
+    path = getattr(fileobj, "temporary_file_path", None)
+    if path is not None:
+        return path()
+    fileobj.seek(0)
+    return fileobj.read()
+
+
+def _render_args(source):
+    return (source, dict(settings.IMAGE_DERIVATIVE_SIZES), settings.IMAGE_DERIVATIVE_QUALITY)
+
+
+def _render(fileobj) -> Dict[str, bytes]:
+    args = _render_args(_source(fileobj))
+    if settings.IMAGE_DERIVATIVE_WORKERS <= 0:
+        return render_derivatives(*args)
+    future = _executor().submit(render_derivatives, *args)
+    return future.result(timeout=settings.IMAGE_DERIVATIVE_TIMEOUT_SECONDS)
+
+
+def _store(digest: str, rendered: Dict[str, bytes], storage) -> Dict[str, str]:
+    storage = storage or get_storage()
+    variants = {}
+    for name, data in rendered.items():
+        path = derivative_path(digest, name)
+        try:
+            storage.save(path, io.BytesIO(data), DERIVATIVE_CONTENT_TYPE)
+        except StorageError as exc:
+            logger.warning("Could not store derivative %s: %s", path, exc)
+            continue
+        variants[name] = storage.public_url(path)
+    return variants
+
+
+def _record(source_url: str, digest: str, variants: Dict[str, str]) -> None:
+    from core.models import ImageDerivativeSet
+
+    if source_url:
+        ImageDerivativeSet.objects.update_or_create(
+            source_url=source_url, defaults={"content_hash": digest, "variants": variants}
+        )
+
+
+def _finish(future, digest, source_url, storage, on_done, caller):
+    try:
+        rendered = future.result()
+    except Exception as exc:
+        logger.warning("Could not render derivatives of %s: %s", source_url or digest, exc)
+        return
+    # Not on the process pool's result thread: uploads and queries there
+    # would hold up delivering every other render.
+    _saver().submit(_save, digest, rendered, source_url, storage, on_done, caller)
+
+
+def _save(digest, rendered, source_url, storage, on_done, caller):
+    try:
+        variants = _store(digest, rendered, storage)
+        _record(source_url, digest, variants)
+        on_done(variants)
+    except Exception:
+        logger.exception("Could not save derivatives of %s", source_url or digest)
+    finally:
+        if threading.get_ident() != caller:
+            # Saver threads hold no connection between renders.
+            connection.close()
+
+
+def create_derivatives(
+    fileobj, source_url: str = "", storage=None, on_done: Optional[Callable[[Dict[str, str]], None]] = None
+) -> Dict[str, str]:
+    """Render and store ``fileobj``'s derivatives; returns ``{size name: URL}``.
+
+    Returns an empty dict if the file cannot be decoded or rendering fails, in
+    which case clients keep getting the original. With ``on_done`` and a
+    process pool, a new image is rendered in the background: this returns an
+    empty dict at once and ``on_done(variants)`` is called once they are stored.
+    """
+
+    from core.models import ImageDerivativeSet
+
+    digest = content_hash(fileobj)
+    existing = ImageDerivativeSet.objects.filter(content_hash=digest).exclude(variants={}).first()
+    if existing is not None:
+        variants = existing.variants
+    elif on_done is not None and settings.IMAGE_DERIVATIVE_WORKERS > 0:
+        # Bytes rather than a path: a request's temporary upload is gone by
+        # the time the pool gets to it.
+        fileobj.seek(0)
+        future = _executor().submit(render_derivatives, *_render_args(fileobj.read()))
+        fileobj.seek(0)
+        caller = threading.get_ident()
+        future.add_done_callback(lambda done: _finish(done, digest, source_url, storage, on_done, caller))
+        return {}
+    else:
+        try:
+            rendered = _render(fileobj)
+        except Exception as exc:
+            logger.warning("Could not render derivatives of %s: %s", source_url or digest, exc)
+            return {}
+        variants = _store(digest, rendered, storage)
+    fileobj.seek(0)
+
+    _record(source_url, digest, variants)
+    if on_done is not None:
+        on_done(variants)
+    return variants
+
+
+def variants_for_url(url: Optional[str]) -> Dict[str, str]:
+    """Derivatives recorded for an uploaded image's URL (empty if none)."""
+
+    from core.models import ImageDerivativeSet
+
+    if not url:
+        return {}
+    variants = ImageDerivativeSet.objects.filter(source_url=url).values_list("variants", flat=True).first()
+    return variants or {}
+
+
+def requested_size(context) -> Optional[str]:
+    """The ``?size=`` of the request in a serializer context, if it names a derivative."""
+
+    request = context.get("request") if context else None
+    size = getattr(request, "query_params", {}).get("size") if request is not None else None
+    return size if size in settings.IMAGE_DERIVATIVE_SIZES else None
+
+
+def pick(original, variants, size):
+    """URL to serve: the ``size`` derivative when there is one, else ``original``."""
+
+    if size and variants and variants.get(size):
+        return variants[size]
+    return original
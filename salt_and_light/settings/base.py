@@ -2,14 +2,19 @@
 from decouple import config
 from multiprocessing import process
 import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
+# True under `manage.py test`; background workers stay off so nothing writes
+# to the database after the test runner restores the real settings.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 INSTALLED_APPS = [
     # core apps
-    'users', 'posts', 'comments', 'prayer_requests', 'files', 'core',
+    'users', 'posts', 'comments', 'prayer_requests', 'files', 'core', 'moderation',
     'django.contrib.admin',
     'django.contrib.messages',
     # third-party
@@ -74,6 +79,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
 SIMPLE_JWT = {
@@ -106,12 +113,147 @@ CORS_ALLOW_ALL_ORIGINS = False  # Set to True only for development
 # Media files configuration
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
+# Same as Django's defaults, but each uploaded file also gets its SHA-256.
+FILE_UPLOAD_HANDLERS = [
+    'salt_and_light.upload_handlers.HashingMemoryFileUploadHandler',
+    'salt_and_light.upload_handlers.HashingTemporaryFileUploadHandler',
+]
 
 # Supabase configuration
 SUPABASE_URL = config('SUPABASE_URL', default='')
 SUPABASE_KEY = config('SUPABASE_KEY', default='')
 SUPABASE_SERVICE_ROLE_KEY = config('SUPABASE_SERVICE_ROLE_KEY', default='')
 SUPABASE_POST_IMAGE_BUCKET = config('SUPABASE_POST_IMAGE_BUCKET', default='post-image-storage')
+SUPABASE_SIGNED_URL_EXPIRES_SECONDS = config('SUPABASE_SIGNED_URL_EXPIRES_SECONDS', default=3600, cast=int)
+SUPABASE_SIGNED_URL_CACHE_SIZE = config('SUPABASE_SIGNED_URL_CACHE_SIZE', default=4096, cast=int)
+
+# Media uploads (see salt_and_light/storage.py): "supabase", or "local" to store
+# under MEDIA_ROOT. Uploads stream in chunks of STORAGE_UPLOAD_CHUNK_SIZE bytes;
+# Supabase's resumable endpoint requires 6 MB chunks.
+MEDIA_STORAGE_BACKEND = config('MEDIA_STORAGE_BACKEND', default='supabase')
+STORAGE_UPLOAD_CHUNK_SIZE = config('STORAGE_UPLOAD_CHUNK_SIZE', default=6 * 1024 * 1024, cast=int)
+STORAGE_UPLOAD_RETRIES = config('STORAGE_UPLOAD_RETRIES', default=3, cast=int)
+# Doubles after each failed chunk; only connection errors, 5xx and 409 are retried.
+STORAGE_UPLOAD_RETRY_BACKOFF_SECONDS = config('STORAGE_UPLOAD_RETRY_BACKOFF_SECONDS', default=1.0, cast=float)
+STORAGE_TIMEOUT_SECONDS = config('STORAGE_TIMEOUT_SECONDS', default=30, cast=int)
+# An uploaded post image outlives its references for this long, so the post that
+# will use it can still be created; `manage.py prune_blobs` deletes it afterwards.
+BLOB_UPLOAD_LEASE_SECONDS = config('BLOB_UPLOAD_LEASE_SECONDS', default=24 * 60 * 60, cast=int)
+
+# Image derivatives (see salt_and_light/images.py): one WebP per size, named by
+# its longest edge in pixels and requested with ?size=<name>.
+IMAGE_DERIVATIVE_SIZES = {'thumb': 160, 'small': 480, 'medium': 1080}
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=80, cast=int)
+IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+IMAGE_DERIVATIVE_TIMEOUT_SECONDS = config('IMAGE_DERIVATIVE_TIMEOUT_SECONDS', default=30, cast=int)
+
+_csv = lambda value: [term.strip() for term in value.split(',') if term.strip()]
+
+# Moderation queue
+# Backends: "gemini" (production) or "stub" (offline tests and load testing).
+MODERATION_BACKEND = config('MODERATION_BACKEND', default='gemini')
+MODERATION_WORKERS = config('MODERATION_WORKERS', default=4, cast=int)
+MODERATION_MAX_ATTEMPTS = config('MODERATION_MAX_ATTEMPTS', default=5, cast=int)
+MODERATION_RETRY_BACKOFF_SECONDS = config('MODERATION_RETRY_BACKOFF_SECONDS', default=30, cast=int)
+MODERATION_JOB_TIMEOUT_SECONDS = config('MODERATION_JOB_TIMEOUT_SECONDS', default=300, cast=int)
+MODERATION_STUB_LATENCY_MS = config('MODERATION_STUB_LATENCY_MS', default=0, cast=int)
+MODERATION_STUB_FLAG_TERMS = config('MODERATION_STUB_FLAG_TERMS', default='spam,hate', cast=_csv)
+MODERATION_BATCH_MAX_ITEMS = config('MODERATION_BATCH_MAX_ITEMS', default=20, cast=int)
+MODERATION_BATCH_MAX_CHARS = config('MODERATION_BATCH_MAX_CHARS', default=24000, cast=int)
+
+# Local pre-moderation: blocklisted texts are flagged without a Gemini call. Extra
+# terms can be added as comma-separated lists. Setting CLEAN_MAX_LENGTH above 0
+# also publishes texts up to that length with no blocklisted term unmoderated.
+MODERATION_PREFILTER_ENABLED = config('MODERATION_PREFILTER_ENABLED', default=True, cast=bool)
+MODERATION_PREFILTER_CLEAN_MAX_LENGTH = config('MODERATION_PREFILTER_CLEAN_MAX_LENGTH', default=0, cast=int)
+MODERATION_BLOCKLIST_FILE = config('MODERATION_BLOCKLIST_FILE', default=str(BASE_DIR / 'moderation' / 'data' / 'blocklist.txt'))
+MODERATION_ALLOWLIST_FILE = config('MODERATION_ALLOWLIST_FILE', default=str(BASE_DIR / 'moderation' / 'data' / 'allowlist.txt'))
+MODERATION_BLOCKLIST = config('MODERATION_BLOCKLIST', default='', cast=_csv)
+MODERATION_ALLOWLIST = config('MODERATION_ALLOWLIST', default='', cast=_csv)
+
+# Moderation result cache (keyed by normalized content hash + model/prompt version)
+MODERATION_CACHE_ENABLED = config('MODERATION_CACHE_ENABLED', default=True, cast=bool)
+MODERATION_CACHE_TTL_SECONDS = config('MODERATION_CACHE_TTL_SECONDS', default=60 * 60 * 24 * 30, cast=int)
+MODERATION_CACHE_MAX_ENTRIES = config('MODERATION_CACHE_MAX_ENTRIES', default=100000, cast=int)
+MODERATION_CACHE_PRUNE_EVERY = config('MODERATION_CACHE_PRUNE_EVERY', default=500, cast=int)
+
+# Post view counting (see posts/view_counter.py). Views are buffered per process
+# and flushed to Post.views every POST_VIEW_FLUSH_INTERVAL_SECONDS; 0 disables
+# the background flusher (the default under tests). Repeat views by one viewer
+# inside the dedupe window are not counted (0 counts every view).
+POST_VIEW_FLUSH_INTERVAL_SECONDS = config(
+    'POST_VIEW_FLUSH_INTERVAL_SECONDS', default=0.0 if TESTING else 10.0, cast=float
+)
+POST_VIEW_FLUSH_BATCH_SIZE = config('POST_VIEW_FLUSH_BATCH_SIZE', default=500, cast=int)
+POST_VIEW_DEDUPE_WINDOW_SECONDS = config('POST_VIEW_DEDUPE_WINDOW_SECONDS', default=60 * 30, cast=int)
+
+# Most reaction changes accepted by one POST /posts/posts/react/ request.
+POST_BULK_REACTION_LIMIT = config('POST_BULK_REACTION_LIMIT', default=50, cast=int)
+
+# Trending (see posts/trending.py). Every view, reaction, comment and share adds
+# its weight to the post's score; contributions halve every
+# TRENDING_HALF_LIFE_HOURS. TRENDING_EPOCH only anchors the stored log scores.
+TRENDING_EPOCH = config('TRENDING_EPOCH', default='2025-01-01T00:00:00+00:00')
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=24.0, cast=float)
+TRENDING_EVENT_WEIGHTS = {
+    'view': config('TRENDING_VIEW_WEIGHT', default=1.0, cast=float),
+    'reaction': config('TRENDING_REACTION_WEIGHT', default=3.0, cast=float),
+    'comment': config('TRENDING_COMMENT_WEIGHT', default=5.0, cast=float),
+    'share': config('TRENDING_SHARE_WEIGHT', default=8.0, cast=float),
+}
+TRENDING_DEFAULT_WINDOW = config('TRENDING_DEFAULT_WINDOW', default='7d')
+TRENDING_CACHE_SECONDS = config('TRENDING_CACHE_SECONDS', default=60, cast=int)
+
+# Post full-text search (see posts/search.py). Empty picks the backend that
+# matches the database: "postgres" (tsvector + GIN) or "sqlite" (FTS5).
+POST_SEARCH_BACKEND = config('POST_SEARCH_BACKEND', default='')
+
+# Tag facets (see posts/tagging.py). Counts are maintained on every post write;
+# this only bounds how long /posts/posts/tags/ responses are reused.
+TAG_FACETS_CACHE_SECONDS = config('TAG_FACETS_CACHE_SECONDS', default=60, cast=int)
+
+# Most cited scripture passages (see posts/scripture.py).
+SCRIPTURE_PASSAGES_CACHE_SECONDS = config('SCRIPTURE_PASSAGES_CACHE_SECONDS', default=300, cast=int)
+
+# Home feed (see posts/timeline.py). Posts are fanned out to followers'
+# timelines on publish, except for authors with more than
+# FEED_FANOUT_MAX_FOLLOWERS followers, whose posts are merged in at read time.
+FEED_FANOUT_MAX_FOLLOWERS = config('FEED_FANOUT_MAX_FOLLOWERS', default=5000, cast=int)
+FEED_FANOUT_BATCH_SIZE = config('FEED_FANOUT_BATCH_SIZE', default=1000, cast=int)
+FEED_TIMELINE_MAX_ENTRIES = config('FEED_TIMELINE_MAX_ENTRIES', default=800, cast=int)
+FEED_FOLLOW_BACKFILL_POSTS = config('FEED_FOLLOW_BACKFILL_POSTS', default=20, cast=int)
+FEED_HIGH_REACH_CACHE_SECONDS = config('FEED_HIGH_REACH_CACHE_SECONDS', default=300, cast=int)
+
+# Threaded comments (see comments/threads.py). Replies to a comment at
+# COMMENT_MAX_DEPTH (top-level comments are depth 0) are attached to its parent.
+# Paths hold at most 25 levels.
+COMMENT_MAX_DEPTH = config('COMMENT_MAX_DEPTH', default=8, cast=int)
+
+# Related posts (see posts/related.py). Every shared tag, overlapping scripture
+# range and engaged user adds its weight to a candidate's score (tags damped by
+# popularity). Lists of RELATED_POSTS_LIMIT posts are materialized and refreshed
+# by `manage.py refresh_related_posts` for posts marked stale.
+RELATED_POSTS_LIMIT = config('RELATED_POSTS_LIMIT', default=10, cast=int)
+RELATED_POSTS_WEIGHTS = {
+    'tag': config('RELATED_POSTS_TAG_WEIGHT', default=4.0, cast=float),
+    'scripture': config('RELATED_POSTS_SCRIPTURE_WEIGHT', default=3.0, cast=float),
+    'user': config('RELATED_POSTS_USER_WEIGHT', default=1.0, cast=float),
+}
+RELATED_POSTS_MAX_CANDIDATES = config('RELATED_POSTS_MAX_CANDIDATES', default=1000, cast=int)
+RELATED_POSTS_MAX_ENGAGED_USERS = config('RELATED_POSTS_MAX_ENGAGED_USERS', default=200, cast=int)
+
+# Near-duplicate posts (see posts/fingerprint.py). Similarities are estimated
+# Jaccard similarities of word 3-shingles, from 0 to 1; below ~0.5 the banded
+# index starts missing matches.
+# Authors get a 429 after POST_DUPLICATE_LIMIT near-copies of their own recent posts.
+# Other lookups compare only the newest NEAR_DUPLICATE_MAX_CANDIDATES band matches.
+# Copies above REUSE_MIN_SIMILARITY reuse a verdict only if they add no new shingle.
+POST_FINGERPRINT_MIN_WORDS = config('POST_FINGERPRINT_MIN_WORDS', default=8, cast=int)
+POST_NEAR_DUPLICATE_MIN_SIMILARITY = config('POST_NEAR_DUPLICATE_MIN_SIMILARITY', default=0.7, cast=float)
+POST_NEAR_DUPLICATE_MAX_CANDIDATES = config('POST_NEAR_DUPLICATE_MAX_CANDIDATES', default=500, cast=int)
+POST_MODERATION_REUSE_MIN_SIMILARITY = config('POST_MODERATION_REUSE_MIN_SIMILARITY', default=0.9, cast=float)
+POST_DUPLICATE_LIMIT = config('POST_DUPLICATE_LIMIT', default=3, cast=int)
+POST_DUPLICATE_WINDOW_SECONDS = config('POST_DUPLICATE_WINDOW_SECONDS', default=60 * 60, cast=int)
 
 # Logging configuration
 LOGGING = {
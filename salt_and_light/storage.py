@@ -0,0 +1,267 @@
+"""Streaming object storage for uploaded media.
+
+Uploads are piped to storage a chunk at a time instead of being read into
+memory, so a worker holds at most ``STORAGE_UPLOAD_CHUNK_SIZE`` bytes of any one
+upload however large it is:
+
+* ``supabase``: files up to one chunk are streamed in a single request to the
+  Storage REST API; larger files use Supabase's resumable (TUS) endpoint and
+  resume from the server's offset if a chunk fails.
+* ``local``: writes under ``MEDIA_ROOT/<bucket>/`` and serves from
+  ``MEDIA_URL``. Used in development and tests.
+
+``get_storage()`` returns the backend named by ``MEDIA_STORAGE_BACKEND``.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import os
+import time
+from typing import BinaryIO, Dict, Optional
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+
+
+class StorageError(Exception):
+    """Raised when an object could not be stored."""
+
+
+def _chunks(fileobj: BinaryIO, chunk_size: int):
+    if hasattr(fileobj, "chunks"):
+        yield from fileobj.chunks(chunk_size)
+        return
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def content_hash(fileobj: BinaryIO) -> str:
+    """Hex SHA-256 of ``fileobj``, read in chunks from the start.
+
+    Uploads parsed by ``salt_and_light.upload_handlers`` already carry it as
+    ``.sha256``, computed as the request body streamed in.
+    """
+
+    digest = getattr(fileobj, "sha256", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in _chunks(fileobj, settings.STORAGE_UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+    fileobj.seek(0)
+    return hasher.hexdigest()
+
+
+def _size(fileobj: BinaryIO) -> int:
+    size = getattr(fileobj, "size", None)
+    if size is not None:
+        return size
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, bucket: Optional[str] = None):
+        self.bucket = bucket or settings.SUPABASE_POST_IMAGE_BUCKET
+
+    def _path(self, path: str) -> str:
+        root = os.path.abspath(os.path.join(settings.MEDIA_ROOT, self.bucket))
+        full_path = os.path.abspath(os.path.join(root, path))
+        if not full_path.startswith(root + os.sep):
+            raise StorageError(f"Invalid object path '{path}'.")
+        return full_path
+
+    def save(self, path: str, fileobj: BinaryIO, content_type: str, cache_control: str = "31536000") -> str:
+        full_path = self._path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if os.path.exists(full_path):
+            raise StorageError(f"Object '{path}' already exists.")
+        temporary = f"{full_path}.part"
+        with open(temporary, "wb") as destination:
+            for chunk in _chunks(fileobj, settings.STORAGE_UPLOAD_CHUNK_SIZE):
+                destination.write(chunk)
+        os.replace(temporary, full_path)
+        return path
+
+    def delete(self, path: str) -> None:
+        try:
+            os.remove(self._path(path))
+        except FileNotFoundError:
+            pass
+
+    def public_url(self, path: str) -> str:
+        return f"{settings.MEDIA_URL.rstrip('/')}/{self.bucket}/{path}"
+
+    def signed_url(self, path: str, expires_in: Optional[int] = None) -> str:
+        # MEDIA_URL is not access controlled.
+        return self.public_url(path)
+
+
+class SupabaseStorage:
+    name = "supabase"
+
+    def __init__(self, bucket: Optional[str] = None, session=None):
+        self.bucket = bucket or settings.SUPABASE_POST_IMAGE_BUCKET
+        self.base_url = settings.SUPABASE_URL.rstrip("/")
+        self.api_key = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
+        self.session = session or requests.Session()
+
+    def _headers(self, **extra: str) -> Dict[str, str]:
+        if not self.base_url or not self.api_key:
+            raise StorageError("Supabase credentials are not configured. Please set SUPABASE_URL and SUPABASE_KEY.")
+        return {"Authorization": f"Bearer {self.api_key}", "apikey": self.api_key, **extra}
+
+    def save(self, path: str, fileobj: BinaryIO, content_type: str, cache_control: str = "31536000") -> str:
+        size = _size(fileobj)
+        fileobj.seek(0)
+        try:
+            if size <= settings.STORAGE_UPLOAD_CHUNK_SIZE:
+                self._upload_single(path, fileobj, size, content_type, cache_control)
+            else:
+                self._upload_resumable(path, fileobj, size, content_type, cache_control)
+        except requests.RequestException as exc:
+            raise StorageError(f"Upload of '{path}' failed: {exc}") from exc
+        return path
+
+    def _upload_single(self, path, fileobj, size, content_type, cache_control):
+        # requests streams file-like bodies in small blocks rather than reading them.
+        response = self.session.post(
+            f"{self.base_url}/storage/v1/object/{self.bucket}/{path}",
+            data=fileobj,
+            headers=self._headers(**{
+                "Content-Type": content_type,
+                "Content-Length": str(size),
+                "Cache-Control": f"max-age={cache_control}",
+                "x-upsert": "false",
+            }),
+            timeout=settings.STORAGE_TIMEOUT_SECONDS,
+        )
+        self._check(response, path)
+
+    def _upload_resumable(self, path, fileobj, size, content_type, cache_control):
+        metadata = {
+            "bucketName": self.bucket,
+            "objectName": path,
+            "contentType": content_type,
+            "cacheControl": cache_control,
+        }
+        encoded = ",".join(
+            f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}" for key, value in metadata.items()
+        )
+        response = self.session.post(
+            f"{self.base_url}/storage/v1/upload/resumable",
+            headers=self._headers(**{
+                "Tus-Resumable": TUS_VERSION,
+                "Upload-Length": str(size),
+                "Upload-Metadata": encoded,
+                "x-upsert": "false",
+            }),
+            timeout=settings.STORAGE_TIMEOUT_SECONDS,
+        )
+        self._check(response, path)
+        location = response.headers.get("Location")
+        if not location:
+            raise StorageError(f"Upload of '{path}' failed: no upload location returned.")
+
+        offset = 0
+        failures = 0
+        chunk_size = settings.STORAGE_UPLOAD_CHUNK_SIZE
+        while offset < size:
+            fileobj.seek(offset)
+            chunk = fileobj.read(chunk_size)
+            try:
+                response = self.session.patch(
+                    location,
+                    data=chunk,
+                    headers=self._headers(**{
+                        "Tus-Resumable": TUS_VERSION,
+                        "Upload-Offset": str(offset),
+                        "Content-Type": "application/offset+octet-stream",
+                    }),
+                    timeout=settings.STORAGE_TIMEOUT_SECONDS,
+                )
+            except requests.RequestException as exc:
+                error = exc
+            else:
+                if response.status_code < 400:
+                    offset = int(response.headers.get("Upload-Offset", offset + len(chunk)))
+                    failures = 0
+                    continue
+                # Auth, size and other client errors fail the same way on retry;
+                # a 409 means our offset is out of step with the server's.
+                if response.status_code < 500 and response.status_code != 409:
+                    self._check(response, path)
+                error = f"HTTP {response.status_code}"
+            failures += 1
+            if failures > settings.STORAGE_UPLOAD_RETRIES:
+                raise StorageError(f"Upload of '{path}' failed at byte {offset}: {error}")
+            delay = settings.STORAGE_UPLOAD_RETRY_BACKOFF_SECONDS * (2 ** (failures - 1))
+            logger.warning("Resuming upload of %s at byte %s in %ss after: %s", path, offset, delay, error)
+            time.sleep(delay)
+            offset = self._server_offset(location, offset)
+
+    def _server_offset(self, location: str, fallback: int) -> int:
+        try:
+            response = self.session.head(
+                location,
+                headers=self._headers(**{"Tus-Resumable": TUS_VERSION}),
+                timeout=settings.STORAGE_TIMEOUT_SECONDS,
+            )
+            return int(response.headers["Upload-Offset"])
+        except Exception:  # Retry the same chunk.
+            return fallback
+
+    @staticmethod
+    def _check(response, path: str) -> None:
+        if response.status_code >= 400:
+            detail = response.text[:200] if hasattr(response, "text") else response.status_code
+            raise StorageError(f"Upload of '{path}' failed: {detail}")
+
+    def delete(self, path: str) -> None:
+        response = self.session.delete(
+            f"{self.base_url}/storage/v1/object/{self.bucket}/{path}",
+            headers=self._headers(),
+            timeout=settings.STORAGE_TIMEOUT_SECONDS,
+        )
+        if response.status_code >= 400 and response.status_code != 404:
+            self._check(response, path)
+
+    def public_url(self, path: str) -> str:
+        from .supabase_client import get_public_url
+
+        return get_public_url(path, self.bucket)
+
+    def signed_url(self, path: str, expires_in: Optional[int] = None) -> str:
+        from .supabase_client import create_signed_url
+
+        return create_signed_url(path, expires_in, self.bucket)
+
+
+STORAGE_BACKENDS = {
+    LocalStorage.name: LocalStorage,
+    SupabaseStorage.name: SupabaseStorage,
+}
+
+
+def get_storage(bucket: Optional[str] = None):
+    try:
+        backend = STORAGE_BACKENDS[settings.MEDIA_STORAGE_BACKEND]
+    except KeyError:
+        raise StorageError(f"Unknown MEDIA_STORAGE_BACKEND '{settings.MEDIA_STORAGE_BACKEND}'.")
+    return backend(bucket)
@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 import logging
+import threading
 from functools import lru_cache
 from typing import Any, Dict, Optional
+from urllib.parse import quote
 
+from cachetools import TLRUCache
 from django.conf import settings
 
 try:
@@ -16,6 +19,9 @@ except ImportError:  # pragma: no cover - handled at runtime (siko sure!)
 
 logger = logging.getLogger(__name__)
 
+# Cached signed URLs are handed out until this many seconds before they expire.
+SIGNED_URL_MARGIN_SECONDS = 60
+
 
 @lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
@@ -68,19 +74,58 @@ def extract_response_data(response: Any) -> Dict[str, Any]:
     return {}
 
 
-def get_public_url(path: str) -> str:
-    """Build a public URL for a stored object."""
+def _object_path(bucket: Optional[str], path: str) -> str:
+    return quote(f"{bucket or settings.SUPABASE_POST_IMAGE_BUCKET}/{path.lstrip('/')}")
+
+
+def get_public_url(path: str, bucket: Optional[str] = None) -> str:
+    """Build a public URL for a stored object.
+
+    Computed from SUPABASE_URL and the bucket the same way the Storage API
+    serves public objects, so it costs no client setup or network call.
+    """
+
+    if not settings.SUPABASE_URL:
+        return ""
+    return f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{_object_path(bucket, path)}"
+
+
+def _signed_url_expiry(key, value, now):
+    return now + max(key[2] - SIGNED_URL_MARGIN_SECONDS, 0)
+
+
+_signed_urls = TLRUCache(maxsize=settings.SUPABASE_SIGNED_URL_CACHE_SIZE, ttu=_signed_url_expiry)
+_signed_urls_lock = threading.Lock()
+
+
+def create_signed_url(path: str, expires_in: Optional[int] = None, bucket: Optional[str] = None) -> str:
+    """Return a signed URL for a private object, valid for ``expires_in`` seconds.
 
-    client = get_supabase_client()
-    bucket = client.storage.from_(settings.SUPABASE_POST_IMAGE_BUCKET)
-    response = bucket.get_public_url(path)
+    Signing needs a Storage API call, so URLs are cached (LRU, up to
+    SUPABASE_SIGNED_URL_CACHE_SIZE entries) and reused until
+    SIGNED_URL_MARGIN_SECONDS before they expire.
+    """
 
-    if isinstance(response, str):
-        return response
+    bucket = bucket or settings.SUPABASE_POST_IMAGE_BUCKET
+    expires_in = expires_in or settings.SUPABASE_SIGNED_URL_EXPIRES_SECONDS
+    key = (bucket, path, expires_in)
+    with _signed_urls_lock:
+        signed_url = _signed_urls.get(key)
+    if signed_url is not None:
+        return signed_url
 
-    data = extract_response_data(response)
-    if isinstance(data, dict):
-        return data.get("publicUrl") or data.get("publicURL") or data.get("public_url") or ""
+    response = get_supabase_client().storage.from_(bucket).create_signed_url(path, expires_in)
+    error = extract_response_error(response)
+    if error:
+        raise RuntimeError(f"Could not sign '{path}': {error}")
+    data = response if isinstance(response, dict) else extract_response_data(response)
+    signed_url = data.get("signedURL") or data.get("signedUrl") or data.get("signed_url") or ""
+    if signed_url:
+        with _signed_urls_lock:
+            _signed_urls[key] = signed_url
+    return signed_url
 
-    return ""
 
+def clear_signed_url_cache() -> None:
+    with _signed_urls_lock:
+        _signed_urls.clear()
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_follow_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized copies of the profile picture by size name.'),
+        ),
+    ]
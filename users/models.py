@@ -1,8 +1,13 @@
+import logging
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.crypto import get_random_string
 from datetime import timedelta
 from django.utils import timezone
+from salt_and_light.images import create_derivatives
+
+logger = logging.getLogger(__name__)
 
 class User(AbstractUser):
     # Add custom fields here if needed, e.g., language preference, premium status
@@ -10,9 +15,11 @@ class User(AbstractUser):
     language = models.CharField(max_length=10, default='en', help_text="User's preferred language for content.")
     premium_status = models.BooleanField(default=False, help_text="True if user has a premium subscription.")
     profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=False, help_text="User's profile picture.")
+    profile_picture_variants = models.JSONField(default=dict, blank=True, help_text="Resized copies of the profile picture by size name.")
     temp_login_token = models.CharField(max_length=64, null=True, blank=True, help_text="Temporary token for post-verification auto-login")
     verification_expires_at = models.DateTimeField(null=True, blank=True, help_text="When the verification link expires")
     verification_code = models.CharField(max_length=6, null=True, blank=True, help_text="6-digit verification code")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "User"
@@ -20,6 +27,50 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_profile_picture = instance.__dict__.get("profile_picture")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The file is committed to storage by super().save(), so its name is final here.
+        name = self.profile_picture.name if self.profile_picture else None
+        if name != getattr(self, "_loaded_profile_picture", None):
+            self._loaded_profile_picture = name
+            try:
+                self.refresh_profile_picture_variants(background=True)
+            except OSError as exc:
+                # A missing or unreadable file must not fail the profile save.
+                logger.warning("Could not read profile picture of user %s: %s", self.pk, exc)
+
+    def refresh_profile_picture_variants(self, background=False):
+        """Render resized copies of the profile picture (see salt_and_light/images.py)
+
+        With ``background`` the render does not block; the copies are stored
+        when it finishes.
+        """
+        pk = self.pk
+
+        def store(variants):
+            self.profile_picture_variants = variants
+            self.updated_at = timezone.now()
+            User.objects.filter(pk=pk).update(profile_picture_variants=variants, updated_at=self.updated_at)
+
+        variants = {}
+        if self.profile_picture:
+            if background:
+                # The old picture's copies are dropped until the new ones are ready.
+                store({})
+            with self.profile_picture.open("rb") as picture:
+                variants = create_derivatives(
+                    picture, source_url=self.profile_picture.url, on_done=store if background else None
+                )
+        if not background or not self.profile_picture:
+            store(variants)
+        return variants
     
     def generate_temp_login_token(self):
         """Generate a one-time use token for auto-login after verification"""
@@ -63,6 +114,10 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ["follower", "following"]
+        indexes = [
+            models.Index(fields=["follower", "-created_at", "-id"], name="follow_following_created_idx"),
+            models.Index(fields=["following", "-created_at", "-id"], name="follow_followers_created_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=~models.Q(follower=models.F("following")),
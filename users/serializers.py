@@ -1,8 +1,10 @@
+from django.db.models import Count
 from rest_framework import serializers
 from .models import User, Follow
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
+from salt_and_light.images import pick, requested_size
 
 class UserRegisterSerializer(serializers.ModelSerializer):
     confirmPassword = serializers.CharField(write_only=True)
@@ -117,12 +119,21 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
 
     def get_follower_count(self, obj):
+        annotated_value = getattr(obj, 'follower_count', None)
+        if annotated_value is not None:
+            return annotated_value
         return obj.follower_relations.count()
 
     def get_following_count(self, obj):
+        annotated_value = getattr(obj, 'following_count', None)
+        if annotated_value is not None:
+            return annotated_value
         return obj.following_relations.count()
 
     def get_is_following(self, obj):
+        annotated_value = getattr(obj, 'is_following', None)
+        if annotated_value is not None:
+            return annotated_value
         request = self.context.get('request')
         if request and request.user.is_authenticated and request.user != obj:
             return Follow.objects.filter(follower=request.user, following=obj).exists()
@@ -133,3 +144,59 @@ class UserProfileSerializer(serializers.ModelSerializer):
         if request and request.user.is_authenticated:
             return obj == request.user
         return False
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        size = requested_size(self.context)
+        if size and data.get('profile_picture'):
+            data['profile_picture'] = pick(data['profile_picture'], instance.profile_picture_variants, size)
+        return data
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Just enough to render a byline; no follow stats, so no extra queries."""
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_picture']
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        size = requested_size(self.context)
+        if size and data.get('profile_picture'):
+            data['profile_picture'] = pick(data['profile_picture'], instance.profile_picture_variants, size)
+        return data
+
+
+def attach_follow_stats(users, viewer=None):
+    """Set ``follower_count``, ``following_count`` and ``is_following`` on ``users``.
+
+    Lets list endpoints embed many profiles with a fixed number of queries; the
+    getters on ``UserProfileSerializer`` use these attributes when present.
+    """
+    users = [user for user in users if user is not None]
+    user_ids = {user.pk for user in users}
+    if not user_ids:
+        return
+
+    follower_counts = dict(
+        Follow.objects.filter(following_id__in=user_ids)
+        .values_list('following_id')
+        .annotate(total=Count('id'))
+    )
+    following_counts = dict(
+        Follow.objects.filter(follower_id__in=user_ids)
+        .values_list('follower_id')
+        .annotate(total=Count('id'))
+    )
+    followed = set()
+    if viewer is not None and viewer.is_authenticated:
+        followed = set(
+            Follow.objects.filter(follower=viewer, following_id__in=user_ids).values_list('following_id', flat=True)
+        )
+
+    for user in users:
+        user.follower_count = follower_counts.get(user.pk, 0)
+        user.following_count = following_counts.get(user.pk, 0)
+        user.is_following = user.pk in followed and user != viewer
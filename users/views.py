@@ -8,7 +8,7 @@ from django.core.mail import send_mail, EmailMultiAlternatives
 from django.utils import timezone
 from django.template.loader import render_to_string
 from .models import User, Follow
-from .serializers import UserProfileSerializer, UserRegisterSerializer
+from .serializers import UserProfileSerializer, UserRegisterSerializer, attach_follow_stats
 from django.conf import settings
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken
@@ -341,19 +341,36 @@ class ToggleFollowView(APIView):
         return Response({"detail": "Unfollowed user.", "user": serializer.data}, status=status.HTTP_200_OK)
 
 
-class FollowersListView(generics.ListAPIView):
+class FollowListView(generics.ListAPIView):
+    """Lists one side of a user's follow relations, most recent first.
+
+    Pages over the Follow rows themselves so the cursor can use
+    (created_at, id) from the follow_*_created_idx indexes.
+    """
+
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.AllowAny]
+    cursor_ordering = ("-created_at", "-id")
+    target_field = None
+    listed_field = None
 
     def get_queryset(self):
         target_user = get_object_or_404(User, id=self.kwargs.get("user_id"))
-        return User.objects.filter(following_relations__following=target_user).distinct()
+        return Follow.objects.filter(**{self.target_field: target_user}).select_related(self.listed_field)
 
+    def list(self, request, *args, **kwargs):
+        follows = self.paginate_queryset(self.get_queryset())
+        users = [getattr(follow, self.listed_field) for follow in follows]
+        attach_follow_stats(users, request.user)
+        serializer = self.get_serializer(users, many=True)
+        return self.get_paginated_response(serializer.data)
 
-class FollowingListView(generics.ListAPIView):
-    serializer_class = UserProfileSerializer
-    permission_classes = [permissions.AllowAny]
 
-    def get_queryset(self):
-        target_user = get_object_or_404(User, id=self.kwargs.get("user_id"))
-        return User.objects.filter(follower_relations__follower=target_user).distinct()
\ No newline at end of file
+class FollowersListView(FollowListView):
+    target_field = "following"
+    listed_field = "follower"
+
+
+class FollowingListView(FollowListView):
+    target_field = "follower"
+    listed_field = "following"
\ No newline at end of file